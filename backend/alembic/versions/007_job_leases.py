@@ -0,0 +1,43 @@
+"""Add lease columns to jobs for crash-safe visibility.
+
+Revision ID: 007
+Revises: 006
+
+Running jobs carry the worker that claimed them (locked_by) and a lease
+expiry that the worker's heartbeat keeps extending. The runner's reaper
+returns jobs with an expired lease to the queue.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("locked_by", sa.String(255), nullable=True))
+    op.add_column("jobs", sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Jobs already running have no heartbeat; give them a grace period before
+    # the reaper considers them orphaned.
+    op.execute("""
+        UPDATE jobs
+        SET lease_expires_at = now() + interval '10 minutes'
+        WHERE status = 'running'
+    """)
+
+    op.create_index(
+        "ix_job_running_lease",
+        "jobs",
+        ["lease_expires_at"],
+        postgresql_where=sa.text("status = 'running'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_running_lease", "jobs")
+    op.drop_column("jobs", "lease_expires_at")
+    op.drop_column("jobs", "locked_by")
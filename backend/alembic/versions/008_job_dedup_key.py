@@ -0,0 +1,51 @@
+"""Add jobs.dedup_key with a partial unique index over active jobs.
+
+Revision ID: 008
+Revises: 007
+
+Replaces the payload_json["document_id"] scan used to skip duplicate
+per-document jobs. enqueue_job inserts with ON CONFLICT DO NOTHING against
+uq_job_dedup_active, so dedup stays an index probe at 100k+ queued rows.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("dedup_key", sa.String(255), nullable=True))
+
+    # Backfill keys for active per-document stages. Only the oldest active job
+    # per (type, document) gets the key so the unique index can be built.
+    op.execute("""
+        UPDATE jobs j
+        SET dedup_key = d.dedup_key
+        FROM (
+            SELECT DISTINCT ON (type, payload_json->>'document_id')
+                   id, type::text || ':' || (payload_json->>'document_id') AS dedup_key
+            FROM jobs
+            WHERE status IN ('queued', 'running')
+              AND type IN ('CHUNK_DOCUMENT', 'EXTRACT_ENTITIES_RELATIONS')
+              AND payload_json->>'document_id' IS NOT NULL
+            ORDER BY type, payload_json->>'document_id', created_at
+        ) d
+        WHERE j.id = d.id
+    """)
+
+    op.create_index(
+        "uq_job_dedup_active",
+        "jobs",
+        ["dedup_key"],
+        unique=True,
+        postgresql_where=sa.text("dedup_key IS NOT NULL AND status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_job_dedup_active", "jobs")
+    op.drop_column("jobs", "dedup_key")
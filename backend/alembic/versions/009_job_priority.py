@@ -0,0 +1,32 @@
+"""Add jobs.priority for priority lanes and fair claiming.
+
+Revision ID: 009
+Revises: 008
+
+Higher priority is claimed first (10 = interactive, 0 = bulk backfill).
+Existing rows default to interactive. The partial index over queued jobs
+backs the per-workspace candidate scan in the runner's CLAIM_SQL.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("priority", sa.SmallInteger(), nullable=False, server_default="10"))
+    op.create_index(
+        "ix_job_queued_workspace_priority",
+        "jobs",
+        ["workspace_id", sa.text("priority DESC"), "created_at"],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_queued_workspace_priority", "jobs")
+    op.drop_column("jobs", "priority")
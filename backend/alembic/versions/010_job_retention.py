@@ -0,0 +1,71 @@
+"""Add jobs_archive and job_stats_rollup for job retention.
+
+Revision ID: 010
+Revises: 009
+
+The worker's retention sweep moves old done/failed jobs from `jobs` into
+`jobs_archive` and adds them to per-(workspace, type, status) counters in
+`job_stats_rollup`. /v1/jobs/stats sums the live table and the rollup.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    job_type = postgresql.ENUM(name="job_type_enum", create_type=False)
+    job_status = postgresql.ENUM(name="job_status_enum", create_type=False)
+
+    op.create_table(
+        "jobs_archive",
+        sa.Column("id", sa.UUID(), primary_key=True),
+        sa.Column("workspace_id", sa.UUID(), nullable=False),
+        sa.Column("type", job_type, nullable=False),
+        sa.Column("payload_json", sa.JSON()),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0"),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("priority", sa.SmallInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.create_index("ix_job_archive_workspace_status", "jobs_archive", ["workspace_id", "status", "updated_at"])
+
+    op.create_table(
+        "job_stats_rollup",
+        sa.Column("workspace_id", sa.UUID(), nullable=False),
+        sa.Column("type", job_type, nullable=False),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("workspace_id", "type", "status"),
+    )
+
+    op.create_index(
+        "ix_job_finished_updated",
+        "jobs",
+        ["updated_at"],
+        postgresql_where=sa.text("status IN ('done', 'failed')"),
+    )
+
+
+def downgrade() -> None:
+    # Move archived rows back so no history is lost
+    op.execute("""
+        INSERT INTO jobs (id, workspace_id, type, payload_json, status, attempts, last_error,
+                          priority, created_at, updated_at)
+        SELECT id, workspace_id, type, payload_json, status, attempts, last_error,
+               priority, created_at, updated_at
+        FROM jobs_archive
+        ON CONFLICT (id) DO NOTHING
+    """)
+    op.drop_index("ix_job_finished_updated", "jobs")
+    op.drop_table("job_stats_rollup")
+    op.drop_index("ix_job_archive_workspace_status", "jobs_archive")
+    op.drop_table("jobs_archive")
@@ -0,0 +1,31 @@
+"""Add started_at/finished_at to jobs for latency and throughput metrics.
+
+Revision ID: 011
+Revises: 010
+
+`started_at` is set when a job is claimed and `finished_at` when an attempt
+is acknowledged, so queue wait (created_at -> started_at) and run time
+(started_at -> finished_at) can be computed per job type.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("jobs", "jobs_archive"):
+        op.add_column(table, sa.Column("started_at", sa.DateTime(timezone=True)))
+        op.add_column(table, sa.Column("finished_at", sa.DateTime(timezone=True)))
+    op.create_index("ix_job_workspace_finished", "jobs", ["workspace_id", "finished_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_workspace_finished", table_name="jobs")
+    for table in ("jobs", "jobs_archive"):
+        op.drop_column(table, "finished_at")
+        op.drop_column(table, "started_at")
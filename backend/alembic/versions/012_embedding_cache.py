@@ -0,0 +1,34 @@
+"""Add embedding_cache keyed by (model, sha256 of chunk text).
+
+Revision ID: 012
+Revises: 011
+
+embed_and_store looks vectors up here before calling the embeddings API.
+The vector column has no fixed dimension so one table serves every model.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model", sa.String(100), primary_key=True),
+        sa.Column("text_hash", sa.String(64), primary_key=True),
+        sa.Column("embedding", Vector(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.create_index("ix_embedding_cache_last_used", "embedding_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_embedding_cache_last_used", table_name="embedding_cache")
+    op.drop_table("embedding_cache")
@@ -0,0 +1,26 @@
+"""Track chunk embedding state independently of the pgvector column.
+
+Revision ID: 013
+Revises: 012
+
+With `vector_store = "neo4j"` the pgvector column stays empty, so
+"needs embedding" can no longer be derived from `embedding IS NULL`.
+Existing embedded chunks are backfilled from created_at.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "013"
+down_revision = "012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("document_chunks", sa.Column("embedded_at", sa.DateTime(timezone=True)))
+    op.execute("UPDATE document_chunks SET embedded_at = created_at WHERE embedding IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column("document_chunks", "embedded_at")
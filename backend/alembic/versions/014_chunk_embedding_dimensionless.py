@@ -0,0 +1,40 @@
+"""Make document_chunks.embedding dimensionless; index via a cast expression.
+
+Revision ID: 014
+Revises: 013
+
+Allows shortened embeddings (settings.embedding_dimensions) and a halfvec
+index (settings.vector_quantization). HNSW needs a fixed dimension, so the
+index is built on a cast expression; this migration recreates the default
+(1536-dim, full precision) index, and `python -m app.scripts.pgvector_init`
+rebuilds it for other settings.
+"""
+
+from alembic import op
+
+revision = "014"
+down_revision = "013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS chunks_embedding_hnsw_idx")
+    op.execute("ALTER TABLE document_chunks ALTER COLUMN embedding TYPE vector")
+    op.execute("""
+        CREATE INDEX chunks_embedding_hnsw_idx
+        ON document_chunks
+        USING hnsw ((embedding::vector(1536)) vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS chunks_embedding_hnsw_idx")
+    op.execute("ALTER TABLE document_chunks ALTER COLUMN embedding TYPE vector(1536)")
+    op.execute("""
+        CREATE INDEX chunks_embedding_hnsw_idx
+        ON document_chunks
+        USING hnsw (embedding vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+    """)
@@ -0,0 +1,42 @@
+"""Per-workspace embedding provider; per-size partial pgvector index.
+
+Revision ID: 015
+Revises: 014
+
+Workspaces may embed with a different provider (and vector size) than the
+deployment default. The HNSW index from 014 casts every row to
+vector(1536), which would reject rows of another size, so it is replaced by
+a partial index over 1536-dim rows only. `python -m app.scripts.pgvector_init`
+adds indexes for other sizes.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "015"
+down_revision = "014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("workspaces", sa.Column("embedding_provider", sa.String(50)))
+    op.execute("DROP INDEX IF EXISTS chunks_embedding_hnsw_idx")
+    op.execute("""
+        CREATE INDEX chunks_embedding_hnsw_1536_idx
+        ON document_chunks
+        USING hnsw ((embedding::vector(1536)) vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+        WHERE vector_dims(embedding) = 1536
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS chunks_embedding_hnsw_1536_idx")
+    op.execute("""
+        CREATE INDEX chunks_embedding_hnsw_idx
+        ON document_chunks
+        USING hnsw ((embedding::vector(1536)) vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+    """)
+    op.drop_column("workspaces", "embedding_provider")
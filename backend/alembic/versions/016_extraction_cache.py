@@ -0,0 +1,34 @@
+"""Add extraction_cache keyed by (model, prompt version, sha256 of chunk text).
+
+Revision ID: 016
+Revises: 015
+
+Map-reduce entity extraction looks per-chunk LLM results up here so
+unchanged chunks are not re-extracted.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "016"
+down_revision = "015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "extraction_cache",
+        sa.Column("model", sa.String(100), primary_key=True),
+        sa.Column("prompt_version", sa.String(32), primary_key=True),
+        sa.Column("text_hash", sa.String(64), primary_key=True),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.create_index("ix_extraction_cache_last_used", "extraction_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extraction_cache_last_used", table_name="extraction_cache")
+    op.drop_table("extraction_cache")
@@ -0,0 +1,22 @@
+"""add BATCH_SUBMIT and BATCH_POLL to job_type_enum
+
+Revision ID: 017
+Revises: 016
+"""
+
+from alembic import op
+
+revision = "017"
+down_revision = "016"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE job_type_enum ADD VALUE IF NOT EXISTS 'BATCH_SUBMIT'")
+    op.execute("ALTER TYPE job_type_enum ADD VALUE IF NOT EXISTS 'BATCH_POLL'")
+
+
+def downgrade() -> None:
+    # PostgreSQL doesn't support removing enum values directly
+    pass
@@ -0,0 +1,47 @@
+"""Scope extraction_cache rows by workspace.
+
+Revision ID: 018
+Revises: 017
+
+Whole-document entries are keyed by the rendered LLM input, which depends on
+the workspace (pre-extraction trims it with the workspace's gazetteer), and
+results must not be shared across tenants. Cached results are disposable, so
+the table is recreated rather than backfilled.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "018"
+down_revision = "017"
+branch_labels = None
+depends_on = None
+
+
+def _create_table(*key: sa.Column) -> None:
+    op.create_table(
+        "extraction_cache",
+        *key,
+        sa.Column("model", sa.String(100), primary_key=True),
+        sa.Column("prompt_version", sa.String(32), primary_key=True),
+        sa.Column("text_hash", sa.String(64), primary_key=True),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+    )
+    op.create_index("ix_extraction_cache_last_used", "extraction_cache", ["last_used_at"])
+
+
+def _drop_table() -> None:
+    op.drop_index("ix_extraction_cache_last_used", table_name="extraction_cache")
+    op.drop_table("extraction_cache")
+
+
+def upgrade() -> None:
+    _drop_table()
+    _create_table(sa.Column("workspace_id", sa.UUID(), primary_key=True))
+
+
+def downgrade() -> None:
+    _drop_table()
+    _create_table()
@@ -17,7 +17,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.db import get_async_session
 from app.jobs.enqueue import enqueue_job
-from app.models import Document, JobType, SourceType
+from app.models import Document, JobPriority, JobType, SourceType
 
 router = APIRouter(prefix="/v1/ingest", tags=["ingest"])
 
@@ -43,6 +43,18 @@ class IngestDocumentResponse(BaseModel):
 
 @router.post("/document", response_model=IngestDocumentResponse, status_code=200)
 async def ingest_document(body: IngestDocumentRequest):
+    return await store_document(body, priority=JobPriority.interactive)
+
+
+async def store_document(
+    body: IngestDocumentRequest, priority: JobPriority, process: bool = True
+) -> IngestDocumentResponse:
+    """Upsert a document and enqueue its processing pipeline at the given priority.
+
+    Live ingests (API, webhooks) use JobPriority.interactive; backfills use
+    JobPriority.bulk so they yield to live traffic. With process=False the
+    caller schedules processing itself (Batch API backfills).
+    """
     content_hash = hashlib.sha256(body.content_text.encode()).hexdigest()
 
     Session = get_async_session()
@@ -92,7 +104,8 @@ async def ingest_document(body: IngestDocumentRequest):
         await session.commit()
 
     # Enqueue processing pipeline
-    await enqueue_job(body.workspace_id, JobType.PROCESS_DOCUMENT, {"document_id": str(doc_id)})
+    if process:
+        await enqueue_job(body.workspace_id, JobType.PROCESS_DOCUMENT, {"document_id": str(doc_id)}, priority=priority)
 
     status = "updated" if row else "created"
     return IngestDocumentResponse(document_id=doc_id, status=status)
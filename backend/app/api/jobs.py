@@ -1,15 +1,22 @@
 """
 Job observability endpoints.
+
+Counts combine the live `jobs` table with `job_stats_rollup`, which holds the
+totals of jobs already moved to `jobs_archive` by the retention sweep.
+Throughput and latency percentiles come from the live table's
+started_at/finished_at timings; per-worker histograms are exported on the
+worker's Prometheus endpoint (see app.jobs.metrics).
 """
 
 import uuid
+from datetime import UTC, datetime, timedelta
 
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 from sqlalchemy import func, select
 
 from app.db import get_async_session
-from app.models import Job, JobStatus
+from app.models import Job, JobStatsRollup, JobStatus
 
 router = APIRouter(prefix="/v1/jobs", tags=["jobs"])
 
@@ -33,27 +40,35 @@ class JobStatsResponse(BaseModel):
 async def job_stats(workspace_id: uuid.UUID = Query(...)):
     Session = get_async_session()
     async with Session() as session:
-        # Grouped stats
+        # Live jobs (only recent history; older rows are archived)
         result = await session.execute(
             select(Job.type, Job.status, func.count())
             .where(Job.workspace_id == workspace_id)
             .group_by(Job.type, Job.status)
-            .order_by(Job.type, Job.status)
         )
-        rows = result.fetchall()
+        live_rows = result.fetchall()
 
-        # Totals by status
-        totals = await session.execute(
-            select(Job.status, func.count()).where(Job.workspace_id == workspace_id).group_by(Job.status)
+        # Archived totals
+        result = await session.execute(
+            select(JobStatsRollup.type, JobStatsRollup.status, JobStatsRollup.count).where(
+                JobStatsRollup.workspace_id == workspace_id
+            )
         )
-        total_map = {str(r[0].value): r[1] for r in totals.fetchall()}
+        archived_rows = result.fetchall()
+
+    counts: dict[tuple[str, str], int] = {}
+    for job_type, status, count in [*live_rows, *archived_rows]:
+        key = (job_type.value, status.value)
+        counts[key] = counts.get(key, 0) + count
 
-    stats = [JobStats(type=r[0].value, status=r[1].value, count=r[2]) for r in rows]
-    total = sum(s.count for s in stats)
+    stats = [JobStats(type=t, status=st, count=c) for (t, st), c in sorted(counts.items())]
+    total_map: dict[str, int] = {}
+    for st in stats:
+        total_map[st.status] = total_map.get(st.status, 0) + st.count
 
     return JobStatsResponse(
         stats=stats,
-        total=total,
+        total=sum(total_map.values()),
         queued=total_map.get("queued", 0),
         running=total_map.get("running", 0),
         done=total_map.get("done", 0),
@@ -84,3 +99,76 @@ async def failed_jobs(workspace_id: uuid.UUID = Query(...), limit: int = Query(2
         rows = result.fetchall()
 
     return [FailedJob(id=r.id, type=r.type.value, last_error=r.last_error, attempts=r.attempts) for r in rows]
+
+
+class JobThroughput(BaseModel):
+    type: str
+    done: int
+    failed: int
+    per_minute: float
+    queue_wait_p50: float | None
+    queue_wait_p95: float | None
+    run_time_p50: float | None
+    run_time_p95: float | None
+    avg_attempts: float | None
+
+
+class JobThroughputResponse(BaseModel):
+    window_minutes: int
+    types: list[JobThroughput]
+
+
+@router.get("/throughput", response_model=JobThroughputResponse)
+async def job_throughput(
+    workspace_id: uuid.UUID = Query(...),
+    window_minutes: int = Query(60, ge=1, le=1440),
+):
+    """Per-type completions and latency percentiles (seconds) over the last window."""
+    since = datetime.now(UTC) - timedelta(minutes=window_minutes)
+    # Retries become runnable at run_after, not created_at
+    queue_wait = func.extract("epoch", Job.started_at - func.coalesce(Job.run_after, Job.created_at))
+    run_time = func.extract("epoch", Job.finished_at - Job.started_at)
+
+    Session = get_async_session()
+    async with Session() as session:
+        result = await session.execute(
+            select(
+                Job.type,
+                func.count().filter(Job.status == JobStatus.done).label("done"),
+                func.count().filter(Job.status == JobStatus.failed).label("failed"),
+                func.percentile_cont(0.5).within_group(queue_wait).label("queue_wait_p50"),
+                func.percentile_cont(0.95).within_group(queue_wait).label("queue_wait_p95"),
+                func.percentile_cont(0.5).within_group(run_time).label("run_time_p50"),
+                func.percentile_cont(0.95).within_group(run_time).label("run_time_p95"),
+                func.avg(Job.attempts).label("avg_attempts"),
+            )
+            .where(
+                Job.workspace_id == workspace_id,
+                Job.status.in_([JobStatus.done, JobStatus.failed]),
+                Job.finished_at >= since,
+            )
+            .group_by(Job.type)
+            .order_by(Job.type)
+        )
+        rows = result.fetchall()
+
+    def _num(value) -> float | None:
+        return round(float(value), 3) if value is not None else None
+
+    return JobThroughputResponse(
+        window_minutes=window_minutes,
+        types=[
+            JobThroughput(
+                type=r.type.value,
+                done=r.done,
+                failed=r.failed,
+                per_minute=round((r.done + r.failed) / window_minutes, 3),
+                queue_wait_p50=_num(r.queue_wait_p50),
+                queue_wait_p95=_num(r.queue_wait_p95),
+                run_time_p50=_num(r.run_time_p50),
+                run_time_p95=_num(r.run_time_p95),
+                avg_attempts=_num(r.avg_attempts),
+            )
+            for r in rows
+        ],
+    )
@@ -13,10 +13,9 @@ import logging
 import uuid
 
 from fastapi import APIRouter
-from openai import AsyncOpenAI
 from pydantic import BaseModel
 
-from app.config import settings
+from app.openai_client import get_openai_client
 from app.processing.context_builder import build_context
 
 logger = logging.getLogger(__name__)
@@ -132,7 +131,7 @@ async def query(body: QueryRequest):
     # 5. LLM answer with citations
     context_text = _build_context_prompt(chunks, facts)
 
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+    client = get_openai_client()
     resp = await client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -15,8 +15,9 @@ from sqlalchemy import insert, select
 
 from app.config import settings
 from app.db import get_async_session
-from app.api.ingest import IngestDocumentRequest, ingest_document
-from app.models import ContextVault, SourceConnection, SourceType, VaultSourceConnection
+from app.api.ingest import IngestDocumentRequest, store_document
+from app.jobs.enqueue import enqueue_job
+from app.models import ContextVault, JobPriority, JobType, SourceConnection, SourceType, VaultSourceConnection
 from app.nango.client import list_records
 from app.nango.content import fetch_drive_content_map, fetch_notion_content_map
 from app.nango.normalizers import NORMALIZERS, normalize_google_drive, normalize_notion
@@ -286,14 +287,22 @@ async def list_connections(workspace_id: uuid.UUID):
 class BackfillResponse(BaseModel):
     fetched: int
     ingested: int
+    batch_jobs: int = 0
 
 
 @router.post("/{source_type}/backfill", response_model=BackfillResponse)
-async def backfill(source_type: SourceType, workspace_id: uuid.UUID):
+async def backfill(source_type: SourceType, workspace_id: uuid.UUID, batch_api: bool | None = None):
     """
     Fetch all existing records from Nango for a source and ingest them.
     Pass workspace_id as query param.
+
+    With batch_api (default: settings.backfill_batch_api) new and changed
+    documents are processed through the OpenAI Batch API, see
+    app.processing.batch_api.
     """
+    if batch_api is None:
+        batch_api = settings.backfill_batch_api
+
     Session = get_async_session()
     async with Session() as session:
         result = await session.execute(
@@ -341,18 +350,28 @@ async def backfill(source_type: SourceType, workspace_id: uuid.UUID):
         normalizer = NORMALIZERS[provider_key]
         docs = normalizer(records)
 
+    # Backfill jobs run at bulk priority so live ingests from other tenants overtake them
     ingested = 0
+    pending: list[str] = []
     for doc in docs:
         if not doc.get("content_text"):
             continue
-        await ingest_document(
-            IngestDocumentRequest(
-                workspace_id=workspace_id,
-                source_connection_id=conn.id,
-                **doc
-            )
+        stored = await store_document(
+            IngestDocumentRequest(workspace_id=workspace_id, source_connection_id=conn.id, **doc),
+            priority=JobPriority.bulk,
+            process=not batch_api,
         )
         ingested += 1
+        if batch_api and stored.status != "unchanged":
+            pending.append(str(stored.document_id))
+
+    batch_jobs = 0
+    size = settings.batch_api_docs_per_job
+    for i in range(0, len(pending), size):
+        await enqueue_job(
+            workspace_id, JobType.BATCH_SUBMIT, {"document_ids": pending[i : i + size]}, priority=JobPriority.bulk
+        )
+        batch_jobs += 1
 
-    logger.info("Backfill: ingested %d documents", ingested)
-    return BackfillResponse(fetched=len(records), ingested=ingested)
+    logger.info("Backfill: ingested %d documents (%d batch submit jobs)", ingested, batch_jobs)
+    return BackfillResponse(fetched=len(records), ingested=ingested, batch_jobs=batch_jobs)
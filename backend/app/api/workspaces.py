@@ -1,30 +1,42 @@
 import uuid
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import insert, select
 
 from app.db import get_async_session
 from app.models import ContextVault, Workspace
+from app.processing.embedding_providers import EMBEDDING_PROVIDERS
 
 router = APIRouter(prefix="/v1/workspaces", tags=["workspaces"])
 
 
 class WorkspaceCreate(BaseModel):
     name: str
+    # None = deployment default (settings.embedding_provider)
+    embedding_provider: str | None = None
 
 
 class WorkspaceOut(BaseModel):
     id: uuid.UUID
     name: str
+    embedding_provider: str | None = None
 
 
 @router.post("", response_model=WorkspaceOut, status_code=201)
 async def create_workspace(body: WorkspaceCreate):
+    if body.embedding_provider is not None and body.embedding_provider not in EMBEDDING_PROVIDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown embedding provider {body.embedding_provider!r}; expected one of {sorted(EMBEDDING_PROVIDERS)}",
+        )
+
     Session = get_async_session()
     ws_id = uuid.uuid4()
     async with Session() as session:
-        await session.execute(insert(Workspace).values(id=ws_id, name=body.name))
+        await session.execute(
+            insert(Workspace).values(id=ws_id, name=body.name, embedding_provider=body.embedding_provider)
+        )
         # Auto-create Default vault
         await session.execute(
             insert(ContextVault).values(
@@ -35,7 +47,7 @@ async def create_workspace(body: WorkspaceCreate):
             )
         )
         await session.commit()
-    return WorkspaceOut(id=ws_id, name=body.name)
+    return WorkspaceOut(id=ws_id, name=body.name, embedding_provider=body.embedding_provider)
 
 
 @router.get("", response_model=list[WorkspaceOut])
@@ -44,4 +56,4 @@ async def list_workspaces():
     async with Session() as session:
         result = await session.execute(select(Workspace))
         rows = result.scalars().all()
-    return [WorkspaceOut(id=r.id, name=r.name) for r in rows]
+    return [WorkspaceOut(id=r.id, name=r.name, embedding_provider=r.embedding_provider) for r in rows]
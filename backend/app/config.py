@@ -16,6 +16,9 @@ class Settings(BaseSettings):
 
     # OpenAI
     openai_api_key: str = ""
+    openai_base_url: str = ""  # OpenAI-compatible endpoint override (proxy, local server)
+    openai_embedding_rpm: int = 3000  # Embedding request budget per minute (0 = unlimited)
+    openai_embedding_tpm: int = 1_000_000  # Embedding token budget per minute (0 = unlimited)
 
     # Nango
     nango_secret_key: str = ""
@@ -29,6 +32,64 @@ class Settings(BaseSettings):
     supabase_service_key: str = ""  # Service role key for storage access
     supabase_storage_bucket: str = "temp-files"
 
+    # Job worker
+    worker_concurrency: int = 1  # Jobs in flight per worker process (1 = sequential)
+    worker_type_concurrency: dict[str, int] = {}  # Per-JobType caps, e.g. {"UPSERT_GRAPH": 2}
+    worker_claim_batch: int = 10  # Max jobs leased per claim round trip
+    worker_drain_timeout: float = 60.0  # Seconds to wait for in-flight jobs on SIGTERM
+    worker_metrics_port: int = 0  # Serve Prometheus /metrics from the worker on this port (0 = off)
+    pipeline_fused: bool = False  # Run chunk→embed and extract→graph inside PROCESS_DOCUMENT
+    job_lease_seconds: int = 300  # Lease per claimed job; extended by heartbeat, reaped when expired
+    job_retention_done_hours: int = 24  # Done jobs older than this move to jobs_archive
+    job_retention_failed_days: int = 7  # Failed jobs stay visible in /v1/jobs/failed this long
+
+    # Embeddings: texts from concurrent jobs are packed into shared requests
+    embedding_batch_wait_ms: int = 50  # Max time a text waits for others to join its request
+    embedding_batch_concurrency: int = 4  # Embedding requests in flight per worker process
+    embedding_cache_max_rows: int = 2_000_000  # LRU-evicted beyond this (0 = cache disabled)
+
+    # Entity extraction: "map_reduce" extracts long documents chunk by chunk and
+    # merges the results; "truncate" only sends the first 8,000 characters
+    extraction_mode: str = "map_reduce"
+    extraction_concurrency: int = 8  # LLM calls in flight per document (and per batcher)
+    # Documents up to this many characters share requests with other short ones
+    # (0 = off; also off when worker_concurrency is 1, as no other document runs alongside)
+    extraction_batch_doc_chars: int = 2000
+    extraction_batch_max_docs: int = 10  # Documents packed into one request
+    extraction_batch_wait_ms: int = 200  # Max time a document waits for others to join its request
+    # Regex/gazetteer entities before the LLM; documents with less prose than this skip the LLM.
+    # Off by default: it saves tokens but lowers recall, since entities only named in stripped
+    # header/quoted-reply lines or in documents that skip the LLM are not extracted.
+    pre_extraction_enabled: bool = False
+    pre_extraction_min_llm_chars: int = 200
+    pre_extraction_gazetteer_max: int = 20_000  # Known names per entity type matched per workspace
+    extraction_cache_max_rows: int = 500_000  # LRU-evicted beyond this (0 = cache disabled)
+
+    # OpenAI Batch API bulk mode for backfills (see app.processing.batch_api)
+    backfill_batch_api: bool = False  # Default for POST /v1/sources/{source_type}/backfill?batch_api=
+    batch_api_docs_per_job: int = 500  # Documents per BATCH_SUBMIT job
+    batch_api_max_requests: int = 50_000  # Requests per batch input file (API limit)
+    batch_api_poll_seconds: int = 60  # Delay between BATCH_POLL checks
+
+    # Where chunk vectors are written: "neo4j", "pg" or "both"
+    vector_store: str = "both"
+    # Vector size/precision. Changing either requires re-embedding and re-running
+    # app.scripts.neo4j_init / app.scripts.pgvector_init.
+    embedding_provider: str = "openai"  # Default provider: "openai" or "local"; workspaces may override
+    embedding_dimensions: int = 1536  # OpenAI: < 1536 requests shortened vectors via the API's `dimensions`
+    local_embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"  # needs sentence-transformers
+    local_embedding_dimensions: int = 384  # Must match local_embedding_model's output size
+    local_embedding_batch_size: int = 64  # Texts per process-pool task
+    vector_quantization: str = "none"  # "halfvec": float16 pg index (column stays float32) + float32 Neo4j vectors
+    vector_rescore_factor: int = 4  # Quantized pg search fetches top_k * factor, rescored at full precision
+
+    # Chunk and embedding writes: "copy" (COPY via asyncpg) or "executemany"
+    chunk_write_mode: str = "copy"
+
+    # CPU-bound work (file extraction, chunking) runs in a process pool
+    cpu_pool_workers: int = 0  # 0 = one worker per CPU core
+    cpu_pool_task_timeout: float = 300.0  # Seconds before a task is killed
+
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
@@ -1,24 +1,70 @@
-"""Helper to enqueue jobs into the Postgres job table."""
+"""Helper to enqueue jobs into the Postgres job table.
+
+Jobs may carry a dedup_key. A partial unique index over queued/running jobs
+(uq_job_dedup_active) makes a second enqueue with the same key a no-op via
+INSERT ... ON CONFLICT DO NOTHING, so dedup is an index probe instead of a
+scan over payload_json.
+
+Without an explicit priority, jobs enqueued from inside a handler inherit the
+priority of the job being run, so a bulk backfill's downstream stages stay bulk.
+"""
 
 import uuid
+from datetime import datetime
 
-from sqlalchemy import insert
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.db import get_async_session
-from app.models import Job, JobType
+from app.jobs.notify import notify_job_queued
+from app.jobs.runner import current_job
+from app.models import Job, JobPriority, JobType
+
+# Must match the predicate of the uq_job_dedup_active partial index
+ACTIVE_DEDUP_WHERE = text("dedup_key IS NOT NULL AND status IN ('queued', 'running')")
+
 
+def document_dedup_key(job_type: JobType, document_id: uuid.UUID | str) -> str:
+    """Dedup key for per-document stages: at most one active job per (type, document)."""
+    return f"{job_type.value}:{document_id}"
+
+
+async def enqueue_job(
+    workspace_id: uuid.UUID,
+    job_type: JobType,
+    payload: dict,
+    dedup_key: str | None = None,
+    priority: int | None = None,
+    run_after: datetime | None = None,
+) -> uuid.UUID | None:
+    """Insert a job and wake idle workers.
+
+    `run_after` defers the job (e.g. polling an external batch).
+    Returns the new job id, or None if an active job with the same dedup_key exists.
+    """
+    if priority is None:
+        parent = current_job.get()
+        priority = parent["priority"] if parent else JobPriority.interactive
 
-async def enqueue_job(workspace_id: uuid.UUID, job_type: JobType, payload: dict) -> uuid.UUID:
     Session = get_async_session()
     job_id = uuid.uuid4()
+    stmt = pg_insert(Job).values(
+        id=job_id,
+        workspace_id=workspace_id,
+        type=job_type,
+        payload_json=payload,
+        dedup_key=dedup_key,
+        priority=priority,
+        run_after=run_after,
+    )
+    if dedup_key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["dedup_key"], index_where=ACTIVE_DEDUP_WHERE)
+
     async with Session() as session:
-        await session.execute(
-            insert(Job).values(
-                id=job_id,
-                workspace_id=workspace_id,
-                type=job_type,
-                payload_json=payload,
-            )
-        )
+        result = await session.execute(stmt.returning(Job.id))
+        if result.scalar_one_or_none() is None:
+            return None
+        # Wake idle workers as soon as the row is committed
+        await notify_job_queued(session, job_type)
         await session.commit()
     return job_id
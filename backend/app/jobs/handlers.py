@@ -1,62 +1,36 @@
 """
 Job type handlers. Each handler receives (workspace_id, payload_json).
+
+The stage bodies (_chunk_stage, _extract_stage, _upsert_stage) are shared by the
+per-stage handlers and by the fused pipeline: with `settings.pipeline_fused`,
+PROCESS_DOCUMENT loads the document once and runs chunk → embed and
+extract → graph in memory. Intermediate job rows are only written when a stage
+fails, so that stage is retried through the regular queue.
 """
 
+import asyncio
 import logging
+import time
 import uuid
 
-from sqlalchemy import delete, func, insert, select
+from sqlalchemy import delete, insert, select, update
 
+from app.config import settings
 from app.db import get_async_session
-from app.jobs.runner import register_handler
-from app.models import Document, DocumentChunk, EntityMention, Job, JobStatus, JobType
+from app.jobs.retention import ARCHIVE_INTERVAL, archive_finished_jobs
+from app.jobs.runner import current_job, register_handler, register_periodic
+from app.models import Document, DocumentChunk, EntityMention, Job, JobType
+from app.processing.batch_api import CHAT_ENDPOINT, EMBEDDINGS_ENDPOINT
+from app.processing.embedding_cache import evict_embedding_cache
+from app.processing.extraction import purge_stale_extraction_cache
+from app.processing.extraction_cache import STALE_PURGE_INTERVAL, evict_extraction_cache
+from app.processing.hash_cache import EVICT_INTERVAL
 
 logger = logging.getLogger(__name__)
 
 
-async def _has_pending_job(workspace_id: uuid.UUID, job_type: JobType, document_id: str) -> bool:
-    """Check if a queued/running job already exists for this document + type."""
+async def _load_document(workspace_id: uuid.UUID, document_id: uuid.UUID) -> Document | None:
     Session = get_async_session()
-    async with Session() as session:
-        result = await session.execute(
-            select(func.count())
-            .select_from(Job)
-            .where(
-                Job.workspace_id == workspace_id,
-                Job.type == job_type,
-                Job.status.in_([JobStatus.queued, JobStatus.running]),
-                Job.payload_json["document_id"].as_string() == document_id,
-            )
-        )
-        return bool(result.scalar_one() > 0)
-
-
-async def handle_process_document(workspace_id: uuid.UUID, payload: dict) -> None:
-    """Fan-out: enqueue CHUNK_DOCUMENT + EXTRACT_ENTITIES_RELATIONS for a document."""
-    from app.jobs.enqueue import enqueue_job
-
-    document_id = payload["document_id"]
-    logger.info("PROCESS_DOCUMENT doc=%s", document_id)
-
-    # Idempotency: skip if jobs already queued for this document
-    for jt in (JobType.CHUNK_DOCUMENT, JobType.EXTRACT_ENTITIES_RELATIONS):
-        if not await _has_pending_job(workspace_id, jt, document_id):
-            await enqueue_job(workspace_id, jt, {"document_id": document_id})
-        else:
-            logger.info("PROCESS_DOCUMENT: skipping %s (already queued) doc=%s", jt.value, document_id)
-
-
-async def handle_chunk_document(workspace_id: uuid.UUID, payload: dict) -> None:
-    """Chunk document text, store chunks, enqueue EMBED_CHUNKS."""
-    from app.jobs.enqueue import enqueue_job
-    from app.processing.chunker import chunk_text
-
-    document_id = uuid.UUID(payload["document_id"])
-    logger.info("CHUNK_DOCUMENT doc=%s", document_id)
-
-    Session = get_async_session()
-
-    # Fetch document content
     async with Session() as session:
         result = await session.execute(
             select(Document).where(
@@ -64,83 +38,110 @@ async def handle_chunk_document(workspace_id: uuid.UUID, payload: dict) -> None:
                 Document.workspace_id == workspace_id,
             )
         )
-        doc = result.scalar_one_or_none()
+        doc: Document | None = result.scalar_one_or_none()
+        return doc
 
-    if not doc or not doc.content_text:
-        logger.warning("CHUNK_DOCUMENT: no content for doc=%s", document_id)
-        return
 
-    chunks = chunk_text(doc.content_text)
+async def _chunk_stage(workspace_id: uuid.UUID, doc: Document) -> list[DocumentChunk]:
+    """
+    Re-chunk document text and apply only the difference to its stored chunks.
+
+    Chunks whose text is unchanged keep their row (id, embedding, Neo4j node,
+    citations) and only get their idx/offsets moved; removed chunks are deleted
+    and new ones inserted. Returns the chunks that still need an embedding.
+    """
+    from app.processing.chunk_store import insert_chunks
+    from app.processing.chunker import StoredChunk, chunk_text, diff_chunks
+    from app.processing.cpu_pool import CPU_OFFLOAD_MIN_CHARS, run_cpu_bound
+    from app.processing.vector_store import get_vector_stores
+
+    content = doc.content_text or ""
+    if len(content) < CPU_OFFLOAD_MIN_CHARS:
+        chunks = chunk_text(content)
+    else:
+        chunks = await run_cpu_bound(chunk_text, content)
     if not chunks:
-        logger.info("CHUNK_DOCUMENT: no chunks produced for doc=%s", document_id)
-        return
+        logger.info("CHUNK_DOCUMENT: no chunks produced for doc=%s", doc.id)
+        return []
 
-    # Delete existing chunks for this document (re-processing support)
+    Session = get_async_session()
     async with Session() as session:
-        await session.execute(
-            delete(DocumentChunk).where(
+        result = await session.execute(
+            select(
+                DocumentChunk.id,
+                DocumentChunk.text,
+                DocumentChunk.start_offset,
+                DocumentChunk.embedded_at.is_(None).label("unembedded"),
+            ).where(
                 DocumentChunk.workspace_id == workspace_id,
-                DocumentChunk.document_id == document_id,
+                DocumentChunk.document_id == doc.id,
             )
         )
-        for ch in chunks:
+        existing = result.fetchall()
+        unembedded = {r.id for r in existing if r.unembedded}
+        diff = diff_chunks([StoredChunk(r.id, r.text, r.start_offset) for r in existing], chunks)
+
+        if diff.removed:
+            await session.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(diff.removed)))
+        if diff.kept:
             await session.execute(
-                insert(DocumentChunk).values(
-                    id=uuid.uuid4(),
-                    workspace_id=workspace_id,
-                    document_id=document_id,
-                    idx=ch.idx,
-                    text=ch.text,
-                    start_offset=ch.start_offset,
-                    end_offset=ch.end_offset,
-                )
+                update(DocumentChunk),
+                [
+                    {"id": chunk_id, "idx": ch.idx, "start_offset": ch.start_offset, "end_offset": ch.end_offset}
+                    for chunk_id, ch in diff.kept
+                ],
+            )
+        added = [
+            DocumentChunk(
+                id=uuid.uuid4(),
+                workspace_id=workspace_id,
+                document_id=doc.id,
+                idx=ch.idx,
+                text=ch.text,
+                start_offset=ch.start_offset,
+                end_offset=ch.end_offset,
             )
+            for ch in diff.added
+        ]
+        await insert_chunks(session, added)
         await session.commit()
 
-    logger.info("CHUNK_DOCUMENT: stored %d chunks for doc=%s", len(chunks), document_id)
-
-    await enqueue_job(workspace_id, JobType.EMBED_CHUNKS, {"document_id": str(document_id)})
-
-
-async def handle_embed_chunks(workspace_id: uuid.UUID, payload: dict) -> None:
-    """Embed chunks via OpenAI and store vectors in pgvector."""
-    from app.processing.embeddings import embed_and_store
+    kept = [
+        DocumentChunk(
+            id=chunk_id,
+            workspace_id=workspace_id,
+            document_id=doc.id,
+            idx=ch.idx,
+            text=ch.text,
+            start_offset=ch.start_offset,
+            end_offset=ch.end_offset,
+        )
+        for chunk_id, ch in diff.kept
+    ]
 
-    document_id = uuid.UUID(payload["document_id"])
-    logger.info("EMBED_CHUNKS doc=%s", document_id)
+    # Drop vectors of removed chunks and move kept ones to their new positions
+    for store in get_vector_stores():
+        await store.sync_chunks(workspace_id, doc.id, kept)
 
-    count = await embed_and_store(workspace_id, document_id)
-    logger.info("EMBED_CHUNKS: embedded %d chunks for doc=%s", count, document_id)
+    logger.info(
+        "CHUNK_DOCUMENT: doc=%s kept %d, added %d, removed %d chunks",
+        doc.id,
+        len(diff.kept),
+        len(added),
+        len(diff.removed),
+    )
+    return sorted(added + [c for c in kept if c.id in unembedded], key=lambda c: c.idx)
 
 
-async def handle_extract_entities_relations(workspace_id: uuid.UUID, payload: dict) -> None:
-    """LLM extraction of entities + relations, entity resolution, store mentions, enqueue graph upsert."""
-    from app.jobs.enqueue import enqueue_job
+async def _extract_stage(workspace_id: uuid.UUID, doc: Document) -> dict | None:
+    """LLM extraction + entity resolution + mention storage. Returns the UPSERT_GRAPH payload."""
     from app.processing.entity_resolution import resolve_entity_key
     from app.processing.extraction import extract_entities_relations
 
-    document_id = uuid.UUID(payload["document_id"])
-    logger.info("EXTRACT_ENTITIES_RELATIONS doc=%s", document_id)
-
-    Session = get_async_session()
-
-    # Fetch document
-    async with Session() as session:
-        result = await session.execute(
-            select(Document).where(
-                Document.id == document_id,
-                Document.workspace_id == workspace_id,
-            )
-        )
-        doc = result.scalar_one_or_none()
-
-    if not doc or not doc.content_text:
-        logger.warning("EXTRACT: no content for doc=%s", document_id)
-        return
-
     # Extract entities and relations via LLM
     data = await extract_entities_relations(
-        content_text=doc.content_text,
+        workspace_id,
+        content_text=doc.content_text or "",
         title=doc.title or "",
         author_name=doc.author_name or "",
         author_email=doc.author_email or "",
@@ -151,8 +152,8 @@ async def handle_extract_entities_relations(workspace_id: uuid.UUID, payload: di
     relations = data.get("relations", [])
 
     if not entities:
-        logger.info("EXTRACT: no entities found for doc=%s", document_id)
-        return
+        logger.info("EXTRACT: no entities found for doc=%s", doc.id)
+        return None
 
     # Resolve entity keys
     entity_keys = {}
@@ -161,12 +162,13 @@ async def handle_extract_entities_relations(workspace_id: uuid.UUID, payload: di
         entity_keys[ent.get("name", "")] = key
 
     # Store entity mentions in Postgres
+    Session = get_async_session()
     async with Session() as session:
         # Delete existing mentions for re-processing
         await session.execute(
             delete(EntityMention).where(
                 EntityMention.workspace_id == workspace_id,
-                EntityMention.document_id == document_id,
+                EntityMention.document_id == doc.id,
             )
         )
         for ent in entities:
@@ -175,7 +177,7 @@ async def handle_extract_entities_relations(workspace_id: uuid.UUID, payload: di
                 insert(EntityMention).values(
                     id=uuid.uuid4(),
                     workspace_id=workspace_id,
-                    document_id=document_id,
+                    document_id=doc.id,
                     entity_key=entity_keys.get(name, ""),
                     entity_type=ent.get("type", "unknown"),
                     entity_name=name,
@@ -188,29 +190,19 @@ async def handle_extract_entities_relations(workspace_id: uuid.UUID, payload: di
         "EXTRACT: %d entities, %d relations for doc=%s",
         len(entities),
         len(relations),
-        document_id,
-    )
-
-    # Enqueue graph upsert with extracted data
-    await enqueue_job(
-        workspace_id,
-        JobType.UPSERT_GRAPH,
-        {
-            "document_id": str(document_id),
-            "source_connection_id": str(doc.source_connection_id),
-            "entities": entities,
-            "relations": relations,
-            "entity_keys": entity_keys,
-        },
+        doc.id,
     )
 
+    return {
+        "document_id": str(doc.id),
+        "source_connection_id": str(doc.source_connection_id),
+        "entities": entities,
+        "relations": relations,
+        "entity_keys": entity_keys,
+    }
 
-async def handle_upsert_graph(workspace_id: uuid.UUID, payload: dict) -> None:
-    """Upsert extracted entities/relations into Neo4j.
 
-    The graph is now unified (no vault filtering on edges), but source_connection_id
-    is stored on Document nodes to enable vault filtering during queries.
-    """
+async def _upsert_stage(workspace_id: uuid.UUID, payload: dict) -> None:
     from app.processing.graph import upsert_entities_and_relations
 
     document_id = uuid.UUID(payload["document_id"])
@@ -233,9 +225,334 @@ async def handle_upsert_graph(workspace_id: uuid.UUID, payload: dict) -> None:
     logger.info("UPSERT_GRAPH: done for doc=%s", document_id)
 
 
+# ---------------------------------------------------------------------------
+# Fused pipeline
+# ---------------------------------------------------------------------------
+
+
+async def _fused_chunk_embed(workspace_id: uuid.UUID, doc: Document) -> None:
+    """chunk → embed in memory; falls back to a queued job for whichever stage fails."""
+    from app.jobs.enqueue import document_dedup_key, enqueue_job
+    from app.processing.embeddings import embed_and_store
+
+    payload = {"document_id": str(doc.id)}
+    try:
+        chunks = await _chunk_stage(workspace_id, doc)
+    except Exception:
+        logger.exception("FUSED: chunk stage failed for doc=%s, enqueueing CHUNK_DOCUMENT", doc.id)
+        await enqueue_job(
+            workspace_id, JobType.CHUNK_DOCUMENT, payload, document_dedup_key(JobType.CHUNK_DOCUMENT, doc.id)
+        )
+        return
+
+    if not chunks:
+        return
+
+    try:
+        count = await embed_and_store(
+            workspace_id, doc.id, chunks=chunks, source_connection_id=doc.source_connection_id
+        )
+        logger.info("FUSED: embedded %d chunks for doc=%s", count, doc.id)
+    except Exception:
+        logger.exception("FUSED: embed stage failed for doc=%s, enqueueing EMBED_CHUNKS", doc.id)
+        await enqueue_job(workspace_id, JobType.EMBED_CHUNKS, payload, document_dedup_key(JobType.EMBED_CHUNKS, doc.id))
+
+
+async def _fused_extract_graph(workspace_id: uuid.UUID, doc: Document) -> None:
+    """extract → graph upsert in memory; falls back to a queued job for whichever stage fails."""
+    from app.jobs.enqueue import document_dedup_key, enqueue_job
+
+    try:
+        graph_payload = await _extract_stage(workspace_id, doc)
+    except Exception:
+        logger.exception("FUSED: extract stage failed for doc=%s, enqueueing EXTRACT_ENTITIES_RELATIONS", doc.id)
+        jt = JobType.EXTRACT_ENTITIES_RELATIONS
+        await enqueue_job(workspace_id, jt, {"document_id": str(doc.id)}, document_dedup_key(jt, doc.id))
+        return
+
+    if not graph_payload:
+        return
+
+    try:
+        await _upsert_stage(workspace_id, graph_payload)
+    except Exception:
+        logger.exception("FUSED: graph stage failed for doc=%s, enqueueing UPSERT_GRAPH", doc.id)
+        await enqueue_job(workspace_id, JobType.UPSERT_GRAPH, graph_payload)
+
+
+async def _process_document_fused(workspace_id: uuid.UUID, document_id: str) -> None:
+    doc = await _load_document(workspace_id, uuid.UUID(document_id))
+    if not doc or not doc.content_text:
+        logger.warning("PROCESS_DOCUMENT: no content for doc=%s", document_id)
+        return
+
+    await asyncio.gather(
+        _fused_chunk_embed(workspace_id, doc),
+        _fused_extract_graph(workspace_id, doc),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+
+
+async def handle_process_document(workspace_id: uuid.UUID, payload: dict) -> None:
+    """Fan-out: enqueue CHUNK_DOCUMENT + EXTRACT_ENTITIES_RELATIONS for a document.
+
+    In fused mode the whole pipeline runs inside this job instead.
+    """
+    from app.jobs.enqueue import document_dedup_key, enqueue_job
+
+    document_id = payload["document_id"]
+    logger.info("PROCESS_DOCUMENT doc=%s", document_id)
+
+    if settings.pipeline_fused:
+        await _process_document_fused(workspace_id, document_id)
+        return
+
+    # Idempotency: the dedup key makes this a no-op if a job is already queued/running
+    for jt in (JobType.CHUNK_DOCUMENT, JobType.EXTRACT_ENTITIES_RELATIONS):
+        job_id = await enqueue_job(workspace_id, jt, {"document_id": document_id}, document_dedup_key(jt, document_id))
+        if job_id is None:
+            logger.info("PROCESS_DOCUMENT: skipping %s (already queued) doc=%s", jt.value, document_id)
+
+
+async def handle_chunk_document(workspace_id: uuid.UUID, payload: dict) -> None:
+    """Chunk document text, store chunks, enqueue EMBED_CHUNKS."""
+    from app.jobs.enqueue import document_dedup_key, enqueue_job
+
+    document_id = uuid.UUID(payload["document_id"])
+    logger.info("CHUNK_DOCUMENT doc=%s", document_id)
+
+    doc = await _load_document(workspace_id, document_id)
+    if not doc or not doc.content_text:
+        logger.warning("CHUNK_DOCUMENT: no content for doc=%s", document_id)
+        return
+
+    chunks = await _chunk_stage(workspace_id, doc)
+    if not chunks:
+        return
+
+    await enqueue_job(
+        workspace_id,
+        JobType.EMBED_CHUNKS,
+        {"document_id": str(document_id)},
+        document_dedup_key(JobType.EMBED_CHUNKS, document_id),
+    )
+
+
+async def handle_embed_chunks(workspace_id: uuid.UUID, payload: dict) -> None:
+    """Embed a document's unembedded chunks and store their vectors.
+
+    Uses the workspace's embedding provider; vectors are written through the
+    configured vector store (`settings.vector_store`: pg, neo4j or both).
+    """
+    from app.processing.embeddings import embed_and_store
+
+    document_id = uuid.UUID(payload["document_id"])
+    logger.info("EMBED_CHUNKS doc=%s", document_id)
+
+    count = await embed_and_store(workspace_id, document_id)
+    logger.info("EMBED_CHUNKS: embedded %d chunks for doc=%s", count, document_id)
+
+
+async def handle_extract_entities_relations(workspace_id: uuid.UUID, payload: dict) -> None:
+    """LLM extraction of entities + relations, entity resolution, store mentions, enqueue graph upsert."""
+    from app.jobs.enqueue import enqueue_job
+
+    document_id = uuid.UUID(payload["document_id"])
+    logger.info("EXTRACT_ENTITIES_RELATIONS doc=%s", document_id)
+
+    doc = await _load_document(workspace_id, document_id)
+    if not doc or not doc.content_text:
+        logger.warning("EXTRACT: no content for doc=%s", document_id)
+        return
+
+    graph_payload = await _extract_stage(workspace_id, doc)
+    if not graph_payload:
+        return
+
+    # Enqueue graph upsert with extracted data
+    await enqueue_job(workspace_id, JobType.UPSERT_GRAPH, graph_payload)
+
+
+async def handle_upsert_graph(workspace_id: uuid.UUID, payload: dict) -> None:
+    """Upsert extracted entities/relations into Neo4j.
+
+    The graph is now unified (no vault filtering on edges), but source_connection_id
+    is stored on Document nodes to enable vault filtering during queries.
+    """
+    await _upsert_stage(workspace_id, payload)
+
+
+BATCH_DOWNSTREAM = {
+    CHAT_ENDPOINT: JobType.EXTRACT_ENTITIES_RELATIONS,
+    EMBEDDINGS_ENDPOINT: JobType.EMBED_CHUNKS,
+}
+
+
+async def _enqueue_batch_downstream(workspace_id: uuid.UUID, job_type: JobType, document_ids: list[str]) -> None:
+    from app.jobs.enqueue import document_dedup_key, enqueue_job
+
+    for document_id in document_ids:
+        await enqueue_job(
+            workspace_id, job_type, {"document_id": document_id}, document_dedup_key(job_type, document_id)
+        )
+
+
+async def _enqueue_batch_poll(workspace_id: uuid.UUID, payload: dict, dedup_key: str | None = None) -> None:
+    from datetime import UTC, datetime, timedelta
+
+    from app.jobs.enqueue import enqueue_job
+
+    run_after = datetime.now(UTC) + timedelta(seconds=settings.batch_api_poll_seconds)
+    await enqueue_job(workspace_id, JobType.BATCH_POLL, payload, dedup_key=dedup_key, run_after=run_after)
+
+
+async def _save_job_payload(payload: dict) -> None:
+    """Persist the running job's payload so that a retry sees what it recorded."""
+    job = current_job.get()
+    if job is None:
+        return
+    Session = get_async_session()
+    async with Session() as session:
+        await session.execute(update(Job).where(Job.id == job["id"]).values(payload_json=payload))
+        await session.commit()
+
+
+async def handle_batch_submit(workspace_id: uuid.UUID, payload: dict) -> None:
+    """Chunk documents and submit their uncached extraction and embedding requests to the Batch API.
+
+    See app.processing.batch_api. Endpoints with nothing to submit go straight to
+    the regular stage jobs.
+
+    Batches are paid for, so each endpoint's BATCH_POLL payload is saved to this
+    job's payload (under "submitted") as soon as its batches are created. A
+    retry polls those instead of submitting them again; chunking and planning
+    are idempotent and simply run again.
+    """
+    from app.processing.batch_api import BatchRequest, embedding_requests, submit_batches
+    from app.processing.embedding_providers import get_workspace_embedding_provider
+    from app.processing.extraction import plan_batch_extraction
+
+    document_ids = payload["document_ids"]
+    submitted: dict[str, dict] = payload.setdefault("submitted", {})
+    logger.info("BATCH_SUBMIT: %d documents ws=%s", len(document_ids), workspace_id)
+
+    # Keyed by custom_id: documents with the same input (and shared chunks) plan the same
+    # request, and the Batch API rejects input files with duplicate custom_ids
+    chat_requests: dict[str, BatchRequest] = {}
+    chunk_texts: list[str] = []
+    extract_ids: list[str] = []
+    embed_ids: list[str] = []
+    for document_id in document_ids:
+        doc = await _load_document(workspace_id, uuid.UUID(document_id))
+        if not doc or not doc.content_text:
+            logger.warning("BATCH_SUBMIT: no content for doc=%s", document_id)
+            continue
+
+        chunks = await _chunk_stage(workspace_id, doc)
+        if chunks:
+            chunk_texts.extend(c.text for c in chunks)
+            embed_ids.append(document_id)
+        if CHAT_ENDPOINT not in submitted:
+            for request in await plan_batch_extraction(
+                workspace_id,
+                content_text=doc.content_text,
+                title=doc.title or "",
+                author_name=doc.author_name or "",
+                author_email=doc.author_email or "",
+                source_type=doc.source_type.value if doc.source_type else "",
+            ):
+                chat_requests.setdefault(request.custom_id, request)
+        extract_ids.append(document_id)
+
+    provider = await get_workspace_embedding_provider(workspace_id)
+    batches = (
+        (CHAT_ENDPOINT, list(chat_requests.values()), extract_ids, None),
+        (EMBEDDINGS_ENDPOINT, await embedding_requests(provider, chunk_texts), embed_ids, provider.cache_key),
+    )
+    for endpoint, requests, ids, cache_key in batches:
+        poll_payload = submitted.get(endpoint)
+        if poll_payload is not None:
+            logger.info("BATCH_SUBMIT: %s already submitted as %s", endpoint, poll_payload["batch_ids"])
+        elif not ids:
+            continue
+        elif not requests:
+            await _enqueue_batch_downstream(workspace_id, BATCH_DOWNSTREAM[endpoint], ids)
+            continue
+        else:
+            batch_ids, expires_at = await submit_batches(endpoint, requests, {"workspace_id": str(workspace_id)})
+            poll_payload = {
+                "batch_ids": batch_ids,
+                "expires_at": expires_at,
+                "endpoint": endpoint,
+                "cache_key": cache_key,
+                "document_ids": ids,
+            }
+            submitted[endpoint] = poll_payload
+            await _save_job_payload(payload)
+            logger.info("BATCH_SUBMIT: %d requests to %s for %d documents", len(requests), endpoint, len(ids))
+
+        # A retry's poll is dropped while the first one is queued. Re-enqueued polls carry no
+        # key, so a duplicate poll is possible but harmless: caching and downstream jobs are idempotent
+        await _enqueue_batch_poll(
+            workspace_id, poll_payload, dedup_key=f"{JobType.BATCH_POLL.value}:{poll_payload['batch_ids'][0]}"
+        )
+
+
+async def handle_batch_poll(workspace_id: uuid.UUID, payload: dict) -> None:
+    """Check submitted batches; once all are done, fill the caches and enqueue the stage jobs.
+
+    Transient API errors re-enqueue the poll instead of failing the job, since
+    the batches are already paid for. Once the batches have expired the poll
+    gives up: whatever was fetched is cached and the stage jobs request the
+    rest synchronously.
+    """
+    from app.processing.batch_api import TERMINAL_STATUSES, TRANSIENT_ERRORS, cache_embedding_results, fetch_batch
+    from app.processing.extraction import cache_batch_extractions
+
+    endpoint = payload["endpoint"]
+    statuses = {}
+    results: dict[str, dict] = {}
+    try:
+        for batch_id in payload["batch_ids"]:
+            statuses[batch_id], batch_results = await fetch_batch(batch_id)
+            results.update(batch_results)
+    except TRANSIENT_ERRORS as e:
+        # Polls queued before expires_at was recorded give up on the first error
+        if time.time() < payload.get("expires_at", 0):
+            logger.warning("BATCH_POLL: %s, retrying in %ds", e, settings.batch_api_poll_seconds)
+            await _enqueue_batch_poll(workspace_id, payload)
+            return
+        logger.error("BATCH_POLL: %s after the batches expired, giving up on %s", e, payload["batch_ids"])
+    else:
+        if any(status not in TERMINAL_STATUSES for status in statuses.values()):
+            logger.info("BATCH_POLL: waiting on %s", statuses)
+            await _enqueue_batch_poll(workspace_id, payload)
+            return
+
+    if endpoint == CHAT_ENDPOINT:
+        cached = await cache_batch_extractions(workspace_id, results)
+    else:
+        cached = await cache_embedding_results(payload["cache_key"], results)
+    logger.info(
+        "BATCH_POLL: cached %d results from %s for %d documents", cached, endpoint, len(payload["document_ids"])
+    )
+
+    await _enqueue_batch_downstream(workspace_id, BATCH_DOWNSTREAM[endpoint], payload["document_ids"])
+
+
 def register_all() -> None:
     register_handler("PROCESS_DOCUMENT", handle_process_document)
     register_handler("CHUNK_DOCUMENT", handle_chunk_document)
     register_handler("EMBED_CHUNKS", handle_embed_chunks)
     register_handler("EXTRACT_ENTITIES_RELATIONS", handle_extract_entities_relations)
     register_handler("UPSERT_GRAPH", handle_upsert_graph)
+    register_handler("BATCH_SUBMIT", handle_batch_submit)
+    register_handler("BATCH_POLL", handle_batch_poll)
+    register_periodic("archive_finished_jobs", archive_finished_jobs, ARCHIVE_INTERVAL)
+    register_periodic("evict_embedding_cache", evict_embedding_cache, EVICT_INTERVAL)
+    register_periodic("evict_extraction_cache", evict_extraction_cache, EVICT_INTERVAL)
+    register_periodic("purge_stale_extraction_cache", purge_stale_extraction_cache, STALE_PURGE_INTERVAL)
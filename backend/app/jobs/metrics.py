@@ -0,0 +1,147 @@
+"""
+In-process job metrics with a Prometheus text endpoint.
+
+The runner records, per JobType:
+- contaixt_job_queue_wait_seconds: time from runnable (created_at, or run_after
+  for retries) to claim
+- contaixt_job_run_seconds: handler wall-clock time
+- contaixt_job_attempts: attempt number at which a job finished
+- contaixt_jobs_finished_total: finished jobs by outcome (done/retry/failed)
+
+Metrics live in the worker process that ran the job, so each worker serves
+its own /metrics on `settings.worker_metrics_port` for Prometheus to scrape.
+Fleet-wide rates over a time window are available from the database via
+/v1/jobs/throughput.
+"""
+
+import asyncio
+import logging
+import math
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+ATTEMPT_BUCKETS = (1, 2, 3, 5)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    """Cumulative histogram keyed by a label set (Prometheus semantics)."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count], sum
+        self._series: dict[tuple[tuple[str, str], ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            for bound, count in zip([*self.buckets, math.inf], counts, strict=True):
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels((*key, ('le', le)))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total[0]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a label set."""
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._series: dict[tuple[tuple[str, str], ...], int] = {}
+
+    def inc(self, amount: int = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+JOB_QUEUE_WAIT = Histogram(
+    "contaixt_job_queue_wait_seconds", "Time from job becoming runnable to being claimed", DURATION_BUCKETS
+)
+JOB_RUN_TIME = Histogram("contaixt_job_run_seconds", "Job handler run time", DURATION_BUCKETS)
+JOB_ATTEMPTS = Histogram("contaixt_job_attempts", "Attempt number at which jobs finished", ATTEMPT_BUCKETS)
+JOBS_FINISHED = Counter("contaixt_jobs_finished_total", "Finished job attempts by outcome")
+
+REGISTRY: list[Histogram | Counter] = [JOB_QUEUE_WAIT, JOB_RUN_TIME, JOB_ATTEMPTS, JOBS_FINISHED]
+
+
+def observe_claim(job: dict) -> None:
+    """Record queue wait for a freshly claimed job (needs started_at/created_at/run_after)."""
+    started_at: datetime | None = job.get("started_at")
+    runnable_at: datetime | None = job.get("run_after") or job.get("created_at")
+    if started_at and runnable_at:
+        JOB_QUEUE_WAIT.observe(max((started_at - runnable_at).total_seconds(), 0.0), type=str(job["type"]))
+
+
+def observe_finish(job: dict, run_seconds: float, outcome: str) -> None:
+    """Record run time and outcome; outcome is done, retry or failed."""
+    job_type = str(job["type"])
+    JOB_RUN_TIME.observe(run_seconds, type=job_type, outcome=outcome)
+    JOBS_FINISHED.inc(type=job_type, outcome=outcome)
+    if outcome != "retry":
+        JOB_ATTEMPTS.observe(job["attempts"], type=job_type, outcome=outcome)
+
+
+def render_prometheus() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        # Drain headers
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        path = parts[1].decode() if len(parts) > 1 else ""
+        if path.split("?")[0] == "/metrics":
+            status, body = "200 OK", render_prometheus().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+    except Exception:
+        logger.debug("Metrics scrape failed", exc_info=True)
+    finally:
+        writer.close()
+
+
+async def serve_metrics(port: int) -> asyncio.Server:
+    """Serve GET /metrics in Prometheus text format on the given port."""
+    server = await asyncio.start_server(_handle_scrape, host="0.0.0.0", port=port)
+    logger.info("Serving job metrics on :%d/metrics", port)
+    return server
@@ -0,0 +1,76 @@
+"""
+Postgres LISTEN/NOTIFY wake-ups for the job runner.
+
+enqueue_job emits a NOTIFY on JOBS_CHANNEL in the same transaction as the
+insert, so the notification is only delivered once the row is visible. Each
+worker holds one dedicated asyncpg connection that LISTENs on the channel and
+wakes the run loop immediately; polling remains only as a slow fallback for
+missed notifications and backoff (run_after) expiry.
+"""
+
+import asyncio
+import logging
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOBS_CHANNEL = "jobs_queued"
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+
+async def notify_job_queued(session: AsyncSession, job_type: str) -> None:
+    """Queue a NOTIFY for a new job; delivered when the session's transaction commits."""
+    await session.execute(NOTIFY_SQL, {"channel": JOBS_CHANNEL, "payload": str(job_type)})
+
+
+def _asyncpg_dsn() -> str:
+    """Plain libpq DSN for asyncpg (the SQLAlchemy URL carries a +asyncpg driver suffix)."""
+    return make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class JobListener:
+    """Dedicated LISTEN connection that sets `event` whenever a job is enqueued."""
+
+    def __init__(self) -> None:
+        self.event = asyncio.Event()
+        self._conn: asyncpg.Connection | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def connect(self) -> bool:
+        """(Re)open the LISTEN connection. Returns False if Postgres is unreachable."""
+        if self.connected:
+            return True
+        try:
+            self._conn = await asyncpg.connect(_asyncpg_dsn())
+            self._conn.add_termination_listener(self._on_terminate)
+            await self._conn.add_listener(JOBS_CHANNEL, self._on_notify)
+        except Exception as e:
+            logger.warning("LISTEN %s unavailable, falling back to polling: %s", JOBS_CHANNEL, e)
+            self._conn = None
+            return False
+        logger.info("Listening on %s for job notifications", JOBS_CHANNEL)
+        # Anything enqueued while we were disconnected was missed; force a claim pass
+        self.event.set()
+        return True
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        self.event.set()
+
+    def _on_terminate(self, conn) -> None:
+        logger.warning("LISTEN connection closed")
+        self._conn = None
+
+    async def close(self) -> None:
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
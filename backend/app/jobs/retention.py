@@ -0,0 +1,81 @@
+"""
+Job retention: moves finished jobs out of the hot `jobs` table.
+
+Done jobs older than `settings.job_retention_done_hours` and failed jobs older
+than `settings.job_retention_failed_days` are moved to `jobs_archive` in
+batches. Each move also adds the rows to the `job_stats_rollup` counters, so
+/v1/jobs/stats only aggregates the (small) live table plus the rollup instead
+of every job ever run.
+
+Registered as a periodic task in every worker; concurrent workers split the
+work via FOR UPDATE SKIP LOCKED.
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import get_async_session
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_INTERVAL = 300  # seconds between retention sweeps
+ARCHIVE_BATCH = 1000  # rows moved per statement
+MAX_BATCHES_PER_SWEEP = 50  # bound one sweep's work; the next sweep continues
+
+ARCHIVE_SQL = text("""
+    WITH moved AS (
+        DELETE FROM jobs
+        WHERE id IN (
+            SELECT id FROM jobs
+            WHERE (status = 'done' AND updated_at < now() - make_interval(hours => :done_hours))
+               OR (status = 'failed' AND updated_at < now() - make_interval(days => :failed_days))
+            ORDER BY updated_at
+            FOR UPDATE SKIP LOCKED
+            LIMIT :batch
+        )
+        RETURNING id, workspace_id, type, payload_json, status, attempts, last_error,
+                  priority, created_at, started_at, finished_at, updated_at
+    ),
+    archived AS (
+        INSERT INTO jobs_archive (id, workspace_id, type, payload_json, status, attempts, last_error,
+                                  priority, created_at, started_at, finished_at, updated_at, archived_at)
+        SELECT id, workspace_id, type, payload_json, status, attempts, last_error,
+               priority, created_at, started_at, finished_at, updated_at, now()
+        FROM moved
+        RETURNING 1
+    ),
+    rolled_up AS (
+        INSERT INTO job_stats_rollup (workspace_id, type, status, count)
+        SELECT workspace_id, type, status, count(*) FROM moved
+        GROUP BY workspace_id, type, status
+        ON CONFLICT (workspace_id, type, status)
+        DO UPDATE SET count = job_stats_rollup.count + EXCLUDED.count
+        RETURNING 1
+    )
+    SELECT count(*) FROM moved
+""")
+
+
+async def archive_finished_jobs() -> int:
+    """Move expired done/failed jobs to jobs_archive. Returns the number of rows moved."""
+    Session = get_async_session()
+    params = {
+        "done_hours": settings.job_retention_done_hours,
+        "failed_days": settings.job_retention_failed_days,
+        "batch": ARCHIVE_BATCH,
+    }
+    total = 0
+    for _ in range(MAX_BATCHES_PER_SWEEP):
+        async with Session() as session:
+            result = await session.execute(ARCHIVE_SQL, params)
+            moved = result.scalar_one()
+            await session.commit()
+        total += moved
+        if moved < ARCHIVE_BATCH:
+            break
+
+    if total:
+        logger.info("Retention: archived %d finished jobs", total)
+    return total
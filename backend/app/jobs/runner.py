@@ -1,120 +1,547 @@
 """
 Postgres-based job runner.
 Claims jobs via SELECT ... FOR UPDATE SKIP LOCKED for crash-safety.
+
+A worker keeps up to `settings.worker_concurrency` jobs in flight as asyncio
+tasks, with an additional cap per JobType so slow or heavy stages (graph
+upserts) cannot crowd out cheap ones (embeddings).
+
+Round trips are amortized in both directions: up to `settings.worker_claim_batch`
+jobs are leased with one UPDATE ... RETURNING, and completions are collected in
+an AckBuffer and written back in batched UPDATEs.
+
+Idle workers block on Postgres LISTEN (see app.jobs.notify) instead of
+polling; POLL_INTERVAL only applies when the LISTEN connection is down.
+
+Claiming is priority-first and fair across workspaces: within the highest
+runnable priority, each workspace's oldest jobs are interleaved round-robin
+(ranked per workspace), so one tenant's bulk backfill cannot starve another
+tenant's live ingests. Interactive jobs (JobPriority.interactive) always
+overtake bulk ones; jobs enqueued by a handler inherit the running job's
+priority via `current_job`.
+The workspaces with queued jobs are found by a skip scan over the queued-jobs
+index, so a claim costs a few index probes per workspace however deep the
+queue is.
+
+Claimed jobs hold a lease (`lease_expires_at`, `locked_by`). A heartbeat
+extends the leases of everything in flight; a reaper returns jobs whose lease
+expired (crashed or killed worker) to the queue, or fails them once
+MAX_ATTEMPTS is reached. Periodic maintenance like the reaper is registered
+via register_periodic() and runs alongside the claim loop in every worker.
 """
 
 import asyncio
 import logging
+import os
+import socket
 import traceback
+import uuid
+from collections import Counter
 from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
-from sqlalchemy import text, update
+from sqlalchemy import bindparam, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db import get_async_session
-from app.models import Job, JobStatus
+from app.jobs import metrics
+from app.jobs.notify import JobListener
+from app.models import Job, JobStatus, JobType
 
 logger = logging.getLogger(__name__)
 
 MAX_ATTEMPTS = 3
-POLL_INTERVAL = 2  # seconds
+POLL_INTERVAL = 2  # seconds, used while LISTEN is unavailable
+FALLBACK_POLL_INTERVAL = 15  # seconds, safety net for missed NOTIFYs and run_after backoff
 BACKOFF_BASE = 30  # seconds
+ACK_BATCH_SIZE = 50  # completions per batched UPDATE
+ACK_FLUSH_INTERVAL = 1.0  # seconds between ack flushes
+REAPER_INTERVAL = 30  # seconds between expired-lease sweeps
+REAPER_BATCH = 500  # max expired jobs returned to the queue per sweep
+
+# Identifies this process as lease holder (host:pid:nonce)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Default per-type caps, applied on top of the global worker concurrency.
+# Embedding and extraction are I/O-bound API calls and parallelize well;
+# graph upserts contend on the same Neo4j nodes and are kept narrow.
+DEFAULT_TYPE_CONCURRENCY: dict[str, int] = {
+    JobType.PROCESS_DOCUMENT: 8,
+    JobType.CHUNK_DOCUMENT: 4,
+    JobType.EMBED_CHUNKS: 16,
+    JobType.EXTRACT_ENTITIES_RELATIONS: 8,
+    JobType.UPSERT_GRAPH: 2,
+}
 
 # Will be populated by register_handler()
 JobHandler = Callable[[Any, Any], Awaitable[None]]
 _handlers: dict[str, JobHandler] = {}
 
+# The job being executed by the current task (None outside of handlers)
+current_job: ContextVar[dict | None] = ContextVar("current_job", default=None)
+
+# Periodic maintenance coroutines: name -> (fn, interval seconds). Return values
+# (e.g. rows deleted) are ignored.
+PeriodicTask = Callable[[], Awaitable[object]]
+_periodic: dict[str, tuple[PeriodicTask, float]] = {}
+
 
 def register_handler(job_type: str, fn: JobHandler) -> None:
     """Register an async handler for a job type."""
     _handlers[job_type] = fn
 
 
+def register_periodic(name: str, fn: PeriodicTask, interval: float) -> None:
+    """Register a maintenance coroutine that every worker runs every `interval` seconds."""
+    _periodic[name] = (fn, interval)
+
+
 CLAIM_SQL = text("""
+    WITH RECURSIVE active_workspaces AS (
+        -- Skip scan over ix_job_queued_workspace_priority: one index probe per
+        -- workspace with queued jobs instead of reading the whole queue
+        (SELECT workspace_id FROM jobs WHERE status = 'queued' ORDER BY workspace_id LIMIT 1)
+        UNION ALL
+        SELECT (
+            SELECT j.workspace_id FROM jobs j
+            WHERE j.status = 'queued' AND j.workspace_id > w.workspace_id
+            ORDER BY j.workspace_id
+            LIMIT 1
+        )
+        FROM active_workspaces w
+        WHERE w.workspace_id IS NOT NULL
+    ),
+    candidates AS (
+        -- Oldest runnable jobs per workspace, ranked within (workspace, priority)
+        SELECT c.id, c.priority, c.created_at,
+               row_number() OVER (PARTITION BY c.workspace_id, c.priority ORDER BY c.created_at) AS ws_rank
+        FROM active_workspaces w
+        CROSS JOIN LATERAL (
+            SELECT id, workspace_id, priority, created_at
+            FROM jobs
+            WHERE workspace_id = w.workspace_id
+              AND status = 'queued'
+              AND type::text = ANY(:types)
+              AND (run_after IS NULL OR run_after <= now())
+              AND attempts < :max_attempts
+            ORDER BY priority DESC, created_at
+            LIMIT :limit
+        ) c
+    )
     UPDATE jobs
-    SET status = 'running', attempts = attempts + 1, updated_at = now()
-    WHERE id = (
-        SELECT id FROM jobs
-        WHERE status = 'queued'
-          AND (run_after IS NULL OR run_after <= now())
-          AND attempts < :max_attempts
-        ORDER BY created_at
-        FOR UPDATE SKIP LOCKED
-        LIMIT 1
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_by = :worker_id,
+        lease_expires_at = now() + make_interval(secs => :lease_seconds),
+        started_at = now(),
+        finished_at = NULL,
+        updated_at = now()
+    WHERE id IN (
+        SELECT j.id FROM jobs j
+        JOIN candidates c ON c.id = j.id
+        -- Re-checked on the locked row, which may have changed since the candidate scan
+        WHERE j.status = 'queued'
+          AND j.type::text = ANY(:types)
+          AND (j.run_after IS NULL OR j.run_after <= now())
+          AND j.attempts < :max_attempts
+        ORDER BY c.priority DESC, c.ws_rank, c.created_at
+        FOR UPDATE OF j SKIP LOCKED
+        LIMIT :limit
     )
-    RETURNING id, workspace_id, type, payload_json, attempts
+    RETURNING id, workspace_id, type, payload_json, attempts, priority, created_at, run_after, started_at
 """)
 
 
-async def claim_job(session: AsyncSession) -> dict | None:
-    result = await session.execute(CLAIM_SQL, {"max_attempts": MAX_ATTEMPTS})
-    row = result.mappings().first()
-    if row:
+async def claim_jobs(session: AsyncSession, limit: int, types: list[str] | None = None) -> list[dict]:
+    """Lease up to `limit` runnable jobs in a single round trip (priority first, round-robin across workspaces)."""
+    if types is None:
+        types = list(_handlers)
+    result = await session.execute(
+        CLAIM_SQL,
+        {
+            "max_attempts": MAX_ATTEMPTS,
+            "types": types,
+            "limit": limit,
+            "worker_id": WORKER_ID,
+            "lease_seconds": float(settings.job_lease_seconds),
+        },
+    )
+    rows = [dict(row) for row in result.mappings().all()]
+    if rows:
         await session.commit()
-        return dict(row)
-    return None
+    return rows
+
+
+async def claim_job(session: AsyncSession, types: list[str] | None = None) -> dict | None:
+    """Claim the next runnable job, optionally restricted to the given job types."""
+    jobs = await claim_jobs(session, 1, types)
+    return jobs[0] if jobs else None
 
 
 async def mark_done(session: AsyncSession, job_id) -> None:
     await session.execute(
-        update(Job).where(Job.id == job_id).values(status=JobStatus.done, updated_at=datetime.now(UTC))
+        update(Job)
+        .where(Job.id == job_id)
+        .values(
+            status=JobStatus.done,
+            locked_by=None,
+            lease_expires_at=None,
+            finished_at=datetime.now(UTC),
+            updated_at=datetime.now(UTC),
+        )
     )
     await session.commit()
 
 
+def _failure_values(error: str, attempts: int) -> dict:
+    """Column values for a failed attempt: requeue with backoff, or give up after MAX_ATTEMPTS."""
+    retry = attempts < MAX_ATTEMPTS
+    return {
+        "status": JobStatus.queued if retry else JobStatus.failed,
+        "last_error": error[:4000],
+        "run_after": datetime.now(UTC) + timedelta(seconds=BACKOFF_BASE * attempts) if retry else None,
+        "locked_by": None,
+        "lease_expires_at": None,
+        "finished_at": datetime.now(UTC),
+        "updated_at": datetime.now(UTC),
+    }
+
+
 async def mark_failed(session: AsyncSession, job_id, error: str, attempts: int) -> None:
-    run_after = datetime.now(UTC) + timedelta(seconds=BACKOFF_BASE * attempts)
+    await session.execute(update(Job).where(Job.id == job_id).values(**_failure_values(error, attempts)))
+    await session.commit()
+
+
+# Executemany form of mark_failed; bind names are prefixed to avoid clashing with column names.
+# Run on the session's connection: Session.execute would treat a parameter list as an ORM bulk update.
+ACK_FAILED_STMT = (
+    update(Job)
+    .where(Job.id == bindparam("b_id"), Job.locked_by == WORKER_ID)
+    .values(
+        status=bindparam("b_status"),
+        last_error=bindparam("b_last_error"),
+        run_after=bindparam("b_run_after"),
+        locked_by=bindparam("b_locked_by"),
+        lease_expires_at=bindparam("b_lease_expires_at"),
+        finished_at=bindparam("b_finished_at"),
+        updated_at=bindparam("b_updated_at"),
+    )
+)
+
+
+class AckBuffer:
+    """Collects job outcomes and writes them back in batched UPDATEs.
+
+    Done jobs are flipped with a single `UPDATE ... WHERE id IN (...)`; failures
+    carry per-row values and go through one executemany UPDATE. Both only touch
+    rows this worker still holds the lease on, so a job that was reaped and
+    re-claimed elsewhere is not acknowledged twice. A flush happens when ACK_BATCH_SIZE outcomes are pending or every
+    ACK_FLUSH_INTERVAL seconds, whichever comes first.
+    """
+
+    def __init__(self, batch_size: int = ACK_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self._done: list = []
+        self._failed: list[dict] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._done) + len(self._failed)
+
+    async def done(self, job_id) -> None:
+        self._done.append(job_id)
+        if self.pending >= self.batch_size:
+            await self.flush()
+
+    async def failed(self, job_id, error: str, attempts: int) -> None:
+        values = _failure_values(error, attempts)
+        self._failed.append({"b_id": job_id, **{f"b_{k}": v for k, v in values.items()}})
+        if self.pending >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            done, self._done = self._done, []
+            failed, self._failed = self._failed, []
+            if not done and not failed:
+                return
+            try:
+                Session = get_async_session()
+                async with Session() as session:
+                    if done:
+                        await session.execute(
+                            update(Job)
+                            .where(Job.id.in_(done), Job.locked_by == WORKER_ID)
+                            .values(
+                                status=JobStatus.done,
+                                locked_by=None,
+                                lease_expires_at=None,
+                                finished_at=datetime.now(UTC),
+                                updated_at=datetime.now(UTC),
+                            )
+                        )
+                    if failed:
+                        await (await session.connection()).execute(ACK_FAILED_STMT, failed)
+                    await session.commit()
+            except Exception:
+                # Keep the outcomes for the next flush rather than losing them
+                self._done[:0] = done
+                self._failed[:0] = failed
+                raise
+            logger.debug("Acked %d done, %d failed jobs", len(done), len(failed))
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """Flush periodically until stop_event is set, then flush once more."""
+        while not stop_event.is_set():
+            await _wait_any([stop_event], ACK_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Ack flush failed")
+        await self.flush()
+
+
+async def release_job(session: AsyncSession, job_id) -> None:
+    """Put a claimed job back in the queue without counting the attempt."""
     await session.execute(
         update(Job)
         .where(Job.id == job_id)
         .values(
-            status=JobStatus.queued if attempts < MAX_ATTEMPTS else JobStatus.failed,
-            last_error=error[:4000],
-            run_after=run_after if attempts < MAX_ATTEMPTS else None,
+            status=JobStatus.queued,
+            attempts=Job.attempts - 1,
+            locked_by=None,
+            lease_expires_at=None,
             updated_at=datetime.now(UTC),
         )
     )
     await session.commit()
 
 
-async def process_job(job: dict) -> None:
-    job_type = job["type"]
-    handler = _handlers.get(job_type)
-    if not handler:
-        raise ValueError(f"No handler registered for job type: {job_type}")
-    await handler(job["workspace_id"], job["payload_json"])
+HEARTBEAT_SQL = text("""
+    UPDATE jobs
+    SET lease_expires_at = now() + make_interval(secs => :lease_seconds)
+    WHERE id = ANY(:ids)
+      AND status = 'running'
+      AND locked_by = :worker_id
+""")
+
+REAP_SQL = text("""
+    UPDATE jobs
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'failed'::job_status_enum
+                      ELSE 'queued'::job_status_enum END,
+        last_error = 'Lease expired (held by ' || coalesce(locked_by, '?') || ')',
+        locked_by = NULL,
+        lease_expires_at = NULL,
+        updated_at = now()
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE status = 'running'
+          AND lease_expires_at < now()
+        FOR UPDATE SKIP LOCKED
+        LIMIT :limit
+    )
+    RETURNING id, status
+""")
 
 
-async def run_loop() -> None:
-    logger.info("Job runner started – polling every %ss", POLL_INTERVAL)
+async def extend_leases(session: AsyncSession, job_ids: list) -> None:
+    """Push the lease of jobs this worker is running into the future."""
+    await session.execute(
+        HEARTBEAT_SQL,
+        {"ids": job_ids, "worker_id": WORKER_ID, "lease_seconds": float(settings.job_lease_seconds)},
+    )
+    await session.commit()
+
+
+async def reap_expired_jobs() -> None:
+    """Return jobs whose lease expired to the queue (or fail them after MAX_ATTEMPTS)."""
+    from app.jobs.notify import notify_job_queued
+
     Session = get_async_session()
+    async with Session() as session:
+        result = await session.execute(REAP_SQL, {"max_attempts": MAX_ATTEMPTS, "limit": REAPER_BATCH})
+        rows = result.fetchall()
+        requeued = sum(1 for r in rows if r.status == "queued")
+        if requeued:
+            await notify_job_queued(session, "reaped")
+        await session.commit()
 
-    while True:
+    if rows:
+        logger.warning("Reaper: %d expired leases (%d requeued, %d failed)", len(rows), requeued, len(rows) - requeued)
+
+
+async def _heartbeat(in_flight: dict[asyncio.Task, dict], stop_event: asyncio.Event) -> None:
+    """Extend leases of all in-flight jobs every third of the lease duration."""
+    Session = get_async_session()
+    interval = settings.job_lease_seconds / 3
+    while not stop_event.is_set():
+        await _wait_any([stop_event], interval)
+        job_ids = [job["id"] for job in in_flight.values()]
+        if not job_ids:
+            continue
         try:
             async with Session() as session:
-                job = await claim_job(session)
+                await extend_leases(session, job_ids)
+        except Exception:
+            logger.exception("Lease heartbeat failed")
 
-            if job is None:
-                await asyncio.sleep(POLL_INTERVAL)
-                continue
 
-            logger.info("Claimed job %s type=%s attempt=%s", job["id"], job["type"], job["attempts"])
+async def _run_periodic(name: str, fn: PeriodicTask, interval: float, stop_event: asyncio.Event) -> None:
+    while not stop_event.is_set():
+        try:
+            await fn()
+        except Exception:
+            logger.exception("Periodic task %s failed", name)
+        await _wait_any([stop_event], interval)
+
+
+async def process_job(job: dict) -> None:
+    job_type = job["type"]
+    handler = _handlers.get(job_type)
+    if not handler:
+        raise ValueError(f"No handler registered for job type: {job_type}")
+    token = current_job.set(job)
+    try:
+        await handler(job["workspace_id"], job["payload_json"])
+    finally:
+        current_job.reset(token)
 
+
+async def _execute(job: dict, acks: AckBuffer, slot: asyncio.Semaphore) -> None:
+    """Run one claimed job under its type's concurrency slot and record the outcome."""
+    try:
+        async with slot:
+            logger.info("Claimed job %s type=%s attempt=%s", job["id"], job["type"], job["attempts"])
+            metrics.observe_claim(job)
+            t0 = asyncio.get_running_loop().time()
             try:
-                t0 = asyncio.get_event_loop().time()
                 await process_job(job)
-                elapsed = asyncio.get_event_loop().time() - t0
-                async with Session() as session:
-                    await mark_done(session, job["id"])
-                logger.info("Job %s type=%s done in %.2fs", job["id"], job["type"], elapsed)
+                elapsed = asyncio.get_running_loop().time() - t0
             except Exception:
+                elapsed = asyncio.get_running_loop().time() - t0
                 tb = traceback.format_exc()
                 logger.error("Job %s type=%s failed (attempt %s):\n%s", job["id"], job["type"], job["attempts"], tb)
+                metrics.observe_finish(job, elapsed, "retry" if job["attempts"] < MAX_ATTEMPTS else "failed")
+                await acks.failed(job["id"], tb, job["attempts"])
+                return
+            metrics.observe_finish(job, elapsed, "done")
+            await acks.done(job["id"])
+            logger.info("Job %s type=%s done in %.2fs", job["id"], job["type"], elapsed)
+    except asyncio.CancelledError:
+        logger.warning("Job %s type=%s cancelled during shutdown, releasing", job["id"], job["type"])
+        Session = get_async_session()
+        async with Session() as session:
+            await release_job(session, job["id"])
+        raise
+
+
+def _type_limits(concurrency: int) -> dict[str, int]:
+    """Per-type caps for registered handlers, bounded by the global concurrency."""
+    limits = {}
+    for job_type in _handlers:
+        limit = settings.worker_type_concurrency.get(job_type, DEFAULT_TYPE_CONCURRENCY.get(job_type, concurrency))
+        limits[job_type] = max(1, min(limit, concurrency))
+    return limits
+
+
+async def _wait_any(events: list[asyncio.Event], timeout: float) -> None:
+    """Block until any of the events is set or the timeout elapses."""
+    waiters = [asyncio.ensure_future(e.wait()) for e in events]
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for w in waiters:
+            w.cancel()
+
+
+async def _drain(in_flight: dict[asyncio.Task, dict]) -> None:
+    """Wait for in-flight jobs to finish; cancel (and release) whatever is left after the timeout."""
+    if not in_flight:
+        return
+    logger.info("Draining %d in-flight jobs (timeout %ss)", len(in_flight), settings.worker_drain_timeout)
+    _, pending = await asyncio.wait(list(in_flight), timeout=settings.worker_drain_timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning("Cancelled %d jobs that did not finish within the drain timeout", len(pending))
+
+
+async def run_loop(stop_event: asyncio.Event | None = None) -> None:
+    """Claim and run jobs until stop_event is set, then drain in-flight jobs."""
+    stop_event = stop_event or asyncio.Event()
+    concurrency = max(1, settings.worker_concurrency)
+    limits = _type_limits(concurrency)
+    slots = {t: asyncio.Semaphore(limit) for t, limit in limits.items()}
+    in_flight: dict[asyncio.Task, dict] = {}
+    slot_freed = asyncio.Event()
+
+    def _on_done(task: asyncio.Task) -> None:
+        in_flight.pop(task, None)
+        slot_freed.set()
+
+    logger.info(
+        "Job runner started – concurrency=%d, claim batch=%d, type limits=%s",
+        concurrency,
+        settings.worker_claim_batch,
+        limits,
+    )
+    Session = get_async_session()
+    listener = JobListener()
+    await listener.connect()
+    acks = AckBuffer()
+    ack_stop = asyncio.Event()
+    ack_task = asyncio.create_task(acks.run(ack_stop))
+    heartbeat_task = asyncio.create_task(_heartbeat(in_flight, ack_stop))
+    periodic_tasks = [
+        asyncio.create_task(_run_periodic(name, fn, interval, stop_event)) for name, (fn, interval) in _periodic.items()
+    ]
+
+    while not stop_event.is_set():
+        slot_freed.clear()
+        listener.event.clear()
+        try:
+            running = Counter(job["type"] for job in in_flight.values())
+            free_types = [t for t, limit in limits.items() if running[t] < limit]
+            capacity = concurrency - len(in_flight)
+
+            jobs: list[dict] = []
+            if capacity > 0 and free_types:
                 async with Session() as session:
-                    await mark_failed(session, job["id"], tb, job["attempts"])
+                    jobs = await claim_jobs(session, min(capacity, settings.worker_claim_batch), free_types)
+
+            if not jobs:
+                # Queue empty or no free slots: wait for a NOTIFY, a freed slot, the
+                # fallback poll, or shutdown. Reconnect LISTEN if it dropped.
+                listening = await listener.connect()
+                await _wait_any(
+                    [slot_freed, listener.event, stop_event],
+                    FALLBACK_POLL_INTERVAL if listening else POLL_INTERVAL,
+                )
+                continue
+
+            # A batch may hold more of one type than it has free slots; those
+            # tasks wait on the type semaphore while counting against capacity.
+            for job in jobs:
+                task = asyncio.create_task(_execute(job, acks, slots[job["type"]]))
+                in_flight[task] = job
+                task.add_done_callback(_on_done)
 
         except Exception:
             logger.exception("Runner loop error")
-            await asyncio.sleep(POLL_INTERVAL)
+            await _wait_any([stop_event], POLL_INTERVAL)
+
+    await listener.close()
+    await asyncio.gather(*periodic_tasks, return_exceptions=True)
+    # Keep heartbeating while draining so long-running jobs are not reaped mid-shutdown
+    await _drain(in_flight)
+    ack_stop.set()
+    await asyncio.gather(ack_task, heartbeat_task)
+    logger.info("Job runner stopped")
+
+
+register_periodic("reap_expired_jobs", reap_expired_jobs, REAPER_INTERVAL)
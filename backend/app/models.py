@@ -4,16 +4,19 @@ from datetime import datetime
 
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     Enum,
     Float,
     Index,
     Integer,
+    SmallInteger,
     String,
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSON, UUID
 from sqlalchemy.orm import Mapped, mapped_column
@@ -43,6 +46,14 @@ class JobType(enum.StrEnum):
     EMBED_CHUNKS = "EMBED_CHUNKS"
     EXTRACT_ENTITIES_RELATIONS = "EXTRACT_ENTITIES_RELATIONS"
     UPSERT_GRAPH = "UPSERT_GRAPH"
+    BATCH_SUBMIT = "BATCH_SUBMIT"  # Bulk mode: submit extraction/embedding requests to the Batch API
+    BATCH_POLL = "BATCH_POLL"  # Bulk mode: wait for batches, cache results, enqueue the regular stages
+
+
+class JobPriority(enum.IntEnum):
+    """Claim priority; higher runs first. Bulk backfills yield to live ingests."""
+    bulk = 0
+    interactive = 10
 
 
 class JobStatus(enum.StrEnum):
@@ -62,6 +73,7 @@ class Workspace(Base):
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name: Mapped[str] = mapped_column(String(255))
+    embedding_provider: Mapped[str | None] = mapped_column(String(50))  # None = settings.embedding_provider
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -166,30 +178,138 @@ class DocumentChunk(Base):
     text: Mapped[str] = mapped_column(Text, nullable=False)
     start_offset: Mapped[int] = mapped_column(Integer, nullable=False)
     end_offset: Mapped[int] = mapped_column(Integer, nullable=False)
-    embedding = mapped_column(Vector(1536), nullable=True)
+    # Full-precision vector, sized by the workspace's embedding provider; only
+    # written when vector_store includes "pg". Indexed by app.scripts.pgvector_init.
+    embedding = mapped_column(Vector(), nullable=True)
+    embedded_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))  # set once stored in every backend
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class EmbeddingCache(Base):
+    """Content-addressed embedding cache.
+
+    Keyed by (model, sha256 of the chunk text) so unchanged chunks and repeated
+    boilerplate (signatures, disclaimers) are embedded once. Size-bounded by
+    evicting the least recently used rows.
+    """
+    __tablename__ = "embedding_cache"
+    __table_args__ = (Index("ix_embedding_cache_last_used", "last_used_at"),)
+
+    model: Mapped[str] = mapped_column(String(100), primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    embedding = mapped_column(Vector(), nullable=False)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class ExtractionCache(Base):
+    """Per-chunk and per-document LLM extraction results.
+
+    Keyed by (workspace, model, prompt version, sha256 of the LLM input) so
+    unchanged input is never sent to the LLM again, and results never cross
+    workspaces. Size-bounded by evicting the least recently used rows.
+    """
+    __tablename__ = "extraction_cache"
+    __table_args__ = (Index("ix_extraction_cache_last_used", "last_used_at"),)
+
+    workspace_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100), primary_key=True)
+    prompt_version: Mapped[str] = mapped_column(String(32), primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    result: Mapped[dict] = mapped_column(JSON, nullable=False)  # {"entities": [...], "relations": [...]}
+    last_used_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 
 class Job(Base):
+    """Queued unit of pipeline work.
+
+    Running jobs are leased to a worker (`locked_by`) until `lease_expires_at`;
+    expired leases are returned to the queue by the runner's reaper.
+    `dedup_key` is unique among queued/running jobs (see app.jobs.enqueue).
+    `priority` (JobPriority) orders claiming, fair-shared across workspaces.
+    """
     __tablename__ = "jobs"
-    __table_args__ = (Index("ix_job_status_run_after", "status", "run_after"),)
+    __table_args__ = (
+        Index("ix_job_status_run_after", "status", "run_after"),
+        Index("ix_job_running_lease", "lease_expires_at", postgresql_where=text("status = 'running'")),
+        Index(
+            "ix_job_queued_workspace_priority",
+            "workspace_id",
+            text("priority DESC"),
+            "created_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        Index(
+            "uq_job_dedup_active",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("dedup_key IS NOT NULL AND status IN ('queued', 'running')"),
+        ),
+        Index("ix_job_finished_updated", "updated_at", postgresql_where=text("status IN ('done', 'failed')")),
+        Index("ix_job_workspace_finished", "workspace_id", "finished_at"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     workspace_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
     type: Mapped[JobType] = mapped_column(Enum(JobType, name="job_type_enum"), nullable=False)
     payload_json: Mapped[dict | None] = mapped_column(JSON)
+    dedup_key: Mapped[str | None] = mapped_column(String(255))
+    priority: Mapped[int] = mapped_column(
+        SmallInteger, default=JobPriority.interactive, server_default=str(JobPriority.interactive.value), nullable=False
+    )
     status: Mapped[JobStatus] = mapped_column(
         Enum(JobStatus, name="job_status_enum"), default=JobStatus.queued, nullable=False
     )
     attempts: Mapped[int] = mapped_column(Integer, default=0)
     last_error: Mapped[str | None] = mapped_column(Text)
     run_after: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    locked_by: Mapped[str | None] = mapped_column(String(255))
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))  # last claim
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))  # last attempt finished
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
 
+class JobArchive(Base):
+    """Finished job moved out of `jobs` by the retention sweep (app.jobs.retention)."""
+    __tablename__ = "jobs_archive"
+    __table_args__ = (Index("ix_job_archive_workspace_status", "workspace_id", "status", "updated_at"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    workspace_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    type: Mapped[JobType] = mapped_column(Enum(JobType, name="job_type_enum", create_type=False), nullable=False)
+    payload_json: Mapped[dict | None] = mapped_column(JSON)
+    status: Mapped[JobStatus] = mapped_column(
+        Enum(JobStatus, name="job_status_enum", create_type=False), nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    priority: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class JobStatsRollup(Base):
+    """Running count of archived jobs per (workspace, type, status)."""
+    __tablename__ = "job_stats_rollup"
+
+    workspace_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    type: Mapped[JobType] = mapped_column(
+        Enum(JobType, name="job_type_enum", create_type=False), primary_key=True
+    )
+    status: Mapped[JobStatus] = mapped_column(
+        Enum(JobStatus, name="job_status_enum", create_type=False), primary_key=True
+    )
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
 class EntityMention(Base):
     """Entity extracted from a document (person, company, topic).
 
@@ -5,6 +5,7 @@ Fetch actual content for documents via Nango proxy.
 - Google Drive: Exports Google Workspace files + extracts from binary files (PDF, etc.)
 
 Large files are streamed to temporary storage (Supabase S3 or local) to avoid memory issues.
+Extraction and CSV flattening run in the CPU process pool so they don't block the event loop.
 """
 
 import logging
@@ -18,6 +19,7 @@ from app.nango.proxy import (
     drive_download_file,
     drive_export_file,
 )
+from app.processing.cpu_pool import CPU_OFFLOAD_MIN_CHARS, run_cpu_bound
 from app.processing.extractors import EXTRACTORS
 from app.storage import TempFile, cleanup_temp, download_to_temp
 
@@ -124,7 +126,7 @@ async def fetch_drive_content_map(
             if text.strip():
                 # For CSV (Sheets), convert to more readable format
                 if export_format == "text/csv":
-                    text = _csv_to_readable_text(text, file_name)
+                    text = await _csv_to_readable_text_async(text, file_name)
 
                 content_map[file_id] = text
                 logger.debug("Exported %s (%s): %d chars", file_name, mime_type, len(text))
@@ -159,10 +161,10 @@ async def fetch_drive_content_map(
                 temp_file = await download_to_temp(file_bytes, file_name, mime_type)
                 local_path = temp_file.get_local_path()
                 logger.debug("Using temp storage for large file: %s", file_name)
-                text = extractor(local_path)
+                text = await run_cpu_bound(extractor, local_path)
             else:
                 # Small files can be processed in memory
-                text = extractor(file_bytes)
+                text = await run_cpu_bound(extractor, file_bytes)
 
             if text.strip():
                 content_map[file_id] = text
@@ -194,7 +196,7 @@ async def fetch_drive_content_map(
             if text.strip():
                 # For CSV, convert to readable format
                 if mime_type == "text/csv":
-                    text = _csv_to_readable_text(text, file_name)
+                    text = await _csv_to_readable_text_async(text, file_name)
 
                 content_map[file_id] = text
                 logger.debug("Downloaded %s (%s): %d chars", file_name, mime_type, len(text))
@@ -212,6 +214,13 @@ async def fetch_drive_content_map(
     return content_map
 
 
+async def _csv_to_readable_text_async(csv_content: str, file_name: str) -> str:
+    """_csv_to_readable_text, offloaded to the CPU pool for large sheets."""
+    if len(csv_content) < CPU_OFFLOAD_MIN_CHARS:
+        return _csv_to_readable_text(csv_content, file_name)
+    return await run_cpu_bound(_csv_to_readable_text, csv_content, file_name)
+
+
 def _csv_to_readable_text(csv_content: str, file_name: str) -> str:
     """
     Convert CSV to a more readable text format for better semantic search.
@@ -0,0 +1,44 @@
+"""
+OpenAI async client singleton.
+
+Like the Neo4j driver, the client owns an HTTP connection pool and should be
+application-scoped: creating one per call opens a fresh pool (and TLS
+handshakes) every time. `settings.openai_base_url` points the client at an
+OpenAI-compatible endpoint (proxy, local server) when set.
+"""
+
+import logging
+
+from openai import AsyncOpenAI
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Application-scoped singleton client
+_client: AsyncOpenAI | None = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Get the shared AsyncOpenAI client, creating it on first use."""
+    global _client
+
+    if _client is None:
+        logger.info(
+            "Creating OpenAI async client%s", f" for {settings.openai_base_url}" if settings.openai_base_url else ""
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+        )
+
+    return _client
+
+
+async def close_openai_client() -> None:
+    """Close the shared client's connection pool. Call on shutdown."""
+    global _client
+
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,151 @@
+"""
+OpenAI Batch API bulk mode.
+
+Backfills can push thousands of documents through synchronous chat and
+embeddings calls. In bulk mode the requests are instead written to JSONL
+input files and submitted as batches (half price, separate rate limits,
+results within the 24h completion window):
+
+1. BATCH_SUBMIT chunks the documents and collects every extraction and
+   embedding request the regular stages would make, minus what is already
+   cached, and submits one batch per endpoint.
+2. BATCH_POLL checks the batches every `batch_api_poll_seconds`. Once they
+   are done it writes the results into the extraction and embedding caches
+   and enqueues the regular EXTRACT_ENTITIES_RELATIONS and EMBED_CHUNKS jobs.
+   Transient API errors (TRANSIENT_ERRORS) only delay the next check; polling
+   gives up once the batches' completion window has expired.
+
+Those stages find everything in the caches, so mentions, graph upserts and
+vector writes take their usual paths. Anything the batch did not return
+(failed lines, expired batches) is simply a cache miss and is requested
+synchronously. Bulk mode therefore needs the caches enabled.
+
+`settings.openai_base_url` can point at app.scripts.fake_batch_server for
+local runs.
+"""
+
+import io
+import json
+import logging
+from dataclasses import dataclass
+from typing import Literal
+
+import openai
+
+from app.config import settings
+from app.openai_client import get_openai_client
+from app.processing.embedding_cache import get_cached_embeddings, put_cached_embeddings, text_hash
+from app.processing.embedding_providers import EmbeddingProvider, OpenAIEmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+Endpoint = Literal["/v1/chat/completions", "/v1/embeddings"]
+
+CHAT_ENDPOINT: Endpoint = "/v1/chat/completions"
+EMBEDDINGS_ENDPOINT: Endpoint = "/v1/embeddings"
+COMPLETION_WINDOW: Literal["24h"] = "24h"
+COMPLETION_WINDOW_SECONDS = 24 * 3600
+MAX_FILE_BYTES = 190 * 1024 * 1024  # API limit is 200 MB per input file
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Outages worth waiting out while a batch is within its completion window
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.InternalServerError, openai.RateLimitError)
+
+
+@dataclass
+class BatchRequest:
+    """One line of a batch input file; custom_id identifies the result."""
+
+    custom_id: str
+    body: dict
+
+    def to_line(self, endpoint: Endpoint) -> bytes:
+        line = {"custom_id": self.custom_id, "method": "POST", "url": endpoint, "body": self.body}
+        return json.dumps(line, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def submit_batches(
+    endpoint: Endpoint, requests: list[BatchRequest], metadata: dict[str, str]
+) -> tuple[list[str], int]:
+    """
+    Upload `requests` as one or more input files and create a batch for each.
+    Returns (batch ids, unix time by which all of them have completed or expired).
+    """
+    client = get_openai_client()
+    batch_ids = []
+    expires_at = 0
+
+    files: list[bytes] = []
+    buf = io.BytesIO()
+    count = 0
+    for request in requests:
+        line = request.to_line(endpoint)
+        if count and (count >= settings.batch_api_max_requests or buf.tell() + len(line) > MAX_FILE_BYTES):
+            files.append(buf.getvalue())
+            buf = io.BytesIO()
+            count = 0
+        buf.write(line)
+        count += 1
+    if count:
+        files.append(buf.getvalue())
+
+    for data in files:
+        uploaded = await client.files.create(file=("batch.jsonl", data), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=endpoint,
+            completion_window=COMPLETION_WINDOW,
+            metadata=metadata,
+        )
+        batch_ids.append(batch.id)
+        expires_at = max(expires_at, batch.expires_at or batch.created_at + COMPLETION_WINDOW_SECONDS)
+        logger.info("Submitted batch %s: %s, %d bytes", batch.id, endpoint, len(data))
+    return batch_ids, expires_at
+
+
+async def fetch_batch(batch_id: str) -> tuple[str, dict[str, dict]]:
+    """
+    (status, results) for a batch. Results map custom_id to the response body
+    of each successful line, and are only read once the batch is completed.
+    """
+    client = get_openai_client()
+    batch = await client.batches.retrieve(batch_id)
+    if batch.status != "completed" or not batch.output_file_id:
+        if batch.status in TERMINAL_STATUSES:
+            logger.warning("Batch %s ended with status %s", batch_id, batch.status)
+        return batch.status, {}
+
+    content = await client.files.content(batch.output_file_id)
+    results: dict[str, dict] = {}
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") == 200 and response.get("body"):
+            results[record["custom_id"]] = response["body"]
+
+    counts = batch.request_counts
+    logger.info(
+        "Batch %s completed: %d results (%s failed)",
+        batch_id,
+        len(results),
+        counts.failed if counts else "?",
+    )
+    return batch.status, results
+
+
+async def embedding_requests(provider: EmbeddingProvider, texts: list[str]) -> list[BatchRequest]:
+    """One request per distinct uncached text; empty for providers without a Batch API."""
+    if not isinstance(provider, OpenAIEmbeddingProvider) or not texts:
+        return []
+
+    by_hash = {text_hash(t): t for t in texts}
+    cached = await get_cached_embeddings(provider.cache_key, list(by_hash))
+    return [BatchRequest(custom_id=h, body=provider.request_body(t)) for h, t in by_hash.items() if h not in cached]
+
+
+async def cache_embedding_results(cache_key: str, results: dict[str, dict]) -> int:
+    """Store embedding batch results (custom_id = text hash) in the embedding cache. Returns count."""
+    vectors = {custom_id: body["data"][0]["embedding"] for custom_id, body in results.items() if body.get("data")}
+    await put_cached_embeddings(cache_key, vectors)
+    return len(vectors)
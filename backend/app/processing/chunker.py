@@ -1,17 +1,36 @@
 """
 Deterministic text chunker with overlap.
 Splits on sentence boundaries where possible, falls back to hard split.
+Once a chunk is half full it also ends at the next paragraph break or after
+an anchor sentence (about one in ANCHOR_EVERY, picked by a hash of the
+sentence text). Boundaries therefore depend on the local content only, and
+an edit shifts them up to the next break or anchor instead of through the
+rest of the document.
+
+Changing these rules changes chunk texts, so every document is re-chunked and
+its chunks re-embedded on its next update.
+
+diff_chunks() matches a fresh chunking against the stored chunks of the same
+document so re-processing only touches chunks whose text actually changed.
 """
 
 import re
-from dataclasses import dataclass
+import uuid
+import zlib
+from dataclasses import dataclass, field
 
 CHUNK_SIZE = 1000  # characters
 CHUNK_OVERLAP = 200
+ANCHOR_EVERY = 8  # on average one sentence in N may end a half-full chunk
 
 SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
 
 
+def _is_anchor(sentence: str) -> bool:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(sentence.encode("utf-8")) % ANCHOR_EVERY == 0
+
+
 @dataclass
 class Chunk:
     idx: int
@@ -34,6 +53,7 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
     current = ""
     current_start = 0
     pos = 0
+    after_anchor = False
 
     for sentence in sentences:
         # Find actual position of this sentence in original text
@@ -42,7 +62,10 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
             sent_start = pos
         sent_end = sent_start + len(sentence)
 
-        if current and len(current) + len(sentence) + 1 > chunk_size:
+        boundary = after_anchor or "\n\n" in text[pos:sent_start]
+        if current and (
+            len(current) + len(sentence) + 1 > chunk_size or (boundary and len(current) >= chunk_size // 2)
+        ):
             chunks.append(
                 Chunk(
                     idx=len(chunks),
@@ -63,6 +86,7 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
                 current = current + " " + sentence
 
         pos = sent_end
+        after_anchor = _is_anchor(sentence)
 
     if current.strip():
         chunks.append(
@@ -75,3 +99,44 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
         )
 
     return chunks
+
+
+@dataclass
+class StoredChunk:
+    id: uuid.UUID
+    text: str
+    start_offset: int
+
+
+@dataclass
+class ChunkDiff:
+    kept: list[tuple[uuid.UUID, Chunk]] = field(default_factory=list)  # (stored id, new position)
+    added: list[Chunk] = field(default_factory=list)
+    removed: list[uuid.UUID] = field(default_factory=list)
+
+
+def diff_chunks(stored: list[StoredChunk], new: list[Chunk]) -> ChunkDiff:
+    """
+    Match new chunks to stored ones by identical text.
+
+    Deterministic chunking means an edit only changes the chunks around it;
+    every other chunk reappears with the same text, possibly shifted to a new
+    idx/offset. Repeated texts (boilerplate) are matched to the stored chunk
+    with the same start offset first, then in order.
+    """
+    by_text: dict[str, list[StoredChunk]] = {}
+    for sc in stored:
+        by_text.setdefault(sc.text, []).append(sc)
+
+    diff = ChunkDiff()
+    for ch in new:
+        candidates = by_text.get(ch.text)
+        if not candidates:
+            diff.added.append(ch)
+            continue
+        match = next((sc for sc in candidates if sc.start_offset == ch.start_offset), candidates[0])
+        candidates.remove(match)
+        diff.kept.append((match.id, ch))
+
+    diff.removed = [sc.id for remaining in by_text.values() for sc in remaining]
+    return diff
@@ -20,17 +20,17 @@ import logging
 import uuid
 
 import cohere
-from openai import AsyncOpenAI
 from sqlalchemy import select
 
 from app.config import settings
 from app.db import get_async_session
 from app.models import Document, VaultSourceConnection
 from app.neo4j_client import get_session
+from app.processing.embedding_providers import get_workspace_embedding_provider
+from app.processing.vector_store import get_search_store
 
 logger = logging.getLogger(__name__)
 
-EMBED_MODEL = "text-embedding-3-small"
 RERANK_MODEL = "rerank-v3.5"
 RERANK_CANDIDATE_MULTIPLIER = 3  # Fetch 3x candidates, then rerank to top_k
 
@@ -50,11 +50,10 @@ async def get_connection_ids_for_vaults(vault_ids: list[uuid.UUID]) -> list[uuid
         return [row[0] for row in result.fetchall()]
 
 
-async def embed_query(query: str) -> list[float]:
-    """Embed a query string via OpenAI."""
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
-    resp = await client.embeddings.create(input=[query], model=EMBED_MODEL)
-    return resp.data[0].embedding
+async def embed_query(workspace_id: uuid.UUID, query: str) -> list[float]:
+    """Embed a query string with the workspace's embedding provider."""
+    provider = await get_workspace_embedding_provider(workspace_id)
+    return await provider.embed_query(query)
 
 
 async def rerank_chunks(
@@ -112,79 +111,15 @@ async def vector_search_chunks(
     connection_ids: list[uuid.UUID] | None = None,
 ) -> list[dict]:
     """
-    Vector similarity search on Chunk nodes with pre-filtering.
+    Vector similarity search on chunks with workspace/vault pre-filtering.
 
-    Uses exact nearest neighbor (ENN) with vector.similarity.cosine() to enable
-    pre-filtering by workspace_id and optionally connection_ids (for vault filtering).
-
-    This ensures multi-tenant isolation: workspace filter is applied BEFORE
-    similarity computation, not after.
-
-    Reference: https://neo4j.com/developer/genai-ecosystem/vector-search/
+    Served by Neo4j Chunk nodes unless `settings.vector_store` is "pg"
+    (see app.processing.vector_store).
     """
-    ws = str(workspace_id)
-    conn_ids = [str(c) for c in connection_ids] if connection_ids else None
-
-    # Build the pre-filter query using ENN approach
-    # This applies workspace/vault filter BEFORE computing similarity
-    if conn_ids:
-        query = """
-        MATCH (chunk:Chunk)
-        WHERE chunk.workspace_id = $ws
-          AND chunk.source_connection_id IN $conn_ids
-          AND chunk.embedding IS NOT NULL
-        WITH chunk, vector.similarity.cosine(chunk.embedding, $embedding) AS score
-        WHERE score > 0.0
-        ORDER BY score DESC
-        LIMIT $top_k
-        RETURN chunk.chunk_id AS chunk_id,
-               chunk.document_id AS document_id,
-               chunk.idx AS idx,
-               chunk.text AS text,
-               chunk.start_offset AS start_offset,
-               chunk.end_offset AS end_offset,
-               score
-        """
-        params = {"ws": ws, "conn_ids": conn_ids, "embedding": query_embedding, "top_k": top_k}
-    else:
-        query = """
-        MATCH (chunk:Chunk)
-        WHERE chunk.workspace_id = $ws
-          AND chunk.embedding IS NOT NULL
-        WITH chunk, vector.similarity.cosine(chunk.embedding, $embedding) AS score
-        WHERE score > 0.0
-        ORDER BY score DESC
-        LIMIT $top_k
-        RETURN chunk.chunk_id AS chunk_id,
-               chunk.document_id AS document_id,
-               chunk.idx AS idx,
-               chunk.text AS text,
-               chunk.start_offset AS start_offset,
-               chunk.end_offset AS end_offset,
-               score
-        """
-        params = {"ws": ws, "embedding": query_embedding, "top_k": top_k}
-
+    store = get_search_store()
     try:
-        async with get_session() as session:
-            result = await session.run(query, **params)
-            records = await result.data()
-
-        chunks = [
-            {
-                "chunk_id": r["chunk_id"],
-                "document_id": r["document_id"],
-                "idx": r["idx"],
-                "text": r["text"],
-                "start_offset": r["start_offset"],
-                "end_offset": r["end_offset"],
-                "score": r["score"],
-                "distance": 1 - r["score"],  # Convert similarity to distance for compatibility
-            }
-            for r in records
-        ]
-
-        logger.info("Vector search found %d chunks for workspace=%s", len(chunks), workspace_id)
+        chunks = await store.search(workspace_id, query_embedding, top_k, connection_ids)
+        logger.info("Vector search (%s) found %d chunks for workspace=%s", store.name, len(chunks), workspace_id)
         return chunks
 
     except Exception as e:
@@ -350,7 +285,7 @@ async def build_context(
         }
     """
     # 1. Embed prompt
-    query_embedding = await embed_query(prompt)
+    query_embedding = await embed_query(workspace_id, prompt)
 
     # 2. Resolve vault filtering
     connection_ids = None
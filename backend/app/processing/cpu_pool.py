@@ -0,0 +1,106 @@
+"""
+Managed process pool for CPU-bound work.
+
+File extraction (pdfplumber, openpyxl, ...), CSV flattening and chunking are
+pure-Python CPU work. Run on the event loop they stall every other coroutine
+in the process (webhooks, queries, other jobs). run_cpu_bound() ships them to
+a process-wide ProcessPoolExecutor instead:
+
+- Pool size: `settings.cpu_pool_workers` (0 = one per CPU core)
+- Backlog: at most 2 tasks per worker are submitted; further callers wait
+- Timeout: `settings.cpu_pool_task_timeout` seconds per task. On timeout the
+  pool's workers are terminated and the pool is recreated on next use, since
+  a running task cannot be cancelled otherwise. Other tasks running at that
+  moment fail with BrokenProcessPool and are retried by the job runner.
+- Workers are recycled every CPU_POOL_MAX_TASKS_PER_CHILD tasks to bound
+  memory growth from parser libraries.
+
+Callable and arguments must be picklable (module-level functions only).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CPU_POOL_MAX_TASKS_PER_CHILD = 50
+# Inputs smaller than this are cheaper to process inline than to pickle across processes
+CPU_OFFLOAD_MIN_CHARS = 20_000
+
+# Process-scoped singleton pool (created lazily in whichever process needs it)
+_executor: ProcessPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+
+
+def _pool_size() -> int:
+    return settings.cpu_pool_workers or os.cpu_count() or 1
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the singleton process pool, creating it on first use."""
+    global _executor
+
+    if _executor is None:
+        size = _pool_size()
+        logger.info("Starting CPU pool with %d workers", size)
+        _executor = ProcessPoolExecutor(
+            max_workers=size,
+            # spawn: max_tasks_per_child is incompatible with fork, and forking a
+            # process with live event loops and DB connections is unsafe anyway
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=CPU_POOL_MAX_TASKS_PER_CHILD,
+        )
+
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+
+    if _slots is None:
+        _slots = asyncio.Semaphore(_pool_size() * 2)
+    return _slots
+
+
+def _kill_executor() -> None:
+    """Terminate the pool's worker processes; the next call starts a fresh pool."""
+    global _executor
+
+    if _executor is None:
+        return
+    executor, _executor = _executor, None
+    # ProcessPoolExecutor cannot cancel a running task; terminating the workers is the only way
+    for proc in list(getattr(executor, "_processes", {}).values()):
+        proc.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_cpu_bound[T](fn: Callable[..., T], *args: Any, timeout: float | None = None) -> T:
+    """Run fn(*args) in the process pool without blocking the event loop."""
+    timeout = timeout if timeout is not None else settings.cpu_pool_task_timeout
+    loop = asyncio.get_running_loop()
+
+    async with _get_slots():
+        future = loop.run_in_executor(get_executor(), fn, *args)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            logger.error("CPU task %s exceeded %.0fs, restarting pool", getattr(fn, "__name__", fn), timeout)
+            _kill_executor()
+            raise
+
+
+def shutdown_cpu_pool() -> None:
+    """Shut the pool down. Call on process shutdown."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,240 @@
+"""
+Cross-document embedding batcher.
+
+Concurrent EMBED_CHUNKS jobs (and fused PROCESS_DOCUMENT jobs) each hold a
+handful of chunks - a short email is often a single chunk. Instead of one
+embeddings request per document, callers submit their texts to a
+process-wide batcher that packs pending texts from any document or workspace
+into requests up to the provider's limits and fans the vectors back out to
+each caller.
+
+A request is sent as soon as it is full, or `embedding_batch_wait_ms` after
+the first text arrived, whichever comes first. Up to
+`embedding_batch_concurrency` requests are in flight at once, paced by a
+RateLimiter on the `openai_embedding_rpm` / `openai_embedding_tpm` budgets;
+429 responses slow the limiter down and the request is retried.
+
+The batcher is bound to the event loop it was created on; the worker runs a
+single loop, so one instance serves every job in the process.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+
+import openai
+from openai import NOT_GIVEN, AsyncOpenAI
+
+from app.config import settings
+from app.openai_client import get_openai_client
+from app.processing.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Provider limits (OpenAI embeddings endpoint)
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+MAX_TOKENS_PER_INPUT = 8191
+MAX_RATE_LIMIT_RETRIES = 6
+
+# No tokenizer dependency: ~3 chars per token overestimates tokens for
+# typical text, which keeps packed requests safely under the limit.
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class _Submission:
+    """One caller's texts; resolved once every text has a vector."""
+
+    texts: list[str]
+    future: asyncio.Future
+    vectors: list[list[float] | None] = field(default_factory=list)
+    remaining: int = 0
+
+    def __post_init__(self) -> None:
+        self.vectors = [None] * len(self.texts)
+        self.remaining = len(self.texts)
+
+
+@dataclass
+class _Item:
+    submission: _Submission
+    index: int
+    text: str
+    tokens: int
+
+
+class EmbeddingBatcher:
+    """Packs embedding inputs from many callers into few provider requests."""
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: int | None = None,
+        client: AsyncOpenAI | None = None,
+        max_wait: float | None = None,
+        max_inputs: int = MAX_INPUTS_PER_REQUEST,
+        max_tokens: int = MAX_TOKENS_PER_REQUEST,
+        concurrency: int | None = None,
+    ) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        # 429s are retried here under the shared limiter, not by the SDK
+        self.client = (client or get_openai_client()).with_options(max_retries=0)
+        self.limiter = RateLimiter(f"embeddings[{model}]", settings.openai_embedding_rpm, settings.openai_embedding_tpm)
+        self.max_wait = max_wait if max_wait is not None else settings.embedding_batch_wait_ms / 1000
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self._slots = asyncio.Semaphore(concurrency or settings.embedding_batch_concurrency)
+        self._loop = asyncio.get_running_loop()
+        self._pending: deque[_Item] = deque()
+        self._pending_tokens = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._requests: set[asyncio.Task] = set()
+        self.requests_sent = 0
+        self.inputs_sent = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed `texts`, sharing provider requests with other concurrent callers."""
+        if not texts:
+            return []
+        submission = _Submission(texts=texts, future=asyncio.get_running_loop().create_future())
+        for i, text in enumerate(texts):
+            tokens = min(estimate_tokens(text), MAX_TOKENS_PER_INPUT)
+            self._pending.append(_Item(submission, i, text, tokens))
+            self._pending_tokens += tokens
+        self._ensure_running()
+        self._wakeup.set()
+        vectors: list[list[float]] = await submission.future
+        return vectors
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch_loop(), name="embedding-batcher")
+
+    def _full(self) -> bool:
+        return len(self._pending) >= self.max_inputs or self._pending_tokens >= self.max_tokens
+
+    def _take_batch(self) -> list[_Item]:
+        batch: list[_Item] = []
+        tokens = 0
+        while self._pending and len(batch) < self.max_inputs:
+            item = self._pending[0]
+            if batch and tokens + item.tokens > self.max_tokens:
+                break
+            batch.append(self._pending.popleft())
+            tokens += item.tokens
+        self._pending_tokens -= tokens
+        return batch
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=60)
+                except TimeoutError:
+                    if not self._pending:
+                        return  # idle; restarted by the next embed()
+                continue
+
+            # Linger briefly so concurrent callers can join this request
+            if not self._full():
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.max_wait
+                while not self._full() and (remaining := deadline - loop.time()) > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                    except TimeoutError:
+                        break
+
+            await self._slots.acquire()
+            batch = self._take_batch()
+            task = asyncio.create_task(self._send(batch))
+            self._requests.add(task)
+            task.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch: list[_Item]) -> None:
+        try:
+            await self._request(batch)
+        finally:
+            self._slots.release()
+
+    async def _create(self, batch: list[_Item]):
+        tokens = sum(item.tokens for item in batch)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            await self.limiter.acquire(tokens)
+            try:
+                resp = await self.client.embeddings.create(
+                    input=[item.text for item in batch], model=self.model, dimensions=self.dimensions or NOT_GIVEN
+                )
+            except openai.RateLimitError as e:
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                self.limiter.throttled(_retry_after(e))
+                continue
+            self.limiter.succeeded()
+            return resp
+
+    async def _request(self, batch: list[_Item]) -> None:
+        try:
+            resp = await self._create(batch)
+        except openai.BadRequestError as e:
+            submissions = {id(item.submission): item.submission for item in batch}
+            if len(submissions) > 1:
+                # One caller's bad input must not fail everyone packed alongside it
+                logger.warning("Embedding request rejected (%s); retrying %d callers separately", e, len(submissions))
+                await asyncio.gather(
+                    *(self._request([it for it in batch if it.submission is s]) for s in submissions.values())
+                )
+                return
+            self._fail(batch, e)
+            return
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        self.requests_sent += 1
+        self.inputs_sent += len(batch)
+        for item, emb in zip(batch, resp.data, strict=True):
+            sub = item.submission
+            sub.vectors[item.index] = emb.embedding
+            sub.remaining -= 1
+            if sub.remaining == 0 and not sub.future.done():
+                sub.future.set_result(sub.vectors)
+        logger.debug(
+            "Embedded %d inputs from %d callers in one request", len(batch), len({id(i.submission) for i in batch})
+        )
+
+    @staticmethod
+    def _fail(batch: list[_Item], error: Exception) -> None:
+        for item in batch:
+            if not item.submission.future.done():
+                item.submission.future.set_exception(error)
+
+
+def _retry_after(error: openai.APIStatusError) -> float | None:
+    value = error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+_batchers: dict[tuple[str, int | None], EmbeddingBatcher] = {}
+
+
+def get_embedding_batcher(model: str, dimensions: int | None = None) -> EmbeddingBatcher:
+    """Process-wide batcher for `model` (and shortened `dimensions`), bound to the current event loop."""
+    key = (model, dimensions)
+    batcher = _batchers.get(key)
+    if batcher is None or batcher._loop is not asyncio.get_running_loop():
+        batcher = _batchers[key] = EmbeddingBatcher(model, dimensions)
+    return batcher
@@ -0,0 +1,39 @@
+"""
+Content-addressed embedding cache.
+
+Vectors are stored in `embedding_cache` under (model, sha256(chunk text)).
+embed_and_store looks every chunk up first and only sends misses to the
+embeddings API, so re-chunking a document after a small edit, or repeated
+boilerplate such as email signatures, costs no API calls.
+
+The table is bounded by `settings.embedding_cache_max_rows`: a periodic task
+deletes the least recently used rows beyond the limit (see
+app.processing.hash_cache).
+"""
+
+import hashlib
+
+from app.models import EmbeddingCache
+from app.processing.hash_cache import HashCache
+
+_cache = HashCache(EmbeddingCache, ["model"], "embedding", "embedding_cache_max_rows")
+
+
+def text_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def get_cached_embeddings(model: str, hashes: list[str]) -> dict[str, list[float]]:
+    """Return cached vectors for the given text hashes (misses are absent)."""
+    cached = await _cache.get({"model": model}, hashes)
+    return {h: [float(x) for x in v] for h, v in cached.items()}
+
+
+async def put_cached_embeddings(model: str, vectors: dict[str, list[float]]) -> None:
+    """Store freshly computed vectors; existing entries only get their last_used_at bumped."""
+    await _cache.put({"model": model}, vectors)
+
+
+async def evict_embedding_cache() -> int:
+    """Delete least recently used rows beyond embedding_cache_max_rows. Returns rows deleted."""
+    return await _cache.evict()
@@ -0,0 +1,148 @@
+"""
+Pluggable embedding providers.
+
+- "openai": `text-embedding-3-small` through the shared EmbeddingBatcher
+  (optionally shortened via `settings.embedding_dimensions`)
+- "local": a sentence-transformers model run in the CPU process pool, for
+  offline deployments and bulk backfills without per-token cost. Requires the
+  optional `sentence-transformers` package in the worker image.
+
+The provider is chosen per workspace (`workspaces.embedding_provider`),
+falling back to `settings.embedding_provider`. Vectors from different
+providers are not comparable, so switching a workspace's provider requires
+re-embedding its chunks; the embedding cache is namespaced per provider.
+"""
+
+import asyncio
+import logging
+import uuid
+
+from openai import NOT_GIVEN
+from sqlalchemy import select
+
+from app.config import settings
+from app.db import get_async_session
+from app.models import Workspace
+from app.openai_client import get_openai_client
+from app.processing.cpu_pool import run_cpu_bound
+from app.processing.embedding_batcher import get_embedding_batcher
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MODEL = "text-embedding-3-small"
+OPENAI_NATIVE_DIMENSIONS = 1536
+
+
+class EmbeddingProvider:
+    name: str
+
+    @property
+    def dimensions(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def cache_key(self) -> str:
+        """Namespace for the embedding cache."""
+        raise NotImplementedError
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed document chunks (throughput-oriented)."""
+        raise NotImplementedError
+
+    async def embed_query(self, text: str) -> list[float]:
+        """Embed a single query (latency-oriented)."""
+        return (await self.embed([text]))[0]
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    name = "openai"
+
+    @property
+    def dimensions(self) -> int:
+        return settings.embedding_dimensions
+
+    @property
+    def _requested_dimensions(self) -> int | None:
+        """`dimensions` to request from the API, or None for the model's native size."""
+        dims = settings.embedding_dimensions
+        return dims if dims != OPENAI_NATIVE_DIMENSIONS else None
+
+    @property
+    def cache_key(self) -> str:
+        dims = self._requested_dimensions
+        return f"{OPENAI_MODEL}@{dims}" if dims else OPENAI_MODEL
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await get_embedding_batcher(OPENAI_MODEL, self._requested_dimensions).embed(texts)
+
+    def request_body(self, text: str) -> dict:
+        """Embeddings request for one text, as written to Batch API input files."""
+        dims = self._requested_dimensions
+        return {"model": OPENAI_MODEL, "input": text, **({"dimensions": dims} if dims else {})}
+
+    async def embed_query(self, text: str) -> list[float]:
+        # Queries skip the batcher's linger delay
+        resp = await get_openai_client().embeddings.create(
+            input=[text], model=OPENAI_MODEL, dimensions=self._requested_dimensions or NOT_GIVEN
+        )
+        return resp.data[0].embedding
+
+
+# Loaded once per pool worker process
+_local_models: dict = {}
+
+
+def _encode_local(model_name: str, texts: list[str]) -> list[list[float]]:
+    """Runs in a CPU pool worker."""
+    model = _local_models.get(model_name)
+    if model is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("embedding provider 'local' requires the sentence-transformers package") from e
+        model = _local_models[model_name] = SentenceTransformer(model_name, device="cpu")
+    vectors: list[list[float]] = model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).tolist()
+    return vectors
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    name = "local"
+
+    @property
+    def dimensions(self) -> int:
+        return settings.local_embedding_dimensions
+
+    @property
+    def cache_key(self) -> str:
+        return f"local:{settings.local_embedding_model}"
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        size = settings.local_embedding_batch_size
+        batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+        # Batches spread over the pool's workers; run_cpu_bound bounds the backlog
+        results = await asyncio.gather(
+            *(run_cpu_bound(_encode_local, settings.local_embedding_model, batch) for batch in batches)
+        )
+        return [vector for batch in results for vector in batch]
+
+
+EMBEDDING_PROVIDERS: dict[str, EmbeddingProvider] = {
+    provider.name: provider for provider in (OpenAIEmbeddingProvider(), LocalEmbeddingProvider())
+}
+
+
+def get_embedding_provider(name: str | None = None) -> EmbeddingProvider:
+    """Provider by name, or the deployment default."""
+    name = name or settings.embedding_provider
+    if name not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {name!r}; expected one of {sorted(EMBEDDING_PROVIDERS)}")
+    return EMBEDDING_PROVIDERS[name]
+
+
+async def get_workspace_embedding_provider(workspace_id: uuid.UUID) -> EmbeddingProvider:
+    """Provider configured for the workspace, or the deployment default."""
+    Session = get_async_session()
+    async with Session() as session:
+        result = await session.execute(select(Workspace.embedding_provider).where(Workspace.id == workspace_id))
+        name = result.scalar_one_or_none()
+    return get_embedding_provider(name)
@@ -1,191 +1,192 @@
 """
-OpenAI embeddings writer.
+Embeddings writer.
 
-Embeds chunk texts and stores vectors in:
+Embeds chunk texts with the workspace's embedding provider
+(see app.processing.embedding_providers) and stores vectors in the configured vector store(s)
+(see app.processing.vector_store):
 - Neo4j as Chunk nodes with vector embeddings (primary - for unified vector+graph queries)
-- PostgreSQL pgvector column (legacy - kept for backward compatibility during migration)
+- PostgreSQL pgvector column (optional)
 
 The Neo4j Chunk nodes enable unified Cypher queries that combine vector search
 with graph traversal in a single query.
+
+Vectors are looked up in the content-addressed embedding cache first; only
+misses go to the provider (for OpenAI, through the process-wide
+EmbeddingBatcher, so chunks from many concurrently running jobs share
+requests).
 """
 
+import asyncio
+import contextlib
 import logging
 import uuid
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
 
-from openai import AsyncOpenAI
 from sqlalchemy import select, update
 
-from app.config import settings
 from app.db import get_async_session
 from app.models import Document, DocumentChunk
-from app.neo4j_client import get_session
+from app.processing.embedding_cache import get_cached_embeddings, put_cached_embeddings, text_hash
+from app.processing.embedding_providers import EmbeddingProvider, get_workspace_embedding_provider
+from app.processing.vector_store import get_vector_stores
 
 logger = logging.getLogger(__name__)
 
-MODEL = "text-embedding-3-small"
-BATCH_SIZE = 50  # OpenAI allows up to 2048 inputs, but keep batches manageable
+PAGE_SIZE = 500  # chunks embedded and written per step
+PIPELINE_DEPTH = 1  # embedded pages buffered ahead of the writer
 
 
-async def _upsert_chunks_to_neo4j(
+async def _page_unembedded_chunks(
+    workspace_id: uuid.UUID, document_id: uuid.UUID
+) -> AsyncIterator[list[DocumentChunk]]:
+    """Yield a document's unembedded chunks in idx order, PAGE_SIZE at a time (keyset pagination)."""
+    Session = get_async_session()
+    last_idx = -1
+    while True:
+        async with Session() as session:
+            result = await session.execute(
+                select(DocumentChunk)
+                .where(
+                    DocumentChunk.workspace_id == workspace_id,
+                    DocumentChunk.document_id == document_id,
+                    DocumentChunk.embedded_at.is_(None),
+                    DocumentChunk.idx > last_idx,
+                )
+                .order_by(DocumentChunk.idx)
+                .limit(PAGE_SIZE)
+            )
+            page = list(result.scalars().all())
+        if not page:
+            return
+        yield page
+        if len(page) < PAGE_SIZE:
+            return
+        last_idx = page[-1].idx
+
+
+async def _embed_page(
+    provider: EmbeddingProvider, chunks: list[DocumentChunk]
+) -> tuple[list[tuple[DocumentChunk, list[float]]], int]:
+    """Resolve vectors for one page via the cache and the provider. Returns (pairs, cache hits)."""
+    hashes = [text_hash(c.text) for c in chunks]
+    cache_key = provider.cache_key
+    cached = await get_cached_embeddings(cache_key, hashes)
+
+    # Embed each distinct missing text once
+    missing = {h: c.text for h, c in zip(hashes, chunks, strict=True) if h not in cached}
+    if missing:
+        fresh = await provider.embed(list(missing.values()))
+        computed = dict(zip(missing.keys(), fresh, strict=True))
+        await put_cached_embeddings(cache_key, computed)
+        cached.update(computed)
+
+    return [(c, cached[h]) for c, h in zip(chunks, hashes, strict=True)], len(chunks) - len(missing)
+
+
+async def _store_page(
     workspace_id: uuid.UUID,
     document_id: uuid.UUID,
     source_connection_id: uuid.UUID,
     chunks_with_embeddings: list[tuple[DocumentChunk, list[float]]],
 ) -> None:
-    """
-    Upsert Chunk nodes to Neo4j with embeddings.
-
-    Creates:
-    - Document node (MERGE, idempotent) with source_connection_id for vault filtering
-    - Chunk nodes with embedding vectors and source_connection_id
-    - PART_OF relationships from Chunk to Document
+    for store in get_vector_stores():
+        await store.write(workspace_id, document_id, source_connection_id, chunks_with_embeddings)
 
-    source_connection_id is stored on both Document and Chunk nodes for efficient
-    vault filtering (Chunk nodes can be filtered directly without traversal).
-
-    Uses the singleton driver from neo4j_client for connection pooling.
-    """
-    if not chunks_with_embeddings:
-        return
-
-    ws = str(workspace_id)
-    doc_id = str(document_id)
-    conn_id = str(source_connection_id)
-
-    async with get_session() as session:
-        # Ensure Document node exists with source_connection_id (idempotent MERGE)
-        await session.run(
-            """
-            MERGE (d:Document {workspace_id: $ws, key: $key})
-            SET d.document_id = $doc_id,
-                d.source_connection_id = $conn_id
-            """,
-            ws=ws,
-            key=f"doc:{doc_id}",
-            doc_id=doc_id,
-            conn_id=conn_id,
-        )
-
-        # Batch upsert chunks with embeddings
-        # Using UNWIND for efficient batch processing
-        # source_connection_id on Chunk enables direct vault filtering without traversal
-        chunk_data = [
-            {
-                "chunk_id": str(chunk.id),
-                "idx": chunk.idx,
-                "text": chunk.text,
-                "start_offset": chunk.start_offset,
-                "end_offset": chunk.end_offset,
-                "embedding": embedding,
-            }
-            for chunk, embedding in chunks_with_embeddings
-        ]
-
-        await session.run(
-            """
-            UNWIND $chunks AS c
-            MERGE (chunk:Chunk {
-                workspace_id: $ws,
-                document_id: $doc_id,
-                idx: c.idx
-            })
-            SET chunk.chunk_id = c.chunk_id,
-                chunk.text = c.text,
-                chunk.start_offset = c.start_offset,
-                chunk.end_offset = c.end_offset,
-                chunk.embedding = c.embedding,
-                chunk.source_connection_id = $conn_id
-
-            WITH chunk
-            MATCH (d:Document {workspace_id: $ws, key: $doc_key})
-            MERGE (chunk)-[:PART_OF]->(d)
-            """,
-            ws=ws,
-            doc_id=doc_id,
-            doc_key=f"doc:{doc_id}",
-            conn_id=conn_id,
-            chunks=chunk_data,
+    # Only marked once every backend has the vectors, so a failed write is retried
+    Session = get_async_session()
+    async with Session() as session:
+        await session.execute(
+            update(DocumentChunk)
+            .where(DocumentChunk.id.in_([c.id for c, _ in chunks_with_embeddings]))
+            .values(embedded_at=datetime.now(UTC))
         )
+        await session.commit()
 
-    logger.info("Upserted %d chunks to Neo4j for doc=%s", len(chunks_with_embeddings), doc_id)
 
-
-async def embed_and_store(workspace_id: uuid.UUID, document_id: uuid.UUID) -> int:
+async def embed_and_store(
+    workspace_id: uuid.UUID,
+    document_id: uuid.UUID,
+    chunks: list[DocumentChunk] | None = None,
+    source_connection_id: uuid.UUID | None = None,
+) -> int:
     """
-    Embed all chunks for a document and store vectors.
+    Embed all unembedded chunks for a document and store vectors.
+
+    Streams the document in pages of PAGE_SIZE chunks: while one page is
+    written to the vector store(s), the next is already being embedded, and
+    at most PIPELINE_DEPTH embedded pages wait for the writer. Peak memory and
+    per-transaction size are bounded by the page size, not the document size.
+    Each page is written to every backend selected by `settings.vector_store`
+    and then stamped with `embedded_at`, so a retry resumes after the last
+    completed page.
 
-    Writes embeddings to:
-    1. Neo4j Chunk nodes (for unified vector+graph queries)
-    2. PostgreSQL pgvector column (legacy, for backward compatibility)
+    The fused pipeline passes the freshly stored `chunks` and the document's
+    `source_connection_id` so neither has to be re-read from Postgres.
 
     Returns count of chunks embedded.
     """
-    Session = get_async_session()
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
-
-    # Fetch document to get source_connection_id for vault filtering in Neo4j
-    async with Session() as session:
-        doc_result = await session.execute(
-            select(Document.source_connection_id).where(
-                Document.id == document_id,
-                Document.workspace_id == workspace_id,
-            )
-        )
-        doc_row = doc_result.one_or_none()
-
-    if not doc_row:
-        logger.warning("Document not found: %s", document_id)
-        return 0
-
-    source_connection_id = doc_row[0]
-
-    async with Session() as session:
-        result = await session.execute(
-            select(DocumentChunk)
-            .where(
-                DocumentChunk.workspace_id == workspace_id,
-                DocumentChunk.document_id == document_id,
-                DocumentChunk.embedding.is_(None),
+    if source_connection_id is None:
+        # Fetch document to get source_connection_id for vault filtering in Neo4j
+        Session = get_async_session()
+        async with Session() as session:
+            doc_result = await session.execute(
+                select(Document.source_connection_id).where(
+                    Document.id == document_id,
+                    Document.workspace_id == workspace_id,
+                )
             )
-            .order_by(DocumentChunk.idx)
-        )
-        chunks = list(result.scalars().all())
+            doc_row = doc_result.one_or_none()
 
-    if not chunks:
-        return 0
+        if not doc_row:
+            logger.warning("Document not found: %s", document_id)
+            return 0
 
-    embedded = 0
-    all_chunks_with_embeddings: list[tuple[DocumentChunk, list[float]]] = []
+        source_connection_id = doc_row[0]
 
-    for i in range(0, len(chunks), BATCH_SIZE):
-        batch = chunks[i : i + BATCH_SIZE]
-        texts = [c.text for c in batch]
+    provider = await get_workspace_embedding_provider(workspace_id)
 
-        resp = await client.embeddings.create(input=texts, model=MODEL)
+    if chunks is not None:
+        given = chunks
 
-        # Collect chunks with their embeddings for Neo4j batch upsert
-        batch_with_embeddings = [
-            (chunk, emb_data.embedding)
-            for chunk, emb_data in zip(batch, resp.data, strict=True)
-        ]
-        all_chunks_with_embeddings.extend(batch_with_embeddings)
+        async def pages() -> AsyncIterator[list[DocumentChunk]]:
+            for i in range(0, len(given), PAGE_SIZE):
+                yield given[i : i + PAGE_SIZE]
+    else:
 
-        # Write to PostgreSQL pgvector (legacy)
-        async with Session() as session:
-            for chunk, embedding in batch_with_embeddings:
-                await session.execute(
-                    update(DocumentChunk)
-                    .where(DocumentChunk.id == chunk.id)
-                    .values(embedding=embedding)
-                )
-            await session.commit()
+        def pages() -> AsyncIterator[list[DocumentChunk]]:
+            return _page_unembedded_chunks(workspace_id, document_id)
 
-        embedded += len(batch)
-        logger.info("Embedded batch %d-%d for doc=%s", i, i + len(batch), document_id)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+    cache_hits = 0
 
-    # Write all chunks to Neo4j in one batch
-    await _upsert_chunks_to_neo4j(
-        workspace_id, document_id, source_connection_id, all_chunks_with_embeddings
-    )
+    async def produce() -> None:
+        nonlocal cache_hits
+        try:
+            async for page in pages():
+                pairs, hits = await _embed_page(provider, page)
+                cache_hits += hits
+                await queue.put(pairs)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
 
+    producer = asyncio.create_task(produce())
+    embedded = 0
+    try:
+        while (item := await queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            await _store_page(workspace_id, document_id, source_connection_id, item)
+            embedded += len(item)
+            logger.info("Embedded %d chunks for doc=%s so far", embedded, document_id)
+    finally:
+        if not producer.done():
+            producer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await producer
+
+    if embedded:
+        logger.info("Embedded %d chunks for doc=%s (%d from cache)", embedded, document_id, cache_hits)
     return embedded
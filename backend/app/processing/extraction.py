@@ -2,31 +2,72 @@
 LLM-based entity and relation extraction.
 Uses OpenAI with strict JSON output to extract Person, Company, Topic entities
 and MENTIONS relations from document text.
+
+Documents longer than MAX_CONTENT_CHARS are extracted map-reduce style (see
+`settings.extraction_mode`): the text is split with the chunker, every chunk
+is extracted concurrently, and the per-chunk results are merged with
+entities deduplicated by resolve_entity_key. Per-chunk results are cached
+(app.processing.extraction_cache), so unchanged chunks are not re-extracted.
+
+Documents up to `settings.extraction_batch_doc_chars` go through the
+extraction batcher, which shares one request (and one system prompt) between
+several concurrently processed short documents.
+
+A deterministic regex/gazetteer pass (app.processing.pre_extraction) runs
+first: its entities are merged with the LLM's, it trims header and quoted
+lines from the LLM input, and documents with almost no prose skip the LLM.
+
+Whole-document results are cached by the hash of the rendered LLM input as
+well, so identical documents (forwarded emails, a file synced through two
+connections) reach the LLM once per workspace. Cache entries are keyed by a prompt version hashed from the prompt
+texts: editing a prompt invalidates its entries, and the stale rows are purged
+periodically.
 """
 
+import asyncio
+import hashlib
 import json
 import logging
+import uuid
+from collections import defaultdict
 from typing import Any
 
-from openai import AsyncOpenAI
-
 from app.config import settings
+from app.openai_client import get_openai_client
+from app.processing.batch_api import BatchRequest
+from app.processing.chunker import Chunk, chunk_text
+from app.processing.cpu_pool import CPU_OFFLOAD_MIN_CHARS, run_cpu_bound
+from app.processing.embedding_cache import text_hash
+from app.processing.entity_resolution import resolve_entity_key
+from app.processing.extraction_batcher import get_extraction_batcher
+from app.processing.extraction_cache import (
+    delete_stale_extractions,
+    get_cached_extractions,
+    put_cached_extractions,
+)
+from app.processing.pre_extraction import (
+    IGNORE_DOMAINS,
+    PRE_EXTRACTION_VERSION,
+    PreExtraction,
+    pre_extract_document,
+)
 
 logger = logging.getLogger(__name__)
 
-SYSTEM_PROMPT = """You are an entity extraction system. Given a document, extract entities and relations.
+EXTRACTION_MODEL = "gpt-4o-mini"
+EXTRACTION_MODES = ("map_reduce", "truncate")
+MAX_CONTENT_CHARS = 8000  # Longer documents are truncated or map-reduced
 
-Return ONLY valid JSON matching this schema:
-{
+RESULT_SCHEMA = """{
   "entities": [
     {"type": "Person|Company|Topic", "name": "...", "email": "...", "domain": "..."}
   ],
   "relations": [
     {"from_name": "...", "to_name": "...", "type": "MENTIONS|WORKS_AT|HAS_CONTACT", "evidence": "..."}
   ]
-}
+}"""
 
-Rules:
+RULES = """Rules:
 - type must be one of: Person, Company, Topic
 - For Person: include email if available
 - For Company: include domain if available (e.g. "acme.com")
@@ -36,56 +77,174 @@ Rules:
 - If no entities found, return {"entities": [], "relations": []}
 - Do NOT hallucinate entities not present in the text"""
 
-USER_TEMPLATE = """Extract entities and relations from this document.
+SYSTEM_PROMPT = f"""You are an entity extraction system. Given a document, extract entities and relations.
+
+Return ONLY valid JSON matching this schema:
+{RESULT_SCHEMA}
+
+{RULES}"""
+
+# Several short documents per request (see app.processing.extraction_batcher)
+BATCH_SYSTEM_PROMPT = f"""You are an entity extraction system. You are given several documents, each starting \
+with a line "### Document <id>". Extract entities and relations from each document independently.
+
+Return ONLY valid JSON of the form {{"documents": {{"<id>": <result>, ...}}}} with one entry for every \
+document id, where each <result> matches this schema:
+{RESULT_SCHEMA}
 
-Title: {title}
+{RULES}
+- Entities and relations of a document must come from that document's text only"""
+
+DOCUMENT_TEMPLATE = """Title: {title}
 Author: {author_name} <{author_email}>
 Source: {source_type}
 
 Content:
 {content}"""
 
+USER_TEMPLATE = "Extract entities and relations from this document.\n\n{section}"
 
-async def extract_entities_relations(
-    content_text: str,
-    title: str = "",
-    author_name: str = "",
-    author_email: str = "",
-    source_type: str = "",
-) -> dict:
-    """
-    Extract entities and relations from text via LLM.
-    Returns {"entities": [...], "relations": [...]}.
-    """
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+# Chunk prompts carry no document metadata so a cached result depends only on the chunk text
+CHUNK_TEMPLATE = """Extract entities and relations from this document excerpt.
 
-    # Truncate very long content to avoid token limits
-    content = content_text[:8000] if len(content_text) > 8000 else content_text
+Content:
+{content}"""
 
-    user_msg = USER_TEMPLATE.format(
-        title=title or "(no title)",
-        author_name=author_name or "unknown",
-        author_email=author_email or "unknown",
-        source_type=source_type or "unknown",
-        content=content,
+
+def _prompt_version(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+# Derived from the prompt texts, so editing a prompt invalidates cached results
+CHUNK_PROMPT_VERSION = _prompt_version(SYSTEM_PROMPT, CHUNK_TEMPLATE)
+
+
+def document_prompt_version(mode: str | None = None) -> str:
+    """Version of whole-document results, which also depend on the extraction mode."""
+    return _prompt_version(
+        SYSTEM_PROMPT,
+        BATCH_SYSTEM_PROMPT,
+        USER_TEMPLATE,
+        DOCUMENT_TEMPLATE,
+        CHUNK_PROMPT_VERSION,
+        str(MAX_CONTENT_CHARS),
+        mode or settings.extraction_mode,
+        PRE_EXTRACTION_VERSION if settings.pre_extraction_enabled else "",
     )
 
-    resp = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+
+def _chat_body(user_msg: str) -> dict[str, Any]:
+    return {
+        "model": EXTRACTION_MODEL,
+        "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_msg},
         ],
-        temperature=0,
-        response_format={"type": "json_object"},
-    )
+        "temperature": 0,
+        "response_format": {"type": "json_object"},
+    }
 
-    raw = resp.choices[0].message.content or "{}"
+
+def _parse_result(raw: str) -> dict[str, Any] | None:
     try:
-        data: dict[str, Any] = json.loads(raw)
+        data = json.loads(raw)
     except json.JSONDecodeError:
         logger.warning("Failed to parse LLM JSON: %s", raw[:200])
+        return None
+    return {"entities": data.get("entities") or [], "relations": data.get("relations") or []}
+
+
+async def _complete(user_msg: str) -> dict[str, Any] | None:
+    """One extraction call. Returns None if the response is not valid JSON."""
+    resp = await get_openai_client().chat.completions.create(**_chat_body(user_msg))
+    return _parse_result(resp.choices[0].message.content or "{}")
+
+
+async def _prepare(content_text: str, workspace_id: uuid.UUID) -> tuple[PreExtraction | None, str | None]:
+    """Pre-extraction and the text to send to the LLM (None when the LLM is skipped)."""
+    if not settings.pre_extraction_enabled:
+        return None, content_text
+
+    pre = await pre_extract_document(workspace_id, content_text)
+    if pre.prose_chars < settings.pre_extraction_min_llm_chars:
+        return pre, None
+    # Long documents keep their text so chunk hashes match the stored chunks
+    return pre, pre.llm_text if len(content_text) <= MAX_CONTENT_CHARS else content_text
+
+
+def _map_reduced(content_text: str) -> bool:
+    return len(content_text) > MAX_CONTENT_CHARS and settings.extraction_mode == "map_reduce"
+
+
+async def _split(content_text: str) -> list[Chunk]:
+    if len(content_text) < CPU_OFFLOAD_MIN_CHARS:
+        return chunk_text(content_text)
+    return await run_cpu_bound(chunk_text, content_text)
+
+
+def _section(content_text: str, title: str, author_name: str, author_email: str, source_type: str) -> str:
+    # Truncate very long content to avoid token limits
+    return DOCUMENT_TEMPLATE.format(
+        title=title or "(no title)",
+        author_name=author_name or "unknown",
+        author_email=author_email or "unknown",
+        source_type=source_type or "unknown",
+        content=content_text[:MAX_CONTENT_CHARS],
+    )
+
+
+def _document_key(llm_input: str, title: str, author_name: str, author_email: str, source_type: str) -> str:
+    """Cache key of a whole-document result: the hash of what is sent to the LLM."""
+    if _map_reduced(llm_input):
+        # Chunk prompts carry no headers
+        return text_hash(llm_input)
+    return text_hash(_section(llm_input, title, author_name, author_email, source_type))
+
+
+async def extract_entities_relations(
+    workspace_id: uuid.UUID,
+    content_text: str,
+    title: str = "",
+    author_name: str = "",
+    author_email: str = "",
+    source_type: str = "",
+) -> dict:
+    """
+    Extract entities and relations from text via LLM.
+    Returns {"entities": [...], "relations": [...]}.
+
+    The LLM result is cached per workspace under the hash of the rendered LLM
+    input (see _document_key); documents that render the same share it.
+    Pre-extraction (matched against the workspace's graph) and header
+    heuristics are applied per document on top.
+    """
+    pre, llm_input = await _prepare(content_text, workspace_id)
+    data: dict[str, Any]
+    if llm_input is None:
+        # Only pre-extraction skips the LLM
+        if pre is not None:
+            logger.info(
+                "Skipping LLM extraction: %d chars of prose, %d pre-extracted", pre.prose_chars, len(pre.entities)
+            )
         data = {"entities": [], "relations": []}
+    else:
+        key = _document_key(llm_input, title, author_name, author_email, source_type)
+        version = document_prompt_version()
+        cached = (await get_cached_extractions(workspace_id, EXTRACTION_MODEL, version, [key])).get(key)
+        if cached is not None:
+            logger.info("Extraction cache hit for document input %s", key[:12])
+            data = cached
+        else:
+            data, complete = await _extract_document(
+                llm_input, title, author_name, author_email, source_type, workspace_id
+            )
+            # Partial results (unparseable responses) are not cached, so the next run retries them
+            if complete:
+                await put_cached_extractions(workspace_id, EXTRACTION_MODEL, version, {key: data})
+
+    if pre is not None and (pre.entities or pre.relations):
+        # Pre-extracted first: gazetteer names are the ones already in the graph
+        data = merge_extractions([{"entities": pre.entities, "relations": pre.relations}, data])
 
     # Add heuristic entities from email headers
     heuristic = _heuristic_entities(author_name, author_email)
@@ -97,24 +256,161 @@ async def extract_entities_relations(
     return data
 
 
-IGNORE_DOMAINS = {
-    "gmail.com",
-    "googlemail.com",
-    "yahoo.com",
-    "hotmail.com",
-    "outlook.com",
-    "gmx.de",
-    "gmx.net",
-    "web.de",
-    "icloud.com",
-    "me.com",
-    "t-online.de",
-    "live.com",
-    "aol.com",
-    "protonmail.com",
-    "proton.me",
-    "mail.com",
-}
+async def _extract_document(
+    content_text: str,
+    title: str,
+    author_name: str,
+    author_email: str,
+    source_type: str,
+    workspace_id: uuid.UUID,
+) -> tuple[dict[str, Any], bool]:
+    """LLM extraction for one document. Returns (result, whether every call succeeded)."""
+    if _map_reduced(content_text):
+        return await _extract_map_reduce(workspace_id, content_text)
+    else:
+        section = _section(content_text, title, author_name, author_email, source_type)
+
+        data = None
+        # A sequential worker has no concurrent documents to share a request with
+        if settings.worker_concurrency > 1 and len(content_text) <= settings.extraction_batch_doc_chars:
+            batcher = get_extraction_batcher(workspace_id, EXTRACTION_MODEL, BATCH_SYSTEM_PROMPT)
+            data = await batcher.extract(section)
+        if data is None:
+            data = await _complete(USER_TEMPLATE.format(section=section))
+        if data is None:
+            return {"entities": [], "relations": []}, False
+        return data, True
+
+
+async def _extract_map_reduce(workspace_id: uuid.UUID, content_text: str) -> tuple[dict[str, Any], bool]:
+    """Extract every chunk (cached per chunk text) and merge the results."""
+    chunks = await _split(content_text)
+
+    # Same chunker as CHUNK_DOCUMENT, so hashes line up with the stored chunks
+    hashes = [text_hash(c.text) for c in chunks]
+    results = await get_cached_extractions(workspace_id, EXTRACTION_MODEL, CHUNK_PROMPT_VERSION, hashes)
+
+    missing = {h: c.text for h, c in zip(hashes, chunks, strict=True) if h not in results}
+    slots = asyncio.Semaphore(max(1, settings.extraction_concurrency))
+
+    async def extract_chunk(content: str) -> dict[str, Any] | None:
+        async with slots:
+            return await _complete(CHUNK_TEMPLATE.format(content=content))
+
+    fresh = await asyncio.gather(*(extract_chunk(content) for content in missing.values()))
+    # Unparseable responses are not cached, so the next run retries them
+    computed = {h: r for h, r in zip(missing.keys(), fresh, strict=True) if r is not None}
+    await put_cached_extractions(workspace_id, EXTRACTION_MODEL, CHUNK_PROMPT_VERSION, computed)
+    results.update(computed)
+
+    logger.info(
+        "Map-reduce extraction: %d chunks (%d cached, %d failed)",
+        len(chunks),
+        len(chunks) - len(missing),
+        len(missing) - len(computed),
+    )
+    merged = merge_extractions([results[h] for h in hashes if h in results])
+    return merged, len(computed) == len(missing)
+
+
+def merge_extractions(results: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Merge per-chunk results into one.
+
+    Entities are deduplicated by resolve_entity_key, and a mention without
+    email/domain also matches an entity of the same type and name that has
+    one (and vice versa, unless the two conflict). The first occurrence keeps
+    its name and later ones only fill in a missing email/domain. Relation
+    endpoints are renamed to the merged entity's name and relations
+    deduplicated by (from_name, to_name, type).
+    """
+    entities: dict[str, dict] = {}
+    by_name: dict[str, str] = {}  # name-only entity key -> key in `entities`
+    relations: dict[tuple[str, str, str], dict] = {}
+
+    for data in results:
+        canonical: dict[str, str] = {}  # name in this chunk -> merged entity name
+        for ent in data.get("entities", []):
+            name = ent.get("name")
+            if not name:
+                continue
+            key = resolve_entity_key(ent)
+            name_key = resolve_entity_key({"type": ent.get("type", "unknown"), "name": name})
+            if key not in entities and name_key in by_name:
+                existing = entities[by_name[name_key]]
+                if not any(ent.get(f) and existing.get(f) and ent[f] != existing[f] for f in ("email", "domain")):
+                    key = by_name[name_key]
+            merged = entities.setdefault(key, dict(ent))
+            by_name.setdefault(name_key, key)
+            for field in ("email", "domain"):
+                if ent.get(field) and not merged.get(field):
+                    merged[field] = ent[field]
+            canonical[name] = merged["name"]
+
+        for rel in data.get("relations", []):
+            from_name = canonical.get(rel.get("from_name", ""), rel.get("from_name", ""))
+            to_name = canonical.get(rel.get("to_name", ""), rel.get("to_name", ""))
+            ident = (from_name, to_name, rel.get("type", ""))
+            if ident not in relations:
+                relations[ident] = {**rel, "from_name": from_name, "to_name": to_name}
+
+    return {"entities": list(entities.values()), "relations": list(relations.values())}
+
+
+async def plan_batch_extraction(
+    workspace_id: uuid.UUID,
+    content_text: str,
+    title: str = "",
+    author_name: str = "",
+    author_email: str = "",
+    source_type: str = "",
+) -> list[BatchRequest]:
+    """
+    Batch API requests whose results, once cached by cache_batch_extractions,
+    let extract_entities_relations with the same arguments run without an LLM
+    call. Empty when nothing needs the LLM.
+    """
+    _, llm_input = await _prepare(content_text, workspace_id)
+    if llm_input is None:
+        return []
+
+    key = _document_key(llm_input, title, author_name, author_email, source_type)
+    version = document_prompt_version()
+    if await get_cached_extractions(workspace_id, EXTRACTION_MODEL, version, [key]):
+        return []
+
+    if _map_reduced(llm_input):
+        texts = {text_hash(c.text): c.text for c in await _split(llm_input)}
+        cached = await get_cached_extractions(workspace_id, EXTRACTION_MODEL, CHUNK_PROMPT_VERSION, list(texts))
+        return [
+            BatchRequest(f"chunk:{CHUNK_PROMPT_VERSION}:{h}", _chat_body(CHUNK_TEMPLATE.format(content=t)))
+            for h, t in texts.items()
+            if h not in cached
+        ]
+
+    section = _section(llm_input, title, author_name, author_email, source_type)
+    return [BatchRequest(f"document:{version}:{key}", _chat_body(USER_TEMPLATE.format(section=section)))]
+
+
+async def cache_batch_extractions(workspace_id: uuid.UUID, results: dict[str, dict]) -> int:
+    """Store chat batch results (custom_id "<kind>:<version>:<hash>") in the workspace's extraction cache. Returns count."""
+    by_version: dict[str, dict[str, dict]] = defaultdict(dict)
+    for custom_id, body in results.items():
+        _, version, key = custom_id.split(":", 2)
+        choices = body.get("choices") or []
+        data = _parse_result((choices[0]["message"].get("content") if choices else None) or "{}")
+        if data is not None:
+            by_version[version][key] = data
+
+    for version, entries in by_version.items():
+        await put_cached_extractions(workspace_id, EXTRACTION_MODEL, version, entries)
+    return sum(len(entries) for entries in by_version.values())
+
+
+async def purge_stale_extraction_cache() -> int:
+    """Delete cached results of other models or outdated prompts. Returns rows deleted."""
+    current = {CHUNK_PROMPT_VERSION, *(document_prompt_version(mode) for mode in EXTRACTION_MODES)}
+    return await delete_stale_extractions(EXTRACTION_MODEL, current)
 
 
 def _heuristic_entities(author_name: str, author_email: str) -> list[dict]:
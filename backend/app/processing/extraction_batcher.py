@@ -0,0 +1,205 @@
+"""
+Cross-document extraction batcher for short documents.
+
+A 200-character email costs fewer tokens than the extraction system prompt
+sent with it. Concurrent EXTRACT_ENTITIES_RELATIONS jobs (and fused
+PROCESS_DOCUMENT jobs) submit short documents to a batcher that packs
+several of them into one JSON-mode request: each document is a
+"### Document <id>" section and the response holds one result per id, which
+is handed back to the document's own caller. Mentions and UPSERT_GRAPH
+payloads therefore stay per document. There is one batcher per workspace, so
+a request never mixes documents of different tenants.
+
+A request is sent once `extraction_batch_max_docs` documents are pending, or
+`extraction_batch_wait_ms` after the first one arrived. Batching only helps
+when several extraction jobs of one workspace run at once (worker_concurrency
+> 1, typically during a backfill), so extraction skips the batcher on
+sequential workers instead of waiting out the linger alone. A document whose section is missing or
+malformed in the response resolves to None and the caller extracts it on its
+own.
+
+Like the embedding batcher, an instance is bound to the event loop it was
+created on.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.openai_client import get_openai_client
+
+logger = logging.getLogger(__name__)
+
+MAX_CHARS_PER_REQUEST = 24_000  # Keeps packed prompts (and their JSON responses) modest
+
+
+@dataclass
+class _Submission:
+    section: str
+    future: asyncio.Future
+
+
+class ExtractionBatcher:
+    """Packs short extraction documents from many callers into few LLM requests."""
+
+    def __init__(
+        self,
+        model: str,
+        system_prompt: str,
+        client: AsyncOpenAI | None = None,
+        max_wait: float | None = None,
+        max_docs: int | None = None,
+        max_chars: int = MAX_CHARS_PER_REQUEST,
+        concurrency: int | None = None,
+    ) -> None:
+        self.model = model
+        self.system_prompt = system_prompt
+        self.client = client or get_openai_client()
+        self.max_wait = max_wait if max_wait is not None else settings.extraction_batch_wait_ms / 1000
+        self.max_docs = max_docs or settings.extraction_batch_max_docs
+        self.max_chars = max_chars
+        self._slots = asyncio.Semaphore(concurrency or settings.extraction_concurrency)
+        self._loop = asyncio.get_running_loop()
+        self._pending: deque[_Submission] = deque()
+        self._pending_chars = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._requests: set[asyncio.Task] = set()
+        self.requests_sent = 0
+        self.docs_sent = 0
+
+    async def extract(self, section: str) -> dict | None:
+        """
+        Extract one document (formatted with DOCUMENT_TEMPLATE), sharing a
+        request with other concurrent callers. Returns None if the response
+        had no usable result for it.
+        """
+        submission = _Submission(section=section, future=asyncio.get_running_loop().create_future())
+        self._pending.append(submission)
+        self._pending_chars += len(section)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch_loop(), name="extraction-batcher")
+        self._wakeup.set()
+        result: dict | None = await submission.future
+        return result
+
+    def idle(self) -> bool:
+        return not self._pending and not self._requests and (self._task is None or self._task.done())
+
+    def _full(self) -> bool:
+        return len(self._pending) >= self.max_docs or self._pending_chars >= self.max_chars
+
+    def _take_batch(self) -> list[_Submission]:
+        batch: list[_Submission] = []
+        chars = 0
+        while self._pending and len(batch) < self.max_docs:
+            size = len(self._pending[0].section)
+            if batch and chars + size > self.max_chars:
+                break
+            batch.append(self._pending.popleft())
+            chars += size
+        self._pending_chars -= chars
+        return batch
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=60)
+                except TimeoutError:
+                    if not self._pending:
+                        return  # idle; restarted by the next extract()
+                continue
+
+            # Linger briefly so concurrent callers can join this request
+            if not self._full():
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.max_wait
+                while not self._full() and (remaining := deadline - loop.time()) > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                    except TimeoutError:
+                        break
+
+            await self._slots.acquire()
+            batch = self._take_batch()
+            task = asyncio.create_task(self._send(batch))
+            self._requests.add(task)
+            task.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch: list[_Submission]) -> None:
+        try:
+            results = await self._request(batch)
+        except Exception as e:
+            for sub in batch:
+                if not sub.future.done():
+                    sub.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for sub, result in zip(batch, results, strict=True):
+            if not sub.future.done():
+                sub.future.set_result(result)
+
+    async def _request(self, batch: list[_Submission]) -> list[dict | None]:
+        if len(batch) == 1:
+            # Nothing to share the prompt with; the caller's single-document path is cheaper
+            return [None]
+
+        user_msg = "\n\n".join(f"### Document {i}\n{sub.section}" for i, sub in enumerate(batch, start=1))
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_msg},
+            ],
+            temperature=0,
+            response_format={"type": "json_object"},
+        )
+        self.requests_sent += 1
+        self.docs_sent += len(batch)
+
+        raw = resp.choices[0].message.content or "{}"
+        try:
+            documents = json.loads(raw).get("documents") or {}
+        except (json.JSONDecodeError, AttributeError):
+            logger.warning("Failed to parse batched LLM JSON: %s", raw[:200])
+            documents = {}
+
+        results: list[dict | None] = []
+        for i in range(1, len(batch) + 1):
+            data = documents.get(str(i)) if isinstance(documents, dict) else None
+            if isinstance(data, dict):
+                results.append({"entities": data.get("entities") or [], "relations": data.get("relations") or []})
+            else:
+                results.append(None)
+
+        missing = results.count(None)
+        if missing:
+            logger.warning("Batched extraction: %d of %d documents missing from response", missing, len(batch))
+        logger.debug("Extracted %d documents in one request", len(batch))
+        return results
+
+
+_batchers: dict[tuple[uuid.UUID | None, str, str], ExtractionBatcher] = {}
+
+
+def get_extraction_batcher(workspace_id: uuid.UUID | None, model: str, system_prompt: str) -> ExtractionBatcher:
+    """Batcher for one workspace's documents, bound to the current event loop."""
+    key = (workspace_id, model, system_prompt)
+    batcher = _batchers.get(key)
+    if batcher is None or batcher._loop is not asyncio.get_running_loop():
+        # Drop batchers of workspaces that have gone quiet
+        for stale in [k for k, b in _batchers.items() if b.idle()]:
+            del _batchers[stale]
+        batcher = _batchers[key] = ExtractionBatcher(model, system_prompt)
+    return batcher
@@ -0,0 +1,86 @@
+"""
+Entity extraction result cache.
+
+Extraction results are stored in `extraction_cache` under
+(workspace, model, prompt version, sha256 of the LLM input):
+- per chunk, by map-reduce extraction, so re-processing a document after an
+  edit only sends the changed chunks to the LLM
+- per document, keyed by the rendered prompt section (headers included), so
+  identical documents are extracted once
+
+Entries are scoped to the workspace: pre-extraction trims the LLM input with
+the workspace's gazetteer, and results never cross tenants.
+
+Chunk and document entries use different prompt versions (see
+app.processing.extraction), which are hashed from the prompt texts. Rows of
+outdated versions are purged every STALE_PURGE_INTERVAL. The table is
+bounded by `settings.extraction_cache_max_rows` with the same LRU eviction
+as the embedding cache (app.processing.hash_cache).
+"""
+
+import logging
+import uuid
+
+from sqlalchemy import String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db import get_async_session
+from app.models import ExtractionCache
+from app.processing.hash_cache import EVICT_BATCH, HashCache
+
+logger = logging.getLogger(__name__)
+
+STALE_PURGE_INTERVAL = 3600  # seconds between sweeps for outdated prompt versions
+
+_cache = HashCache(ExtractionCache, ["workspace_id", "model", "prompt_version"], "result", "extraction_cache_max_rows")
+
+STALE_SQL = text("""
+    DELETE FROM extraction_cache
+    WHERE (workspace_id, model, prompt_version, text_hash) IN (
+        SELECT workspace_id, model, prompt_version, text_hash FROM extraction_cache
+        WHERE model <> :model OR prompt_version <> ALL(:versions)
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    )
+""").bindparams(bindparam("versions", type_=ARRAY(String)))
+
+
+async def get_cached_extractions(
+    workspace_id: uuid.UUID, model: str, prompt_version: str, hashes: list[str]
+) -> dict[str, dict]:
+    """Return the workspace's cached results for the given text hashes (misses are absent)."""
+    scope = {"workspace_id": workspace_id, "model": model, "prompt_version": prompt_version}
+    return await _cache.get(scope, hashes)
+
+
+async def put_cached_extractions(
+    workspace_id: uuid.UUID, model: str, prompt_version: str, results: dict[str, dict]
+) -> None:
+    """Store fresh results; existing entries only get their last_used_at bumped."""
+    scope = {"workspace_id": workspace_id, "model": model, "prompt_version": prompt_version}
+    await _cache.put(scope, results)
+
+
+async def evict_extraction_cache() -> int:
+    """Delete least recently used rows beyond extraction_cache_max_rows. Returns rows deleted."""
+    return await _cache.evict()
+
+
+async def delete_stale_extractions(model: str, current_versions: set[str]) -> int:
+    """Delete rows not produced by `model` with one of `current_versions`. Returns rows deleted."""
+    Session = get_async_session()
+    total = 0
+    while True:
+        async with Session() as session:
+            result = await session.execute(
+                STALE_SQL, {"model": model, "versions": sorted(current_versions), "batch": EVICT_BATCH}
+            )
+            await session.commit()
+        deleted: int = result.rowcount
+        total += deleted
+        if deleted < EVICT_BATCH:
+            break
+
+    if total:
+        logger.info("Extraction cache: purged %d rows of outdated models or prompts", total)
+    return total
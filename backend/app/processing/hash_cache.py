@@ -0,0 +1,135 @@
+"""
+Hash-keyed result caches in Postgres with LRU eviction.
+
+Shared by the embedding and extraction caches. Rows are keyed by a fixed set
+of scope columns (model, prompt version, ...) plus `text_hash`, the sha256 of
+the input, and carry one value column and `last_used_at`:
+
+- `get` returns cached values for a list of hashes. `last_used_at` is only
+  refreshed when older than TOUCH_INTERVAL to keep hits from turning into a
+  write per row.
+- `put` inserts fresh values; existing rows only get last_used_at bumped.
+- `evict` deletes the least recently used rows beyond the table's row budget
+  (a settings field; 0 disables the cache).
+"""
+
+import logging
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import settings
+from app.db import get_async_session
+
+logger = logging.getLogger(__name__)
+
+EVICT_INTERVAL = 600  # seconds between eviction sweeps
+EVICT_BATCH = 10_000  # rows deleted per statement
+TOUCH_INTERVAL = timedelta(hours=6)
+PUT_BATCH = 1000  # rows per INSERT (keeps bind parameters well under asyncpg's limit)
+
+
+class HashCache:
+    """One cache table. `max_rows_setting` names the settings field holding its row budget."""
+
+    def __init__(self, model: Any, scope_columns: list[str], value_column: str, max_rows_setting: str) -> None:
+        self.model = model
+        self.table = model.__tablename__
+        self.scope_columns = scope_columns
+        self.value_column = value_column
+        self.max_rows_setting = max_rows_setting
+
+        key = ", ".join([*scope_columns, "text_hash"])
+        self._row_estimate_sql = text(f"SELECT reltuples::bigint FROM pg_class WHERE oid = '{self.table}'::regclass")
+        self._evict_sql = text(f"""
+            DELETE FROM {self.table}
+            WHERE ({key}) IN (
+                SELECT {key} FROM {self.table}
+                ORDER BY last_used_at
+                LIMIT :batch
+                FOR UPDATE SKIP LOCKED
+            )
+        """)
+
+    @property
+    def max_rows(self) -> int:
+        value: int = getattr(settings, self.max_rows_setting)
+        return value
+
+    def _scope_filter(self, scope: dict[str, Any]) -> list:
+        return [getattr(self.model, column) == scope[column] for column in self.scope_columns]
+
+    async def get(self, scope: dict[str, Any], hashes: list[str]) -> dict[str, Any]:
+        """Return cached values for the given text hashes (misses are absent)."""
+        if not hashes or self.max_rows <= 0:
+            return {}
+
+        text_hash_col = self.model.text_hash
+        Session = get_async_session()
+        async with Session() as session:
+            result = await session.execute(
+                select(text_hash_col, getattr(self.model, self.value_column), self.model.last_used_at).where(
+                    *self._scope_filter(scope), text_hash_col.in_(set(hashes))
+                )
+            )
+            rows = result.fetchall()
+
+            stale = [r[0] for r in rows if r[2] < datetime.now(UTC) - TOUCH_INTERVAL]
+            if stale:
+                await session.execute(
+                    update(self.model)
+                    .where(*self._scope_filter(scope), text_hash_col.in_(stale))
+                    .values(last_used_at=datetime.now(UTC))
+                )
+                await session.commit()
+
+        return {r[0]: r[1] for r in rows}
+
+    async def put(self, scope: dict[str, Any], values: dict[str, Any]) -> None:
+        """Store fresh values; existing entries only get their last_used_at bumped."""
+        if not values or self.max_rows <= 0:
+            return
+
+        rows = [{**scope, "text_hash": h, self.value_column: v} for h, v in values.items()]
+        Session = get_async_session()
+        async with Session() as session:
+            for i in range(0, len(rows), PUT_BATCH):
+                stmt = pg_insert(self.model).values(rows[i : i + PUT_BATCH])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[*self.scope_columns, "text_hash"],
+                    set_={"last_used_at": stmt.excluded.last_used_at},
+                )
+                await session.execute(stmt)
+            await session.commit()
+
+    async def evict(self) -> int:
+        """Delete least recently used rows beyond the row budget. Returns rows deleted."""
+        max_rows = self.max_rows
+        if max_rows <= 0:
+            return 0
+
+        Session = get_async_session()
+        async with Session() as session:
+            # The planner estimate avoids a count(*) every sweep; it lags deletes
+            # until the next analyze, so confirm with an exact count before evicting.
+            estimate = (await session.execute(self._row_estimate_sql)).scalar_one()
+            if estimate < 0 or estimate > max_rows:
+                estimate = (await session.execute(text(f"SELECT count(*) FROM {self.table}"))).scalar_one()
+
+        excess = estimate - max_rows
+        total = 0
+        while excess > 0:
+            async with Session() as session:
+                result = await session.execute(self._evict_sql, {"batch": min(excess, EVICT_BATCH)})
+                await session.commit()
+            deleted: int = result.rowcount
+            if not deleted:
+                break
+            total += deleted
+            excess -= deleted
+
+        if total:
+            logger.info("%s: evicted %d least recently used rows", self.table, total)
+        return total
@@ -0,0 +1,203 @@
+"""
+Deterministic pre-extraction before the LLM.
+
+A regex and gazetteer pass over the document text that finds, without any API
+call:
+- email addresses (To:/Cc: lines, signatures, inline), as Person entities
+  plus a Company for non-freemail domains, linked by WORKS_AT
+- names of Person and Company nodes already in the workspace graph
+
+The gazetteer is loaded from Neo4j per workspace and kept for GAZETTEER_TTL.
+Matching runs in the CPU process pool for large texts (the compiled matcher
+is cached per worker process).
+
+The pass also strips header and quoted-reply lines from what is sent to the
+LLM. Documents left with less than `settings.pre_extraction_min_llm_chars`
+characters of prose skip the LLM entirely.
+"""
+
+import hashlib
+import logging
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.neo4j_client import get_session
+from app.processing.cpu_pool import CPU_OFFLOAD_MIN_CHARS, run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+# Bump when the derivation of `llm_text` changes; part of the extraction cache version
+PRE_EXTRACTION_VERSION = "1"
+GAZETTEER_TTL = 300  # seconds a workspace's gazetteer is reused
+MIN_NAME_CHARS = 3
+
+IGNORE_DOMAINS = {
+    "gmail.com",
+    "googlemail.com",
+    "yahoo.com",
+    "hotmail.com",
+    "outlook.com",
+    "gmx.de",
+    "gmx.net",
+    "web.de",
+    "icloud.com",
+    "me.com",
+    "t-online.de",
+    "live.com",
+    "aol.com",
+    "protonmail.com",
+    "proton.me",
+    "mail.com",
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Jane Doe <jane@acme.com>, "Jane Doe" <jane@acme.com>
+NAMED_ADDRESS_RE = re.compile(r"\"?([A-Z][^<>\"\n,;:]{1,60}?)\"?\s*<([\w.+-]+@[\w-]+(?:\.[\w-]+)+)>")
+URL_RE = re.compile(r"https?://\S+")
+HEADER_LINE_RE = re.compile(r"^\s*(from|to|cc|bcc|date|sent|subject|reply-to)\s*:.*$", re.IGNORECASE | re.MULTILINE)
+QUOTED_LINE_RE = re.compile(r"^\s*>.*$", re.MULTILINE)
+
+
+@dataclass
+class Gazetteer:
+    key: str  # fingerprint of the contents; keys the compiled matcher in pool workers
+    people: list[tuple[str, str | None]] = field(default_factory=list)  # (name, email)
+    companies: list[tuple[str, str | None]] = field(default_factory=list)  # (name, domain)
+
+
+@dataclass
+class PreExtraction:
+    entities: list[dict]
+    relations: list[dict]
+    llm_text: str  # text for the LLM, without header and quoted-reply lines
+    prose_chars: int  # characters of llm_text that are not addresses or URLs
+
+
+# ---------------------------------------------------------------------------
+# Matching (runs in a CPU pool worker for large texts)
+# ---------------------------------------------------------------------------
+
+# Compiled gazetteer matchers per process, keyed by Gazetteer.key
+_matchers: dict[str, tuple[re.Pattern | None, dict[str, dict]]] = {}
+MAX_CACHED_MATCHERS = 16
+
+
+def _matcher(gazetteer: Gazetteer) -> tuple[re.Pattern | None, dict[str, dict]]:
+    cached = _matchers.get(gazetteer.key)
+    if cached is not None:
+        return cached
+
+    by_name: dict[str, dict] = {}
+    for name, email in gazetteer.people:
+        # Single first names ("Max") match far too much prose
+        if len(name) >= MIN_NAME_CHARS and " " in name.strip():
+            by_name.setdefault(name, {"type": "Person", "name": name, "email": email or ""})
+    for name, domain in gazetteer.companies:
+        if len(name) >= MIN_NAME_CHARS:
+            by_name.setdefault(name, {"type": "Company", "name": name, "domain": domain or ""})
+
+    pattern = None
+    if by_name:
+        # Longest first so "Acme Labs" wins over "Acme"; case-sensitive to stick to proper nouns
+        names = sorted(by_name, key=len, reverse=True)
+        pattern = re.compile(r"(?<!\w)(?:" + "|".join(re.escape(n) for n in names) + r")(?!\w)")
+
+    if len(_matchers) >= MAX_CACHED_MATCHERS:
+        _matchers.clear()
+    _matchers[gazetteer.key] = (pattern, by_name)
+    return pattern, by_name
+
+
+def pre_extract(text: str, gazetteer: Gazetteer) -> PreExtraction:
+    """Regex + gazetteer entities for `text`. Pure function; safe to run in the process pool."""
+    entities: dict[tuple[str, str], dict] = {}
+    relations: dict[tuple[str, str], dict] = {}
+    companies_by_domain = {d.lower(): n for n, d in gazetteer.companies if d}
+    people_by_email = {e.lower(): n for n, e in gazetteer.people if e}
+
+    display_names = {email.lower(): name.strip() for name, email in NAMED_ADDRESS_RE.findall(text)}
+    for email in {m.lower() for m in EMAIL_RE.findall(text)}:
+        person = people_by_email.get(email) or display_names.get(email) or email.split("@")[0]
+        entities[("Person", email)] = {"type": "Person", "name": person, "email": email}
+
+        domain = email.split("@")[1]
+        if domain in IGNORE_DOMAINS:
+            continue
+        company = companies_by_domain.get(domain) or domain.split(".")[0].capitalize()
+        entities[("Company", domain)] = {"type": "Company", "name": company, "domain": domain}
+        relations[(person, company)] = {
+            "from_name": person,
+            "to_name": company,
+            "type": "WORKS_AT",
+            "evidence": email,
+        }
+
+    pattern, by_name = _matcher(gazetteer)
+    if pattern is not None:
+        found = {(e["type"], e["name"]) for e in entities.values()}
+        for name in set(pattern.findall(text)):
+            ent = by_name[name]
+            if (ent["type"], name) not in found:
+                ident = ent.get("email") or ent.get("domain") or name
+                entities.setdefault((ent["type"], ident.lower()), dict(ent))
+
+    llm_text = QUOTED_LINE_RE.sub("", HEADER_LINE_RE.sub("", text))
+    llm_text = re.sub(r"\n{3,}", "\n\n", llm_text).strip()
+    prose = URL_RE.sub("", EMAIL_RE.sub("", llm_text))
+    prose_chars = len(re.sub(r"\s+", " ", prose).strip())
+
+    return PreExtraction(
+        entities=list(entities.values()),
+        relations=list(relations.values()),
+        llm_text=llm_text,
+        prose_chars=prose_chars,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Gazetteer loading (event loop)
+# ---------------------------------------------------------------------------
+
+_gazetteers: dict[uuid.UUID, tuple[float, Gazetteer]] = {}
+
+
+async def get_gazetteer(workspace_id: uuid.UUID) -> Gazetteer:
+    """Known Person/Company names of the workspace graph, cached for GAZETTEER_TTL."""
+    cached = _gazetteers.get(workspace_id)
+    if cached is not None and time.monotonic() - cached[0] < GAZETTEER_TTL:
+        return cached[1]
+
+    limit = settings.pre_extraction_gazetteer_max
+    async with get_session() as session:
+        result = await session.run(
+            "MATCH (p:Person {workspace_id: $ws}) WHERE p.name IS NOT NULL "
+            "RETURN p.name AS name, p.email AS email LIMIT $limit",
+            ws=str(workspace_id),
+            limit=limit,
+        )
+        people = [(r["name"], r["email"] or None) for r in await result.data()]
+        result = await session.run(
+            "MATCH (c:Company {workspace_id: $ws}) WHERE c.name IS NOT NULL "
+            "RETURN c.name AS name, c.domain AS domain LIMIT $limit",
+            ws=str(workspace_id),
+            limit=limit,
+        )
+        companies = [(r["name"], r["domain"] or None) for r in await result.data()]
+
+    fingerprint = repr((sorted(map(repr, people)), sorted(map(repr, companies))))
+    digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+    gazetteer = Gazetteer(key=f"{workspace_id}:{digest}", people=people, companies=companies)
+    _gazetteers[workspace_id] = (time.monotonic(), gazetteer)
+    logger.info("Gazetteer for ws=%s: %d people, %d companies", workspace_id, len(people), len(companies))
+    return gazetteer
+
+
+async def pre_extract_document(workspace_id: uuid.UUID | None, text: str) -> PreExtraction:
+    """Run pre-extraction for a document, in the process pool when the text is large."""
+    gazetteer = await get_gazetteer(workspace_id) if workspace_id else Gazetteer(key="empty")
+    if len(text) < CPU_OFFLOAD_MIN_CHARS:
+        return pre_extract(text, gazetteer)
+    return await run_cpu_bound(pre_extract, text, gazetteer)
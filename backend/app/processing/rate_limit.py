@@ -0,0 +1,90 @@
+"""
+Adaptive request/token rate limiter for provider APIs.
+
+Two token buckets enforce a requests-per-minute and a tokens-per-minute
+budget; each holds ~10 seconds of budget so bursts stay small. Callers
+`acquire(tokens)` before a request and report the outcome:
+
+- `throttled(retry_after)` on a 429 halves the effective rate and pauses all
+  callers until the provider's Retry-After (or an exponential backoff) passes
+- `succeeded()` recovers the rate additively toward the full budget
+
+Waiters are served in arrival order. A budget of 0 disables that bucket.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+BURST_SECONDS = 10  # bucket capacity, in seconds of budget
+MIN_RATE_SCALE = 0.1
+RECOVERY_STEP = 0.05  # rate scale regained per successful request
+MAX_BACKOFF = 60.0
+
+
+class _Bucket:
+    def __init__(self, per_minute: int) -> None:
+        self.per_second = per_minute / 60
+        self.capacity = max(self.per_second * BURST_SECONDS, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, scale: float) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second * scale)
+        self.updated = now
+
+    def wait_time(self, amount: float, scale: float) -> float:
+        # A request larger than the bucket waits for a full bucket and overdraws it
+        shortfall = min(amount, self.capacity) - self.level
+        return max(shortfall, 0.0) / (self.per_second * scale)
+
+
+class RateLimiter:
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        self.name = name
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+        self.scale = 1.0
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request of `tokens` tokens fits the budgets, then consume it."""
+        async with self._lock:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill(self.scale)
+                        wait = max(wait, bucket.wait_time(amount, self.scale))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """Record a 429: slow down and pause everyone until the provider allows requests again."""
+        self._consecutive_429 += 1
+        self.scale = max(MIN_RATE_SCALE, self.scale / 2)
+        backoff = retry_after if retry_after is not None else min(2 ** (self._consecutive_429 - 1), MAX_BACKOFF)
+        self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+        logger.warning(
+            "%s rate limited (429 #%d): pausing %.1fs, rate scaled to %.0f%%",
+            self.name,
+            self._consecutive_429,
+            backoff,
+            self.scale * 100,
+        )
+
+    def succeeded(self) -> None:
+        self._consecutive_429 = 0
+        if self.scale < 1.0:
+            self.scale = min(1.0, self.scale + RECOVERY_STEP)
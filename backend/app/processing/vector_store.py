@@ -0,0 +1,378 @@
+"""
+Vector store backends for chunk embeddings.
+
+`settings.vector_store` selects where embed_and_store writes vectors:
+- "neo4j": Chunk nodes with an `embedding` property (used by context_builder
+  for unified vector + graph queries)
+- "pg": the `document_chunks.embedding` pgvector column (partial HNSW index
+  per vector size on a cast expression, built by app.scripts.pgvector_init)
+- "both" (default): write to both, as before this setting existed
+
+Queries use Neo4j whenever it is a write target, otherwise pgvector.
+Deployments that only query Neo4j can set "neo4j" and run
+`python -m app.scripts.drop_pg_embeddings` once to drop the pgvector copy.
+
+Vector size follows the workspace's embedding provider (see
+app.processing.embedding_providers); `settings.vector_quantization` controls
+precision: with "halfvec", pgvector indexes a float16 cast (rescored at full
+precision) and Neo4j stores float32 arrays instead of float64 lists. Neo4j has
+no float16/int8 vector type usable by its similarity functions, so float32 is
+its most compact option.
+
+In pgvector only the index shrinks: the `embedding` column keeps float32
+values in the heap, since rescoring reads them. Shorter vectors
+(`settings.embedding_dimensions`) are what reduce pg table storage. There is
+no int8/binary option.
+
+Whether a chunk has been embedded is tracked by `document_chunks.embedded_at`,
+independent of the backend.
+"""
+
+import logging
+import uuid
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import get_async_session
+from app.models import DocumentChunk
+from app.neo4j_client import get_session
+from app.processing.chunk_store import vector_literal, write_embeddings
+
+logger = logging.getLogger(__name__)
+
+PG_INDEX_PREFIX = "chunks_embedding_hnsw"
+
+# vector_quantization -> (pgvector cast type, HNSW operator class)
+PG_INDEX_TYPES = {
+    "none": ("vector", "vector_cosine_ops"),
+    "halfvec": ("halfvec", "halfvec_cosine_ops"),
+}
+
+
+def pg_index_name(dims: int) -> str:
+    """One partial HNSW index per vector size (WHERE vector_dims(embedding) = dims)."""
+    return f"{PG_INDEX_PREFIX}_{dims}_idx"
+
+
+def pg_index_expression(dims: int) -> tuple[str, str]:
+    """(cast type with dimensions, operator class) of the pgvector index for the current settings."""
+    if settings.vector_quantization not in PG_INDEX_TYPES:
+        raise ValueError(f"Unknown vector_quantization {settings.vector_quantization!r}; expected 'none' or 'halfvec'")
+    type_name, opclass = PG_INDEX_TYPES[settings.vector_quantization]
+    return f"{type_name}({dims})", opclass
+
+
+class VectorStore:
+    name: str
+
+    async def write(
+        self,
+        workspace_id: uuid.UUID,
+        document_id: uuid.UUID,
+        source_connection_id: uuid.UUID,
+        chunks_with_embeddings: list[tuple[DocumentChunk, list[float]]],
+    ) -> None:
+        raise NotImplementedError
+
+    async def sync_chunks(self, workspace_id: uuid.UUID, document_id: uuid.UUID, kept: list[DocumentChunk]) -> None:
+        """Align stored vectors with a re-chunked document (removed chunks dropped, kept ones moved)."""
+
+    async def search(
+        self,
+        workspace_id: uuid.UUID,
+        query_embedding: list[float],
+        top_k: int,
+        connection_ids: list[uuid.UUID] | None,
+    ) -> list[dict]:
+        raise NotImplementedError
+
+
+class PgVectorStore(VectorStore):
+    """pgvector column on document_chunks; chunk rows are maintained by the chunk stage."""
+
+    name = "pg"
+
+    async def write(self, workspace_id, document_id, source_connection_id, chunks_with_embeddings) -> None:
+        Session = get_async_session()
+        async with Session() as session:
+            await write_embeddings(session, [(chunk.id, embedding) for chunk, embedding in chunks_with_embeddings])
+            await session.commit()
+
+    async def search(self, workspace_id, query_embedding, top_k, connection_ids) -> list[dict]:
+        """
+        ANN search through the HNSW cast-expression index, then exact rescoring.
+
+        With halfvec quantization the index ranks top_k * vector_rescore_factor
+        candidates at half precision; the final order uses the full-precision column.
+        """
+        # Workspaces on different embedding providers store different vector
+        # sizes; the literal predicate lets the planner use that size's partial index.
+        dims = len(query_embedding)
+        cast, _ = pg_index_expression(dims)
+        quantized = settings.vector_quantization != "none"
+        vault_filter = (
+            "JOIN documents d ON d.id = c.document_id AND d.source_connection_id = ANY(:conn_ids)"
+            if connection_ids
+            else ""
+        )
+        query = text(f"""
+            WITH candidates AS (
+                SELECT c.id, c.document_id, c.idx, c.text, c.start_offset, c.end_offset, c.embedding
+                FROM document_chunks c
+                {vault_filter}
+                WHERE c.workspace_id = :ws AND vector_dims(c.embedding) = {dims}
+                ORDER BY c.embedding::{cast} <=> CAST(:q AS {cast})
+                LIMIT :candidates
+            )
+            SELECT id, document_id, idx, text, start_offset, end_offset,
+                   embedding <=> CAST(:q AS vector) AS distance
+            FROM candidates
+            ORDER BY distance
+            LIMIT :top_k
+        """)
+        params = {
+            "ws": workspace_id,
+            "q": vector_literal(query_embedding),
+            "candidates": top_k * settings.vector_rescore_factor if quantized else top_k,
+            "top_k": top_k,
+        }
+        if connection_ids:
+            params["conn_ids"] = list(connection_ids)
+
+        Session = get_async_session()
+        async with Session() as session:
+            rows = (await session.execute(query, params)).fetchall()
+
+        return [
+            {
+                "chunk_id": str(r.id),
+                "document_id": str(r.document_id),
+                "idx": r.idx,
+                "text": r.text,
+                "start_offset": r.start_offset,
+                "end_offset": r.end_offset,
+                "score": 1 - r.distance,
+                "distance": r.distance,
+            }
+            for r in rows
+        ]
+
+
+class Neo4jVectorStore(VectorStore):
+    """Chunk nodes with embeddings, linked to their Document node."""
+
+    name = "neo4j"
+
+    async def write(self, workspace_id, document_id, source_connection_id, chunks_with_embeddings) -> None:
+        """
+        Upsert Chunk nodes to Neo4j with embeddings.
+
+        Creates:
+        - Document node (MERGE, idempotent) with source_connection_id for vault filtering
+        - Chunk nodes with embedding vectors and source_connection_id
+        - PART_OF relationships from Chunk to Document
+
+        source_connection_id is stored on both Document and Chunk nodes for efficient
+        vault filtering (Chunk nodes can be filtered directly without traversal).
+
+        Uses the singleton driver from neo4j_client for connection pooling.
+        """
+        if not chunks_with_embeddings:
+            return
+
+        ws = str(workspace_id)
+        doc_id = str(document_id)
+        conn_id = str(source_connection_id)
+
+        async with get_session() as session:
+            # Ensure Document node exists with source_connection_id (idempotent MERGE)
+            await session.run(
+                """
+                MERGE (d:Document {workspace_id: $ws, key: $key})
+                SET d.document_id = $doc_id,
+                    d.source_connection_id = $conn_id
+                """,
+                ws=ws,
+                key=f"doc:{doc_id}",
+                doc_id=doc_id,
+                conn_id=conn_id,
+            )
+
+            # Batch upsert chunks with embeddings
+            # Using UNWIND for efficient batch processing
+            # source_connection_id on Chunk enables direct vault filtering without traversal
+            chunk_data = [
+                {
+                    "chunk_id": str(chunk.id),
+                    "idx": chunk.idx,
+                    "text": chunk.text,
+                    "start_offset": chunk.start_offset,
+                    "end_offset": chunk.end_offset,
+                    "embedding": embedding,
+                }
+                for chunk, embedding in chunks_with_embeddings
+            ]
+
+            # Quantized mode stores the vector as a float32 array (Neo4j's most
+            # compact vector representation) instead of a float64 list.
+            if settings.vector_quantization == "none":
+                set_embedding = "SET chunk.embedding = c.embedding"
+            else:
+                set_embedding = "CALL db.create.setNodeVectorProperty(chunk, 'embedding', c.embedding)"
+
+            await session.run(
+                f"""
+                UNWIND $chunks AS c
+                MERGE (chunk:Chunk {{chunk_id: c.chunk_id}})
+                SET chunk.workspace_id = $ws,
+                    chunk.document_id = $doc_id,
+                    chunk.idx = c.idx,
+                    chunk.text = c.text,
+                    chunk.start_offset = c.start_offset,
+                    chunk.end_offset = c.end_offset,
+                    chunk.source_connection_id = $conn_id
+                WITH chunk, c
+                {set_embedding}
+
+                WITH chunk
+                MATCH (d:Document {{workspace_id: $ws, key: $doc_key}})
+                MERGE (chunk)-[:PART_OF]->(d)
+                """,
+                ws=ws,
+                doc_id=doc_id,
+                doc_key=f"doc:{doc_id}",
+                conn_id=conn_id,
+                chunks=chunk_data,
+            )
+
+        logger.info("Upserted %d chunks to Neo4j for doc=%s", len(chunks_with_embeddings), doc_id)
+
+    async def sync_chunks(self, workspace_id, document_id, kept) -> None:
+        """
+        Delete nodes whose chunk no longer exists and move kept chunks to their
+        new idx/offsets without touching their embeddings. Nodes for newly
+        added chunks are created when those chunks are embedded.
+        """
+        async with get_session() as session:
+            await session.run(
+                """
+                MATCH (chunk:Chunk {workspace_id: $ws, document_id: $doc_id})
+                WHERE NOT chunk.chunk_id IN $keep
+                DETACH DELETE chunk
+                """,
+                ws=str(workspace_id),
+                doc_id=str(document_id),
+                keep=[str(c.id) for c in kept],
+            )
+            if kept:
+                await session.run(
+                    """
+                    UNWIND $chunks AS c
+                    MATCH (chunk:Chunk {chunk_id: c.chunk_id})
+                    SET chunk.idx = c.idx,
+                        chunk.start_offset = c.start_offset,
+                        chunk.end_offset = c.end_offset
+                    """,
+                    chunks=[
+                        {
+                            "chunk_id": str(c.id),
+                            "idx": c.idx,
+                            "start_offset": c.start_offset,
+                            "end_offset": c.end_offset,
+                        }
+                        for c in kept
+                    ],
+                )
+
+    async def search(self, workspace_id, query_embedding, top_k, connection_ids) -> list[dict]:
+        """
+        Vector similarity search on Chunk nodes with pre-filtering.
+
+        Uses exact nearest neighbor (ENN) with vector.similarity.cosine() to enable
+        pre-filtering by workspace_id and optionally connection_ids (for vault filtering).
+
+        This ensures multi-tenant isolation: workspace filter is applied BEFORE
+        similarity computation, not after.
+
+        Reference: https://neo4j.com/developer/genai-ecosystem/vector-search/
+        """
+        ws = str(workspace_id)
+        conn_ids = [str(c) for c in connection_ids] if connection_ids else None
+
+        # Build the pre-filter query using ENN approach
+        # This applies workspace/vault filter BEFORE computing similarity
+        if conn_ids:
+            query = """
+            MATCH (chunk:Chunk)
+            WHERE chunk.workspace_id = $ws
+              AND chunk.source_connection_id IN $conn_ids
+              AND chunk.embedding IS NOT NULL
+            WITH chunk, vector.similarity.cosine(chunk.embedding, $embedding) AS score
+            WHERE score > 0.0
+            ORDER BY score DESC
+            LIMIT $top_k
+            RETURN chunk.chunk_id AS chunk_id,
+                   chunk.document_id AS document_id,
+                   chunk.idx AS idx,
+                   chunk.text AS text,
+                   chunk.start_offset AS start_offset,
+                   chunk.end_offset AS end_offset,
+                   score
+            """
+            params = {"ws": ws, "conn_ids": conn_ids, "embedding": query_embedding, "top_k": top_k}
+        else:
+            query = """
+            MATCH (chunk:Chunk)
+            WHERE chunk.workspace_id = $ws
+              AND chunk.embedding IS NOT NULL
+            WITH chunk, vector.similarity.cosine(chunk.embedding, $embedding) AS score
+            WHERE score > 0.0
+            ORDER BY score DESC
+            LIMIT $top_k
+            RETURN chunk.chunk_id AS chunk_id,
+                   chunk.document_id AS document_id,
+                   chunk.idx AS idx,
+                   chunk.text AS text,
+                   chunk.start_offset AS start_offset,
+                   chunk.end_offset AS end_offset,
+                   score
+            """
+            params = {"ws": ws, "embedding": query_embedding, "top_k": top_k}
+
+        async with get_session() as session:
+            result = await session.run(query, **params)
+            records = await result.data()
+
+        return [
+            {
+                "chunk_id": r["chunk_id"],
+                "document_id": r["document_id"],
+                "idx": r["idx"],
+                "text": r["text"],
+                "start_offset": r["start_offset"],
+                "end_offset": r["end_offset"],
+                "score": r["score"],
+                "distance": 1 - r["score"],  # Convert similarity to distance for compatibility
+            }
+            for r in records
+        ]
+
+
+VECTOR_STORES: dict[str, VectorStore] = {store.name: store for store in (Neo4jVectorStore(), PgVectorStore())}
+
+
+def get_vector_stores() -> list[VectorStore]:
+    """Write targets configured by settings.vector_store."""
+    mode = settings.vector_store
+    if mode == "both":
+        return [VECTOR_STORES["neo4j"], VECTOR_STORES["pg"]]
+    if mode not in VECTOR_STORES:
+        raise ValueError(f"Unknown vector_store {mode!r}; expected 'pg', 'neo4j' or 'both'")
+    return [VECTOR_STORES[mode]]
+
+
+def get_search_store() -> VectorStore:
+    """Backend that serves similarity queries: Neo4j when it holds vectors, else pgvector."""
+    stores = get_vector_stores()
+    return next((s for s in stores if s.name == "neo4j"), stores[0])
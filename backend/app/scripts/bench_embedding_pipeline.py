@@ -0,0 +1,280 @@
+"""
+Benchmark for the chunk -> embed -> store pipeline.
+
+Seeds a throwaway workspace with synthetic documents, runs the same stages a
+PROCESS_DOCUMENT job runs against local Postgres/Neo4j, and embeds through a
+deterministic fake OpenAI endpoint (app.scripts.fake_embedding_server,
+started as a subprocess unless --base-url is given). Reports docs/sec,
+chunks/sec, p50/p99 per stage and peak RSS, then deletes everything it wrote.
+
+Stages:
+- chunk_text:      chunking alone (CPU)
+- chunk_stage:     re-chunk + diff + bulk insert into Postgres
+- embed:           each provider call (fake server round trip)
+- store:<backend>: each page written to a vector store (e.g. store:neo4j)
+- embed_and_store: the whole embedding step for one document
+
+Document text carries a per-run nonce so every run starts with a cold
+embedding cache; pass --warm-cache to reuse texts from earlier runs.
+
+Run via: python -m app.scripts.bench_embedding_pipeline --docs 200
+"""
+
+import argparse
+import asyncio
+import functools
+import logging
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from sqlalchemy import delete, insert, select
+
+from app.config import settings
+from app.db import get_async_session
+from app.models import Document, DocumentChunk, EmbeddingCache, SourceConnection, SourceType, Workspace
+from app.neo4j_client import close_driver, get_session
+from app.openai_client import close_openai_client
+from app.processing.chunker import chunk_text
+from app.processing.cpu_pool import shutdown_cpu_pool
+from app.processing.embedding_cache import text_hash
+from app.processing.embedding_providers import get_embedding_provider
+from app.processing.embeddings import embed_and_store
+from app.processing.vector_store import get_vector_stores
+
+logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "account agreement analysis budget contract customer deadline delivery design engineer estimate "
+    "feature invoice launch meeting migration milestone onboarding platform policy pricing project "
+    "proposal quarter release report review roadmap security service sprint support team vendor"
+).split()
+
+samples: dict[str, list[float]] = defaultdict(list)
+
+
+def _timed[**P, T](stage: str, fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Wrap an async callable so each call's duration is recorded under `stage`."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            samples[stage].append(time.perf_counter() - started)
+
+    return wrapper
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def synthetic_document(rng: random.Random, chars: int, nonce: str) -> str:
+    paragraphs = []
+    size = 0
+    while size < chars:
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+            for _ in range(rng.randint(3, 8))
+        ]
+        paragraph = f"[{nonce}] " + " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+def start_fake_server(latency_ms: float, per_input_ms: float) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.scripts.fake_embedding_server",
+            f"--port={port}",
+            f"--latency-ms={latency_ms}",
+            f"--per-input-ms={per_input_ms}",
+        ]
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, f"http://127.0.0.1:{port}/v1"
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("fake embedding server did not start")
+
+
+async def seed(args, workspace_id: uuid.UUID, connection_id: uuid.UUID) -> list[Document]:
+    rng = random.Random(args.seed)
+    nonce = "bench" if args.warm_cache else uuid.uuid4().hex[:12]
+    docs = [
+        Document(
+            id=uuid.uuid4(),
+            workspace_id=workspace_id,
+            source_connection_id=connection_id,
+            source_type=SourceType.notion,
+            external_id=f"bench-{i}",
+            title=f"Benchmark document {i}",
+            content_text=synthetic_document(rng, args.doc_chars, nonce),
+        )
+        for i in range(args.docs)
+    ]
+
+    Session = get_async_session()
+    async with Session() as session:
+        await session.execute(insert(Workspace).values(id=workspace_id, name="bench", embedding_provider="openai"))
+        await session.execute(
+            insert(SourceConnection).values(
+                id=connection_id,
+                workspace_id=workspace_id,
+                source_type=SourceType.notion,
+                nango_connection_id="bench",
+            )
+        )
+        session.add_all(docs)
+        await session.commit()
+        for doc in docs:
+            session.expunge(doc)
+    return docs
+
+
+async def process(doc: Document, chunk_stage) -> int:
+    started = time.perf_counter()
+    chunk_text(doc.content_text or "")
+    samples["chunk_text"].append(time.perf_counter() - started)
+
+    chunks = await chunk_stage(doc.workspace_id, doc)
+    return await _timed("embed_and_store", embed_and_store)(
+        doc.workspace_id, doc.id, chunks=chunks, source_connection_id=doc.source_connection_id
+    )
+
+
+async def cleanup(workspace_id: uuid.UUID, cache_key: str) -> None:
+    Session = get_async_session()
+    async with Session() as session:
+        result = await session.execute(select(DocumentChunk.text).where(DocumentChunk.workspace_id == workspace_id))
+        hashes = list({text_hash(t) for t in result.scalars().all()})
+        for i in range(0, len(hashes), 1000):
+            await session.execute(
+                delete(EmbeddingCache).where(
+                    EmbeddingCache.model == cache_key, EmbeddingCache.text_hash.in_(hashes[i : i + 1000])
+                )
+            )
+        await session.execute(delete(DocumentChunk).where(DocumentChunk.workspace_id == workspace_id))
+        await session.execute(delete(Document).where(Document.workspace_id == workspace_id))
+        await session.execute(delete(SourceConnection).where(SourceConnection.workspace_id == workspace_id))
+        await session.execute(delete(Workspace).where(Workspace.id == workspace_id))
+        await session.commit()
+
+    if any(store.name == "neo4j" for store in get_vector_stores()):
+        async with get_session() as neo_session:
+            await neo_session.run("MATCH (n {workspace_id: $ws}) DETACH DELETE n", ws=str(workspace_id))
+
+
+def report(args, docs: int, chunks: int, elapsed: float) -> None:
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print()
+    print(
+        f"vector_store={settings.vector_store} quantization={settings.vector_quantization} "
+        f"write_mode={settings.chunk_write_mode} concurrency={args.concurrency}"
+    )
+    print(
+        f"{docs} docs, {chunks} chunks in {elapsed:.2f}s: {docs / elapsed:.1f} docs/s, {chunks / elapsed:.1f} chunks/s"
+    )
+    print(f"peak RSS: {self_rss:.0f} MiB (process), {children_rss:.0f} MiB (largest pool worker)")
+    print()
+    print(f"{'stage':<18}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'total s':>10}")
+    for stage, values in samples.items():
+        print(
+            f"{stage:<18}{len(values):>8}{_percentile(values, 0.50) * 1000:>10.1f}"
+            f"{_percentile(values, 0.99) * 1000:>10.1f}{sum(values):>10.2f}"
+        )
+
+
+async def run_bench(args) -> None:
+    from app.jobs.handlers import _chunk_stage
+
+    provider = get_embedding_provider("openai")
+    chunk_stage = _timed("chunk_stage", _chunk_stage)
+
+    workspace_id = uuid.uuid4()
+    docs = await seed(args, workspace_id, uuid.uuid4())
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one(doc: Document) -> int:
+        async with slots:
+            return await process(doc, chunk_stage)
+
+    try:
+        with ExitStack() as timers:
+            timers.enter_context(patch.object(provider, "embed", _timed("embed", provider.embed)))
+            for store in get_vector_stores():
+                timers.enter_context(patch.object(store, "write", _timed(f"store:{store.name}", store.write)))
+
+            started = time.perf_counter()
+            counts = await asyncio.gather(*(one(doc) for doc in docs))
+            elapsed = time.perf_counter() - started
+    finally:
+        if not args.keep:
+            await cleanup(workspace_id, provider.cache_key)
+        await close_openai_client()
+        await close_driver()
+        shutdown_cpu_pool()
+
+    report(args, len(docs), sum(counts), elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--doc-chars", type=int, default=20_000, help="approximate characters per document")
+    parser.add_argument("--concurrency", type=int, default=4, help="documents processed at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="use a running OpenAI-compatible endpoint instead of the fake server")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fake server latency per request")
+    parser.add_argument("--per-input-ms", type=float, default=0.2, help="fake server latency per input")
+    parser.add_argument("--warm-cache", action="store_true", help="reuse texts (and cached vectors) across runs")
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark workspace in place")
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url:
+        settings.openai_base_url = args.base_url
+    else:
+        server, settings.openai_base_url = start_fake_server(args.latency_ms, args.per_input_ms)
+    settings.openai_api_key = settings.openai_api_key or "bench"
+
+    try:
+        asyncio.run(run_bench(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+One-shot cleanup: drop the pgvector copy of chunk embeddings.
+
+For deployments running with `VECTOR_STORE=neo4j`, where queries only use
+Neo4j Chunk nodes. The script:
+1. copies any pgvector embeddings still missing from Neo4j
+   (same as app.scripts.migrate_embeddings_to_neo4j) and verifies counts
+2. drops the HNSW indexes (see app.scripts.pgvector_init)
+3. clears document_chunks.embedding in batches
+4. runs VACUUM ANALYZE so the space is reusable
+
+Run via: python -m app.scripts.drop_pg_embeddings [--force]
+
+--force skips the vector_store check and the count verification.
+Re-enabling pgvector later (VECTOR_STORE=pg/both) requires re-embedding and
+re-running app.scripts.pgvector_init.
+"""
+
+import asyncio
+import logging
+import sys
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import get_async_session, get_engine
+from app.neo4j_client import close_driver
+from app.processing.vector_store import PG_INDEX_PREFIX
+from app.scripts.migrate_embeddings_to_neo4j import migrate_embeddings, verify_migration
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLEAR_BATCH = 5000
+
+CLEAR_SQL = text("""
+    UPDATE document_chunks SET embedding = NULL
+    WHERE id IN (
+        SELECT id FROM document_chunks
+        WHERE embedding IS NOT NULL
+        LIMIT :batch
+    )
+""")
+
+
+async def drop_pg_embeddings(force: bool = False) -> None:
+    if settings.vector_store != "neo4j" and not force:
+        logger.error("vector_store is %r; set VECTOR_STORE=neo4j before dropping pgvector data", settings.vector_store)
+        return
+
+    await migrate_embeddings()
+    if not await verify_migration() and not force:
+        logger.error("Neo4j is missing embeddings that exist in pgvector. Aborting (use --force to override).")
+        return
+
+    Session = get_async_session()
+    async with Session() as session:
+        result = await session.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = 'document_chunks' AND indexname LIKE :prefix"),
+            {"prefix": f"{PG_INDEX_PREFIX}%"},
+        )
+        for name in result.scalars().all():
+            await session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            logger.info("Dropped HNSW index %s", name)
+        await session.commit()
+
+    cleared = 0
+    while True:
+        async with Session() as session:
+            result = await session.execute(CLEAR_SQL, {"batch": CLEAR_BATCH})
+            await session.commit()
+        if not result.rowcount:
+            break
+        cleared += result.rowcount
+        logger.info("Cleared %d pgvector embeddings", cleared)
+
+    # VACUUM cannot run inside a transaction
+    async with get_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM (ANALYZE) document_chunks"))
+
+    logger.info("Done: %d embeddings removed from document_chunks", cleared)
+
+
+async def main() -> None:
+    try:
+        await drop_pg_embeddings(force="--force" in sys.argv[1:])
+    finally:
+        await close_driver()
+
+
+def run() -> None:
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,237 @@
+"""
+Deterministic OpenAI-compatible Files + Batch API server for local runs.
+
+Extends the fake embedding server with:
+- POST /v1/files, GET /v1/files/{id}, GET /v1/files/{id}/content
+- POST /v1/batches, GET /v1/batches/{id}
+- POST /v1/chat/completions (always an empty extraction result)
+
+A batch reports "in_progress" until `--complete-after` seconds have passed,
+then runs its input lines (embeddings via fake_embedding, chat completions as
+empty extraction results) and completes with an output file. Like the real
+API, an input file with duplicate custom_ids fails the batch. The first
+`--fail-polls` GET /v1/batches/{id} requests answer 500, to exercise polling
+through an outage. State is kept in memory.
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Run via: python -m app.scripts.fake_batch_server --port 8099 --complete-after 5 [--fail-polls 2]
+"""
+
+import argparse
+import json
+import logging
+import time
+import uuid
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.scripts.fake_embedding_server import DEFAULT_DIMENSIONS, create_app, fake_embedding
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMPTY_EXTRACTION = json.dumps({"entities": [], "relations": []})
+
+
+class BatchCreateRequest(BaseModel):
+    input_file_id: str
+    endpoint: str
+    completion_window: str
+    metadata: dict[str, str] | None = None
+
+
+def _parse_multipart(content_type: str, body: bytes) -> dict[str, tuple[str | None, bytes]]:
+    """Form fields of a multipart body as {name: (filename, data)}."""
+    message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+    fields: dict[str, tuple[str | None, bytes]] = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        data = part.get_payload(decode=True)
+        if isinstance(name, str):
+            fields[name] = (part.get_filename(), data if isinstance(data, bytes) else b"")
+    return fields
+
+
+def _chat_completion(body: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", ""),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": EMPTY_EXTRACTION},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _embedding(body: dict) -> dict:
+    inputs = [body["input"]] if isinstance(body["input"], str) else body["input"]
+    dimensions = body.get("dimensions") or DEFAULT_DIMENSIONS
+    return {
+        "object": "list",
+        "model": body.get("model", ""),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimensions)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+EXECUTORS = {"/v1/chat/completions": _chat_completion, "/v1/embeddings": _embedding}
+
+
+def create_batch_app(complete_after: float = 0.0, fail_polls: int = 0) -> FastAPI:
+    app = create_app()
+    files: dict[str, dict] = {}
+    contents: dict[str, bytes] = {}
+    batches: dict[str, dict] = {}
+    failures = {"polls": fail_polls}
+
+    def store_file(filename: str, purpose: str, data: bytes) -> dict:
+        file_id = f"file-{uuid.uuid4().hex}"
+        files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        contents[file_id] = data
+        return files[file_id]
+
+    def run_batch(batch: dict) -> None:
+        execute = EXECUTORS[batch["endpoint"]]
+        requests = [json.loads(raw) for raw in contents[batch["input_file_id"]].splitlines() if raw.strip()]
+
+        counts = Counter(request["custom_id"] for request in requests)
+        duplicates = sorted(c for c, n in counts.items() if n > 1)
+        if duplicates:
+            batch.update(
+                status="failed",
+                failed_at=int(time.time()),
+                errors={
+                    "object": "list",
+                    "data": [
+                        {"code": "duplicate_custom_id", "message": f"Duplicate custom_id {c!r}", "param": "custom_id"}
+                        for c in duplicates
+                    ],
+                },
+            )
+            logger.warning("Batch %s failed: duplicate custom_ids %s", batch["id"], duplicates)
+            return
+
+        lines = []
+        for request in requests:
+            lines.append(
+                {
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": execute(request["body"])},
+                    "error": None,
+                }
+            )
+        output = b"".join(json.dumps(line).encode() + b"\n" for line in lines)
+        batch.update(
+            status="completed",
+            output_file_id=store_file("batch_output.jsonl", "batch_output", output)["id"],
+            completed_at=int(time.time()),
+            request_counts={"total": len(lines), "completed": len(lines), "failed": 0},
+        )
+        logger.info("Batch %s completed: %d requests", batch["id"], len(lines))
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        fields = _parse_multipart(request.headers.get("content-type", ""), await request.body())
+        if "file" not in fields:
+            raise HTTPException(400, "missing file")
+        filename, data = fields["file"]
+        purpose = fields.get("purpose", (None, b""))[1].decode()
+        return store_file(filename or "upload.jsonl", purpose, data)
+
+    @app.get("/v1/files/{file_id}")
+    async def get_file(file_id: str):
+        if file_id not in files:
+            raise HTTPException(404, "file not found")
+        return files[file_id]
+
+    @app.get("/v1/files/{file_id}/content")
+    async def get_file_content(file_id: str):
+        if file_id not in contents:
+            raise HTTPException(404, "file not found")
+        return Response(contents[file_id], media_type="application/octet-stream")
+
+    @app.post("/v1/batches")
+    async def create_batch(body: BatchCreateRequest):
+        if body.input_file_id not in contents:
+            raise HTTPException(400, "unknown input_file_id")
+        if body.endpoint not in EXECUTORS:
+            raise HTTPException(400, f"unsupported endpoint {body.endpoint}")
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        created_at = int(time.time())
+        batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.endpoint,
+            "input_file_id": body.input_file_id,
+            "completion_window": body.completion_window,
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": created_at,
+            "expires_at": created_at + 24 * 3600,
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.metadata,
+        }
+        return batches[batch_id]
+
+    @app.get("/v1/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        if failures["polls"] > 0:
+            failures["polls"] -= 1
+            raise HTTPException(500, "injected failure")
+        batch = batches.get(batch_id)
+        if batch is None:
+            raise HTTPException(404, "batch not found")
+        if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= complete_after:
+            run_batch(batch)
+        return batch
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return _chat_completion(await request.json())
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--complete-after", type=float, default=0.0, help="seconds until a batch completes")
+    parser.add_argument("--fail-polls", type=int, default=0, help="batch status requests that answer 500 first")
+    args = parser.parse_args()
+
+    logger.info("Fake batch server on http://%s:%d/v1", args.host, args.port)
+    uvicorn.run(
+        create_batch_app(args.complete_after, args.fail_polls), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
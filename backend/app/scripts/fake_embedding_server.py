@@ -0,0 +1,86 @@
+"""
+Deterministic OpenAI-compatible embedding server for benchmarks.
+
+Serves POST /v1/embeddings with unit vectors derived from a hash of each
+input, so the same text always gets the same vector and no API key or network
+access is needed. `--latency-ms` (per request) and `--per-input-ms` (per
+input) simulate API response time.
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Run via: python -m app.scripts.fake_embedding_server --port 8099
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import math
+import random
+
+import uvicorn
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMENSIONS = 1536
+
+
+class EmbeddingRequest(BaseModel):
+    input: str | list[str]
+    model: str
+    dimensions: int | None = None
+    encoding_format: str | None = None
+
+
+def fake_embedding(text: str, dimensions: int) -> list[float]:
+    """Unit vector seeded by the text's hash."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def create_app(latency_ms: float = 0.0, per_input_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="fake-embeddings")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(body: EmbeddingRequest):
+        inputs = [body.input] if isinstance(body.input, str) else body.input
+        delay = latency_ms + per_input_ms * len(inputs)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        dimensions = body.dimensions or DEFAULT_DIMENSIONS
+        # Rough token count, close enough for rate-limit accounting
+        tokens = sum(max(1, len(text) // 4) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per request")
+    parser.add_argument("--per-input-ms", type=float, default=0.0, help="simulated latency per input text")
+    args = parser.parse_args()
+
+    logger.info("Fake embedding server on http://%s:%d/v1", args.host, args.port)
+    uvicorn.run(create_app(args.latency_ms, args.per_input_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -128,12 +128,10 @@ async def migrate_embeddings() -> None:
                 await neo_session.run(
                     """
                     UNWIND $chunks AS c
-                    MERGE (chunk:Chunk {
-                        workspace_id: $ws,
-                        document_id: $doc_id,
-                        idx: c.idx
-                    })
-                    SET chunk.chunk_id = c.chunk_id,
+                    MERGE (chunk:Chunk {chunk_id: c.chunk_id})
+                    SET chunk.workspace_id = $ws,
+                        chunk.document_id = $doc_id,
+                        chunk.idx = c.idx,
                         chunk.text = c.text,
                         chunk.start_offset = c.start_offset,
                         chunk.end_offset = c.end_offset,
@@ -159,8 +157,8 @@ async def migrate_embeddings() -> None:
     logger.info("Migration complete: %d chunks migrated to Neo4j", migrated)
 
 
-async def verify_migration() -> None:
-    """Verify the migration by comparing counts."""
+async def verify_migration() -> bool:
+    """Verify the migration by comparing counts. Returns True when they match."""
     Session = get_async_session()
 
     # Count in PostgreSQL
@@ -181,8 +179,9 @@ async def verify_migration() -> None:
 
     if pg_count == neo4j_count:
         logger.info("✓ Migration verified: counts match")
-    else:
-        logger.warning("⚠ Count mismatch: PostgreSQL=%d, Neo4j=%d", pg_count, neo4j_count)
+        return True
+    logger.warning("⚠ Count mismatch: PostgreSQL=%d, Neo4j=%d", pg_count, neo4j_count)
+    return False
 
 
 async def main() -> None:
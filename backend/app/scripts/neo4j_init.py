@@ -8,6 +8,7 @@ import logging
 from neo4j import GraphDatabase
 
 from app.config import settings
+from app.processing.embedding_providers import get_embedding_provider
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,9 +55,14 @@ STATEMENTS = [
     FOR (n:Document) ON (n.vault_id)
     """,
     # --- Chunk nodes for vector search ---
+    # Chunks are keyed by chunk_id (the Postgres row id) so incremental
+    # re-chunking can shift idx without colliding; drop the old idx constraint.
     """
-    CREATE CONSTRAINT chunk_workspace_doc_idx IF NOT EXISTS
-    FOR (n:Chunk) REQUIRE (n.workspace_id, n.document_id, n.idx) IS UNIQUE
+    DROP CONSTRAINT chunk_workspace_doc_idx IF EXISTS
+    """,
+    """
+    CREATE CONSTRAINT chunk_id_unique IF NOT EXISTS
+    FOR (n:Chunk) REQUIRE n.chunk_id IS UNIQUE
     """,
     """
     CREATE INDEX chunk_workspace_idx IF NOT EXISTS
@@ -70,18 +76,6 @@ STATEMENTS = [
     CREATE INDEX chunk_connection_idx IF NOT EXISTS
     FOR (n:Chunk) ON (n.source_connection_id)
     """,
-    # --- Vector index for semantic search (HNSW, cosine similarity) ---
-    # Note: WITH [n.prop] filtering properties syntax requires Neo4j 2026.01+
-    # Neo4j Aura 5.x uses basic syntax. Pre-filtering still works via Cypher WHERE.
-    # Reference: https://neo4j.com/docs/cypher-manual/current/indexes/semantic-indexes/vector-indexes/
-    """
-    CREATE VECTOR INDEX chunk_embeddings IF NOT EXISTS
-    FOR (n:Chunk) ON (n.embedding)
-    OPTIONS {indexConfig: {
-        `vector.dimensions`: 1536,
-        `vector.similarity_function`: 'cosine'
-    }}
-    """,
     # --- PRJ_Node: Project Graph nodes (isolated from UKL) ---
     # Phase 16: Project Graph Layer
     """
@@ -107,6 +101,47 @@ STATEMENTS = [
 ]
 
 
+VECTOR_INDEX_NAME = "chunk_embeddings"
+
+
+def ensure_vector_index(session, dims: int) -> None:
+    """
+    Vector index for semantic search (HNSW, cosine similarity), sized for the
+    default embedding provider. Rebuilt when the configured size changes.
+
+    Neo4j skips nodes whose vector does not match the index size, so chunks of
+    workspaces on another provider stay searchable through the exact (ENN)
+    query in Neo4jVectorStore, just without the index.
+
+    Note: WITH [n.prop] filtering properties syntax requires Neo4j 2026.01+
+    Neo4j Aura 5.x uses basic syntax. Pre-filtering still works via Cypher WHERE.
+    Reference: https://neo4j.com/docs/cypher-manual/current/indexes/semantic-indexes/vector-indexes/
+    """
+    record = session.run(
+        "SHOW VECTOR INDEXES YIELD name, options WHERE name = $name RETURN options",
+        name=VECTOR_INDEX_NAME,
+    ).single()
+    if record is not None:
+        current = record["options"]["indexConfig"].get("vector.dimensions")
+        if current == dims:
+            logger.info("Vector index %s already has %d dimensions", VECTOR_INDEX_NAME, dims)
+            return
+        logger.info("Dropping vector index %s (%s dimensions, want %d)", VECTOR_INDEX_NAME, current, dims)
+        session.run(f"DROP INDEX {VECTOR_INDEX_NAME} IF EXISTS")
+
+    logger.info("Creating vector index %s with %d dimensions", VECTOR_INDEX_NAME, dims)
+    session.run(
+        f"""
+        CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS
+        FOR (n:Chunk) ON (n.embedding)
+        OPTIONS {{indexConfig: {{
+            `vector.dimensions`: {dims},
+            `vector.similarity_function`: 'cosine'
+        }}}}
+        """
+    )
+
+
 def run() -> None:
     driver = GraphDatabase.driver(
         settings.neo4j_uri,
@@ -116,6 +151,7 @@ def run() -> None:
         for stmt in STATEMENTS:
             logger.info("Running: %s", stmt.strip().split("\n")[1].strip())
             session.run(stmt)
+        ensure_vector_index(session, get_embedding_provider().dimensions)
     driver.close()
     logger.info("Neo4j schema init done.")
 
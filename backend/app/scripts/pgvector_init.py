@@ -0,0 +1,71 @@
+"""
+Idempotent pgvector index init for document_chunks.embedding.
+
+Builds one partial HNSW index per vector size in use (the OpenAI provider's
+`embedding_dimensions`, plus the local provider's size when it differs),
+on a cast of the embedding column that matches settings.vector_quantization:
+- "none":    (embedding::vector(d))  vector_cosine_ops
+- "halfvec": (embedding::halfvec(d)) halfvec_cosine_ops  (half the index memory;
+             queries rescore candidates against the full-precision column,
+             which stays float32, so table storage is unchanged)
+
+Each index has `WHERE vector_dims(embedding) = d`, so rows of another size
+neither break the cast nor bloat the index.
+
+Run via: python -m app.scripts.pgvector_init
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.db import get_engine
+from app.processing.embedding_providers import EMBEDDING_PROVIDERS
+from app.processing.vector_store import pg_index_expression, pg_index_name
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def ensure_index(conn, dims: int) -> None:
+    name = pg_index_name(dims)
+    cast, opclass = pg_index_expression(dims)
+    expected = f"(embedding)::{cast}"
+
+    result = await conn.execute(text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"), {"name": name})
+    current = result.scalar_one_or_none()
+    if current and expected in current and opclass in current:
+        logger.info("Index %s already matches %s %s", name, cast, opclass)
+        return
+
+    logger.info("Building %s on (embedding::%s) %s", name, cast, opclass)
+    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(
+        text(f"""
+            CREATE INDEX CONCURRENTLY {name}
+            ON document_chunks
+            USING hnsw ((embedding::{cast}) {opclass})
+            WITH (m = 16, ef_construction = 64)
+            WHERE vector_dims(embedding) = {dims}
+        """)
+    )
+
+
+async def main() -> None:
+    sizes = sorted({provider.dimensions for provider in EMBEDDING_PROVIDERS.values()})
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    async with get_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for dims in sizes:
+            await ensure_index(conn, dims)
+    logger.info("pgvector index init done.")
+
+
+def run() -> None:
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run()
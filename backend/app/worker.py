@@ -1,16 +1,36 @@
 import asyncio
 import logging
+import signal
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 logger = logging.getLogger("worker")
 
 
 async def run():
+    from app.config import settings
     from app.jobs.handlers import register_all
+    from app.jobs.metrics import serve_metrics
     from app.jobs.runner import run_loop
+    from app.openai_client import close_openai_client
+    from app.processing.cpu_pool import shutdown_cpu_pool
 
     register_all()
-    await run_loop()
+
+    # Stop claiming on SIGTERM/SIGINT and let in-flight jobs drain
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    metrics_server = await serve_metrics(settings.worker_metrics_port) if settings.worker_metrics_port else None
+
+    try:
+        await run_loop(stop_event)
+    finally:
+        shutdown_cpu_pool()
+        await close_openai_client()
+        if metrics_server:
+            metrics_server.close()
 
 
 if __name__ == "__main__":
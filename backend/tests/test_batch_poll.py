@@ -0,0 +1,109 @@
+import asyncio
+import time
+import uuid
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, NotFoundError
+
+from app.jobs import enqueue, handlers
+from app.models import JobType
+from app.processing import batch_api
+from app.processing.batch_api import EMBEDDINGS_ENDPOINT, BatchRequest
+from app.scripts.fake_batch_server import create_batch_app
+
+WORKSPACE = uuid.uuid4()
+DOCUMENTS = [str(uuid.uuid4())]
+
+
+class Pipeline:
+    """Records what BATCH_POLL enqueues and caches."""
+
+    def __init__(self) -> None:
+        self.polls: list[dict] = []
+        self.downstream: list[tuple[JobType, list[str]]] = []
+        self.cached: dict[str, dict] = {}
+
+    async def enqueue_job(self, workspace_id, job_type, payload, dedup_key=None, priority=None, run_after=None):
+        assert job_type == JobType.BATCH_POLL and run_after is not None
+        self.polls.append(payload)
+        return uuid.uuid4()
+
+    async def enqueue_downstream(self, workspace_id, job_type, document_ids):
+        self.downstream.append((job_type, document_ids))
+
+    async def cache_embedding_results(self, cache_key, results):
+        self.cached.update(results)
+        return len(results)
+
+
+def _pipeline(monkeypatch, fail_polls: int) -> Pipeline:
+    pipeline = Pipeline()
+    transport = httpx.ASGITransport(app=create_batch_app(fail_polls=fail_polls))
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://fake/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport, base_url="http://fake/v1"),
+    )
+    monkeypatch.setattr(batch_api, "get_openai_client", lambda: client)
+    monkeypatch.setattr(batch_api, "cache_embedding_results", pipeline.cache_embedding_results)
+    monkeypatch.setattr(enqueue, "enqueue_job", pipeline.enqueue_job)
+    monkeypatch.setattr(handlers, "_enqueue_batch_downstream", pipeline.enqueue_downstream)
+    return pipeline
+
+
+async def _submit() -> dict:
+    requests = [BatchRequest("hash-1", {"model": "text-embedding-3-small", "input": "hello"})]
+    batch_ids, expires_at = await batch_api.submit_batches(EMBEDDINGS_ENDPOINT, requests, {})
+    assert expires_at > time.time()
+    return {
+        "batch_ids": batch_ids,
+        "expires_at": expires_at,
+        "endpoint": EMBEDDINGS_ENDPOINT,
+        "cache_key": "openai:test",
+        "document_ids": DOCUMENTS,
+    }
+
+
+def test_poll_survives_a_transient_error(monkeypatch):
+    pipeline = _pipeline(monkeypatch, fail_polls=1)
+
+    async def run() -> dict:
+        payload = await _submit()
+        await handlers.handle_batch_poll(WORKSPACE, payload)  # the server answers 500
+        assert pipeline.polls == [payload]
+        assert pipeline.downstream == []
+
+        await handlers.handle_batch_poll(WORKSPACE, pipeline.polls[-1])
+        return payload
+
+    asyncio.run(run())
+
+    assert list(pipeline.cached) == ["hash-1"]
+    assert pipeline.downstream == [(JobType.EMBED_CHUNKS, DOCUMENTS)]
+
+
+def test_poll_gives_up_after_expiry_and_runs_the_stages(monkeypatch):
+    pipeline = _pipeline(monkeypatch, fail_polls=1)
+
+    async def run() -> None:
+        payload = await _submit()
+        payload["expires_at"] = time.time() - 1
+        await handlers.handle_batch_poll(WORKSPACE, payload)
+
+    asyncio.run(run())
+
+    assert pipeline.polls == []
+    assert pipeline.cached == {}
+    # The stage jobs request the embeddings synchronously
+    assert pipeline.downstream == [(JobType.EMBED_CHUNKS, DOCUMENTS)]
+
+
+def test_other_errors_still_fail_the_job(monkeypatch):
+    pipeline = _pipeline(monkeypatch, fail_polls=0)
+    payload = {**asyncio.run(_submit()), "batch_ids": ["batch_unknown"]}
+
+    with pytest.raises(NotFoundError):
+        asyncio.run(handlers.handle_batch_poll(WORKSPACE, payload))
+    assert pipeline.polls == []
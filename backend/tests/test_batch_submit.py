@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.jobs import enqueue, handlers
+from app.models import JobType
+from app.processing import batch_api, embedding_providers, extraction
+from app.processing.batch_api import CHAT_ENDPOINT, EMBEDDINGS_ENDPOINT, BatchRequest
+
+WORKSPACE = uuid.uuid4()
+DOCUMENTS = [str(uuid.uuid4()) for _ in range(3)]
+
+
+class FakeBatchApi:
+    """Records submitted batches and enqueued jobs; fails the first embeddings submit if asked."""
+
+    def __init__(self, fail_embeddings: bool = False) -> None:
+        self.fail_embeddings = fail_embeddings
+        self.submitted: list[tuple[str, list[str]]] = []
+        self.jobs: list[tuple[JobType, dict, str | None]] = []
+
+    async def submit_batches(self, endpoint, requests, metadata):
+        if endpoint == EMBEDDINGS_ENDPOINT and self.fail_embeddings:
+            self.fail_embeddings = False
+            raise RuntimeError("upload failed")
+        self.submitted.append((endpoint, [r.custom_id for r in requests]))
+        return [f"batch-{len(self.submitted)}"], 0
+
+    async def enqueue_job(self, workspace_id, job_type, payload, dedup_key=None, priority=None, run_after=None):
+        self.jobs.append((job_type, payload, dedup_key))
+        return uuid.uuid4()
+
+
+@pytest.fixture
+def api(monkeypatch) -> FakeBatchApi:
+    fake = FakeBatchApi()
+
+    async def load_document(workspace_id, document_id):
+        return SimpleNamespace(
+            id=document_id, content_text="Same body.", title="", author_name="", author_email="", source_type=None
+        )
+
+    async def chunk_stage(workspace_id, doc):
+        return [SimpleNamespace(text=f"chunk of {doc.id}")]
+
+    async def plan_batch_extraction(workspace_id, content_text, **headers):
+        # Every document renders the same prompt, so all plan the same request
+        return [BatchRequest("document:v:same", {"input": content_text})]
+
+    async def embedding_requests(provider, texts):
+        return [BatchRequest(t, {"input": t}) for t in dict.fromkeys(texts)]
+
+    async def get_provider(workspace_id):
+        return SimpleNamespace(cache_key="openai:test")
+
+    async def save_job_payload(payload):
+        pass
+
+    monkeypatch.setattr(handlers, "_load_document", load_document)
+    monkeypatch.setattr(handlers, "_chunk_stage", chunk_stage)
+    monkeypatch.setattr(handlers, "_save_job_payload", save_job_payload)
+    monkeypatch.setattr(extraction, "plan_batch_extraction", plan_batch_extraction)
+    monkeypatch.setattr(batch_api, "embedding_requests", embedding_requests)
+    monkeypatch.setattr(batch_api, "submit_batches", fake.submit_batches)
+    monkeypatch.setattr(embedding_providers, "get_workspace_embedding_provider", get_provider)
+    monkeypatch.setattr(enqueue, "enqueue_job", fake.enqueue_job)
+    return fake
+
+
+def _submit(payload: dict) -> None:
+    asyncio.run(handlers.handle_batch_submit(WORKSPACE, payload))
+
+
+def test_duplicate_requests_are_submitted_once(api):
+    _submit({"document_ids": DOCUMENTS})
+
+    assert api.submitted[0] == (CHAT_ENDPOINT, ["document:v:same"])
+    assert [endpoint for endpoint, _ in api.submitted] == [CHAT_ENDPOINT, EMBEDDINGS_ENDPOINT]
+    polls = [payload for job_type, payload, _ in api.jobs if job_type == JobType.BATCH_POLL]
+    assert [p["document_ids"] for p in polls] == [DOCUMENTS, DOCUMENTS]
+
+
+def test_retry_does_not_resubmit_created_batches(api):
+    api.fail_embeddings = True
+    payload = {"document_ids": DOCUMENTS}
+
+    with pytest.raises(RuntimeError):
+        _submit(payload)
+    assert payload["submitted"][CHAT_ENDPOINT]["batch_ids"] == ["batch-1"]
+
+    _submit(payload)  # the runner retries with the saved payload
+
+    assert [endpoint for endpoint, _ in api.submitted] == [CHAT_ENDPOINT, EMBEDDINGS_ENDPOINT]
+    chat_polls = [(p, key) for job_type, p, key in api.jobs if p["endpoint"] == CHAT_ENDPOINT]
+    # Polled again on the retry, under the same dedup key
+    assert [p["batch_ids"] for p, _ in chat_polls] == [["batch-1"], ["batch-1"]]
+    assert chat_polls[0][1] == chat_polls[1][1] == "BATCH_POLL:batch-1"
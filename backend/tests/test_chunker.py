@@ -0,0 +1,103 @@
+import random
+import uuid
+
+from app.processing.chunker import CHUNK_SIZE, Chunk, StoredChunk, chunk_text, diff_chunks
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda sigma omega".split()
+
+
+def _sentences(rng: random.Random, n: int) -> list[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "." for _ in range(n)]
+
+
+def _document(rng: random.Random, paragraph_breaks: bool) -> tuple[str, list[str]]:
+    sentences = _sentences(rng, 400)
+    paragraphs = [" ".join(sentences[i : i + 5]) for i in range(0, len(sentences), 5)]
+    return ("\n\n" if paragraph_breaks else " ").join(paragraphs), paragraphs
+
+
+def _stored(text: str) -> list[StoredChunk]:
+    return [StoredChunk(id=uuid.uuid4(), text=c.text, start_offset=c.start_offset) for c in chunk_text(text)]
+
+
+def test_short_text_is_one_chunk():
+    chunks = chunk_text("  Hello world.  ")
+    assert [(c.idx, c.text, c.start_offset, c.end_offset) for c in chunks] == [(0, "Hello world.", 0, 12)]
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text("") == []
+    assert chunk_text(" \n ") == []
+
+
+def test_chunks_respect_size_and_overlap():
+    text, _ = _document(random.Random(0), paragraph_breaks=True)
+    chunks = chunk_text(text)
+
+    assert [c.idx for c in chunks] == list(range(len(chunks)))
+    assert all(len(c.text) <= CHUNK_SIZE for c in chunks)
+    # Each chunk starts with the tail of the previous one
+    for prev, cur in zip(chunks, chunks[1:], strict=False):
+        assert cur.text.split(" ", 2)[1] in prev.text[-250:]
+
+
+def test_chunking_is_deterministic():
+    text, _ = _document(random.Random(1), paragraph_breaks=False)
+    assert chunk_text(text) == chunk_text(text)
+
+
+def test_unchanged_document_keeps_every_chunk():
+    text, _ = _document(random.Random(2), paragraph_breaks=True)
+    stored = _stored(text)
+
+    diff = diff_chunks(stored, chunk_text(text))
+
+    assert [sc_id for sc_id, _ in diff.kept] == [sc.id for sc in stored]
+    assert diff.added == []
+    assert diff.removed == []
+
+
+def test_paragraph_edit_resyncs():
+    # Replacing one paragraph only re-chunks its neighbourhood, with or without paragraph breaks
+    for paragraph_breaks in (True, False):
+        for seed in range(20):
+            rng = random.Random(seed)
+            text, paragraphs = _document(rng, paragraph_breaks)
+            stored = _stored(text)
+            target = paragraphs[rng.randrange(2, 20)]
+            edited = text.replace(target, " ".join(_sentences(rng, rng.randint(2, 8))), 1)
+
+            diff = diff_chunks(stored, chunk_text(edited))
+
+            assert len(stored) - len(diff.kept) <= 10, (paragraph_breaks, seed)
+            assert len(diff.added) <= 10, (paragraph_breaks, seed)
+
+
+def test_repeated_text_prefers_same_offset():
+    first, body, second = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    stored = [
+        StoredChunk(id=first, text="Signature.", start_offset=0),
+        StoredChunk(id=body, text="Body.", start_offset=20),
+        StoredChunk(id=second, text="Signature.", start_offset=40),
+    ]
+    new = [
+        Chunk(idx=0, text="Signature.", start_offset=40, end_offset=50),
+        Chunk(idx=1, text="Signature.", start_offset=0, end_offset=10),
+    ]
+
+    diff = diff_chunks(stored, new)
+
+    assert [(sc_id, ch.start_offset) for sc_id, ch in diff.kept] == [(second, 40), (first, 0)]
+    assert diff.removed == [body]
+    assert diff.added == []
+
+
+def test_changed_text_is_added_and_old_removed():
+    old = StoredChunk(id=uuid.uuid4(), text="Old sentence.", start_offset=0)
+    new = chunk_text("New sentence.")
+
+    diff = diff_chunks([old], new)
+
+    assert diff.kept == []
+    assert diff.added == new
+    assert diff.removed == [old.id]
@@ -0,0 +1,89 @@
+from app.processing.extraction import MAX_CONTENT_CHARS, _document_key, merge_extractions
+
+
+def _person(name: str, email: str = "") -> dict:
+    return {"type": "Person", "name": name, "email": email}
+
+
+def _company(name: str, domain: str = "") -> dict:
+    return {"type": "Company", "name": name, "domain": domain}
+
+
+def test_first_occurrence_keeps_its_name():
+    merged = merge_extractions(
+        [
+            {"entities": [_person("Jane Doe", "jane@acme.com")]},
+            {"entities": [_person("J. Doe", "JANE@acme.com")]},
+        ]
+    )
+    assert merged["entities"] == [_person("Jane Doe", "jane@acme.com")]
+
+
+def test_later_mentions_fill_in_missing_email_and_domain():
+    merged = merge_extractions(
+        [
+            {"entities": [_person("Jane Doe"), _company("Acme")]},
+            {"entities": [_person("Jane Doe", "jane@acme.com"), _company("ACME", "acme.com")]},
+        ]
+    )
+    assert merged["entities"] == [_person("Jane Doe", "jane@acme.com"), _company("Acme", "acme.com")]
+
+
+def test_mention_without_email_joins_known_person():
+    merged = merge_extractions(
+        [
+            {"entities": [_person("Jane Doe", "jane@acme.com")]},
+            {"entities": [_person("jane doe")]},
+        ]
+    )
+    assert merged["entities"] == [_person("Jane Doe", "jane@acme.com")]
+
+
+def test_conflicting_emails_stay_separate():
+    merged = merge_extractions(
+        [
+            {"entities": [_person("Jane Doe", "jane@acme.com")]},
+            {"entities": [_person("Jane Doe", "jane@other.org")]},
+        ]
+    )
+    assert [e["email"] for e in merged["entities"]] == ["jane@acme.com", "jane@other.org"]
+
+
+def test_relations_are_renamed_to_merged_entities_and_deduplicated():
+    works_at = {"type": "WORKS_AT", "evidence": "signature"}
+    merged = merge_extractions(
+        [
+            {
+                "entities": [_person("Jane Doe", "jane@acme.com"), _company("Acme", "acme.com")],
+                "relations": [{"from_name": "Jane Doe", "to_name": "Acme", **works_at}],
+            },
+            {
+                "entities": [_person("J. Doe", "jane@acme.com"), _company("Acme Inc", "acme.com")],
+                "relations": [
+                    {"from_name": "J. Doe", "to_name": "Acme Inc", **works_at, "evidence": "footer"},
+                    {"from_name": "J. Doe", "to_name": "Unknown Ltd", "type": "WORKS_AT"},
+                ],
+            },
+        ]
+    )
+    assert merged["relations"] == [
+        {"from_name": "Jane Doe", "to_name": "Acme", **works_at},
+        {"from_name": "Jane Doe", "to_name": "Unknown Ltd", "type": "WORKS_AT"},
+    ]
+
+
+def test_nameless_entities_and_empty_results_are_ignored():
+    merged = merge_extractions([{}, {"entities": [{"type": "Topic", "name": ""}], "relations": []}])
+    assert merged == {"entities": [], "relations": []}
+
+
+def test_document_key_covers_headers_sent_to_the_llm():
+    key = _document_key("Body.", "Title", "Jane", "jane@acme.com", "email")
+    assert key == _document_key("Body.", "Title", "Jane", "jane@acme.com", "email")
+    assert key != _document_key("Body.", "Other title", "Jane", "jane@acme.com", "email")
+    assert key != _document_key("Body.", "Title", "Jane", "jane@other.org", "email")
+
+
+def test_map_reduced_document_key_ignores_headers():
+    content = "Sentence. " * MAX_CONTENT_CHARS
+    assert _document_key(content, "Title", "", "", "") == _document_key(content, "Other", "", "", "")
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+from types import SimpleNamespace
+
+from app.config import settings
+from app.processing import extraction, extraction_batcher
+from app.processing.extraction_batcher import get_extraction_batcher
+
+
+class FakeChatClient:
+    """Answers packed requests with one entity per document, named after the section text."""
+
+    def __init__(self) -> None:
+        self.requests: list[list[str]] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, *, messages, **kwargs):
+        sections = re.split(r"### Document \d+\n", messages[-1]["content"])[1:]
+        sections = [s.strip() for s in sections]
+        self.requests.append(sections)
+        documents = {
+            str(i): {"entities": [{"type": "Topic", "name": section}], "relations": []}
+            for i, section in enumerate(sections, start=1)
+        }
+        message = SimpleNamespace(content=json.dumps({"documents": documents}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_workspaces_never_share_a_request(monkeypatch):
+    client = FakeChatClient()
+    monkeypatch.setattr(extraction_batcher, "get_openai_client", lambda: client)
+    monkeypatch.setattr(settings, "extraction_batch_wait_ms", 20)
+    monkeypatch.setattr(settings, "extraction_batch_max_docs", 4)
+    monkeypatch.setattr(extraction_batcher, "_batchers", {})
+    workspaces = [uuid.uuid4(), uuid.uuid4()]
+
+    async def extract(ws: uuid.UUID, i: int) -> dict | None:
+        return await get_extraction_batcher(ws, "model", "prompt").extract(f"{ws} document {i}")
+
+    async def run() -> list[dict | None]:
+        # Interleaved arrivals from both workspaces
+        return await asyncio.gather(*(extract(workspaces[i % 2], i) for i in range(12)))
+
+    results = asyncio.run(run())
+
+    assert len(client.requests) >= 2
+    for sections in client.requests:
+        assert len({section.split(" ")[0] for section in sections}) == 1, sections
+    # Every caller still gets back its own document's result
+    for i, result in enumerate(results):
+        assert result is not None
+        assert result["entities"][0]["name"] == f"{workspaces[i % 2]} document {i}"
+
+
+def _extract_alone(monkeypatch, worker_concurrency: int) -> float:
+    """Seconds one short document takes to extract when no other caller is around."""
+
+    async def complete(user_msg: str) -> dict:
+        return {"entities": [], "relations": []}
+
+    monkeypatch.setattr(extraction, "_complete", complete)
+    monkeypatch.setattr(extraction_batcher, "get_openai_client", FakeChatClient)
+    monkeypatch.setattr(extraction_batcher, "_batchers", {})
+    monkeypatch.setattr(settings, "worker_concurrency", worker_concurrency)
+    monkeypatch.setattr(settings, "extraction_batch_wait_ms", 300)
+
+    started = time.monotonic()
+    result, complete_ = asyncio.run(extraction._extract_document("Short mail.", "", "", "", "", uuid.uuid4()))
+    assert complete_ and result == {"entities": [], "relations": []}
+    return time.monotonic() - started
+
+
+def test_sequential_worker_does_not_wait_for_a_batch(monkeypatch):
+    assert _extract_alone(monkeypatch, worker_concurrency=1) < 0.1
+    assert extraction_batcher._batchers == {}
+
+
+def test_concurrent_worker_lingers_for_other_documents(monkeypatch):
+    assert _extract_alone(monkeypatch, worker_concurrency=4) >= 0.3
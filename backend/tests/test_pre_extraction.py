@@ -0,0 +1,81 @@
+from app.processing.pre_extraction import Gazetteer, pre_extract
+
+
+def _names(entities: list[dict], type_: str) -> list[str]:
+    return sorted(e["name"] for e in entities if e["type"] == type_)
+
+
+def test_headers_and_quoted_replies_are_stripped_from_llm_text():
+    text = (
+        "From: Jane Doe <jane@acme.com>\n"
+        "To: bob@example.org\n"
+        "Subject: Launch\n"
+        "\n"
+        "We ship on Friday.\n"
+        "\n"
+        "> On Monday Bob wrote:\n"
+        "> Can we ship earlier?\n"
+    )
+
+    pre = pre_extract(text, Gazetteer(key="empty"))
+
+    assert pre.llm_text == "We ship on Friday."
+    assert pre.prose_chars == len("We ship on Friday.")
+
+
+def test_addresses_and_urls_do_not_count_as_prose():
+    pre = pre_extract("jane@acme.com https://acme.com/team\nThanks", Gazetteer(key="empty"))
+    assert pre.prose_chars == len("Thanks")
+
+
+def test_email_addresses_become_people_companies_and_works_at():
+    pre = pre_extract("Jane Doe <jane@acme.com> wrote to bob@gmail.com", Gazetteer(key="empty"))
+
+    assert _names(pre.entities, "Person") == ["Jane Doe", "bob"]
+    assert pre.entities[[e["name"] for e in pre.entities].index("Jane Doe")]["email"] == "jane@acme.com"
+    # Freemail domains are not companies
+    assert [e for e in pre.entities if e["type"] == "Company"] == [
+        {"type": "Company", "name": "Acme", "domain": "acme.com"}
+    ]
+    assert pre.relations == [
+        {"from_name": "Jane Doe", "to_name": "Acme", "type": "WORKS_AT", "evidence": "jane@acme.com"}
+    ]
+
+
+def test_known_addresses_use_graph_names():
+    gazetteer = Gazetteer(
+        key="known-addresses",
+        people=[("Jane Doe", "jane@acme.com")],
+        companies=[("Acme Labs", "acme.com")],
+    )
+
+    pre = pre_extract("Ping jane@acme.com", gazetteer)
+
+    assert _names(pre.entities, "Person") == ["Jane Doe"]
+    assert _names(pre.entities, "Company") == ["Acme Labs"]
+    assert pre.relations[0]["to_name"] == "Acme Labs"
+
+
+def test_gazetteer_matches_known_names():
+    gazetteer = Gazetteer(
+        key="known-names",
+        people=[("Jane Doe", "jane@acme.com"), ("Max", None)],
+        companies=[("Acme", "acme.com"), ("Acme Labs", None)],
+    )
+
+    pre = pre_extract("Jane Doe met Max from Acme Labs. Acme Labs and jane doe agreed.", gazetteer)
+
+    # Single first names and lowercase mentions are not matched; the longest company name wins
+    assert _names(pre.entities, "Person") == ["Jane Doe"]
+    assert _names(pre.entities, "Company") == ["Acme Labs"]
+    assert pre.relations == []
+
+
+def test_gazetteer_hit_and_address_of_same_person_are_one_entity():
+    gazetteer = Gazetteer(key="same-person", people=[("Jane Doe", "jane@acme.com")])
+
+    pre = pre_extract("Jane Doe (jane@acme.com) sent the contract.", gazetteer)
+
+    assert [e for e in pre.entities if e["type"] == "Person"] == [
+        {"type": "Person", "name": "Jane Doe", "email": "jane@acme.com"}
+    ]
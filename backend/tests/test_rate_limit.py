@@ -0,0 +1,125 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.processing import rate_limit
+from app.processing.rate_limit import MIN_RATE_SCALE, RECOVERY_STEP, RateLimiter
+
+
+class FakeClock:
+    """Replaces the module's time and sleep so waits are recorded instead of slept."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(rate_limit, "asyncio", SimpleNamespace(Lock=asyncio.Lock, sleep=fake.sleep))
+    return fake
+
+
+def _acquire(limiter: RateLimiter, tokens: int = 0) -> None:
+    asyncio.run(limiter.acquire(tokens))
+
+
+def test_request_bucket_allows_burst_then_paces(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)  # 1/s, 10 s burst
+
+    for _ in range(10):
+        _acquire(limiter)
+    assert clock.sleeps == []
+
+    _acquire(limiter)
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_bucket_refills_with_elapsed_time(clock):
+    limiter = RateLimiter("test", tokens_per_minute=600)  # 10 tokens/s, capacity 100
+
+    _acquire(limiter, 100)
+    clock.now += 3
+    _acquire(limiter, 30)
+    assert clock.sleeps == []
+
+    _acquire(limiter, 50)
+    assert clock.sleeps == [pytest.approx(5.0)]
+
+
+def test_oversized_request_waits_for_full_bucket_and_overdraws(clock):
+    limiter = RateLimiter("test", tokens_per_minute=600)
+
+    _acquire(limiter, 250)  # larger than the bucket: goes through on a full one
+    assert clock.sleeps == []
+
+    _acquire(limiter, 10)  # pays back the 150 overdraft first
+    assert clock.sleeps == [pytest.approx(16.0)]
+
+
+def test_zero_budget_disables_limits(clock):
+    limiter = RateLimiter("test")
+    for _ in range(1000):
+        _acquire(limiter, 10**6)
+    assert clock.sleeps == []
+
+
+def test_throttled_halves_rate_and_pauses(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)
+    for _ in range(10):
+        _acquire(limiter)
+
+    limiter.throttled(retry_after=7)
+    assert limiter.scale == 0.5
+
+    _acquire(limiter)  # pause outlasts the refill wait
+    assert sum(clock.sleeps) == pytest.approx(7.0)
+
+    # The 7 s pause refilled 3.5 requests at half rate; once drained, each request takes 2 s
+    clock.sleeps.clear()
+    for _ in range(4):
+        _acquire(limiter)
+    assert clock.sleeps == [pytest.approx(1.0), pytest.approx(2.0)]
+
+
+def test_throttled_backs_off_exponentially_without_retry_after(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)
+
+    pauses = []
+    for _ in range(4):
+        limiter.throttled()
+        pauses.append(limiter._paused_until - clock.now)
+        clock.now = limiter._paused_until
+    assert pauses == [1, 2, 4, 8]
+
+    for _ in range(10):
+        limiter.throttled()
+    assert limiter.scale == MIN_RATE_SCALE
+
+
+def test_succeeded_recovers_additively_and_resets_backoff(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)
+    limiter.throttled()
+    limiter.throttled()
+    assert limiter.scale == 0.25
+
+    limiter.succeeded()
+    assert limiter.scale == pytest.approx(0.25 + RECOVERY_STEP)
+
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.scale == 1.0
+
+    clock.now = limiter._paused_until
+    limiter.throttled()
+    assert limiter._paused_until - clock.now == 1  # backoff restarts after a success